@@ -8,38 +8,72 @@ from __future__ import annotations
 
 import threading
 
-from flask import Flask
+from flask import Flask, request
 from flask_session import Session
 from flask_socketio import SocketIO
 
 from auth import build_auth_blueprint, configure_session
+from config_store import get_service_cache_ttl
 from command_executor import register_console_socket_handlers
 from metrics import build_metrics_blueprint
+from metrics_archive import build_metrics_archive_blueprint, start_metrics_archive
 from mqtt_feature import build_mqtt_blueprint, mqtt_cleanup_on_shutdown, register_mqtt_socket_handlers
-from processes_feature import build_processes_blueprint
-from services_feature import build_services_blueprint, init_services_socketio, register_services_socket_handlers
-from file_explorer_feature import build_file_explorer_blueprint, register_file_exec_socket_handlers
-from systemd_manager import SystemdManager
+from processes_feature import (
+    build_processes_blueprint,
+    processes_cleanup_on_disconnect,
+    register_process_socket_handlers,
+)
+from prometheus_exporter import build_prometheus_blueprint
+from services_feature import (
+    build_services_blueprint,
+    init_services_socketio,
+    publish_services,
+    register_services_socket_handlers,
+)
+from file_explorer_feature import (
+    build_file_explorer_blueprint,
+    register_dir_watch_socket_handlers,
+    register_file_exec_socket_handlers,
+    register_scan_socket_handlers,
+)
+from journal_index import build_journal_index_blueprint, start_journal_indexer
+from filename_index import build_filename_index_blueprint, start_filename_indexer
+from journal_stream import journal_cleanup_on_disconnect, register_journal_socket_handlers
+from dir_watch import dir_watch_cleanup_on_disconnect
+from process_watch import process_watch_cleanup_on_disconnect
+from scan_jobs import scan_jobs_cleanup_on_disconnect
+from systemd_manager import service_cache
+from systemd_watcher import SystemdWatcher
 from metrics import get_system_metrics
 
 
 def start_background_update(socketio: SocketIO) -> threading.Thread:
-    """Emit service list + header metrics periodically (only when changed)."""
+    """Publish service changes + emit header metrics periodically (only when changed).
+
+    Service updates come from systemd D-Bus signals when the watcher can
+    subscribe; otherwise (or once the bus goes away) the list is polled.
+    """
+
+    def on_services_changed(services):
+        service_cache.store(services)
+        publish_services(services)
+
+    watcher = SystemdWatcher(on_services_changed)
+    if watcher.start():
+        on_services_changed(watcher.services())
 
     def background_update():
-        last_services = None
         last_metrics = None
 
         while True:
             try:
-                current_services = SystemdManager.get_all_services()
                 current_metrics = get_system_metrics()
 
-                if last_services != current_services:
-                    socketio.emit('update_services', {'services': current_services}, namespace='/')
-                    last_services = current_services
+                if not watcher.running:
+                    publish_services(service_cache.get_all())
 
-                if last_metrics != current_metrics:
+                # The sampler refreshes on its own schedule; emit each new sample once.
+                if last_metrics is None or last_metrics['sampled_at'] != current_metrics['sampled_at']:
                     socketio.emit('update_metrics', current_metrics, namespace='/')
                     last_metrics = current_metrics
 
@@ -52,9 +86,23 @@ def start_background_update(socketio: SocketIO) -> threading.Thread:
     return thread
 
 
+def register_disconnect_handler(socketio: SocketIO, *cleanups) -> None:
+    """Single default-namespace disconnect handler (Socket.IO keeps only one per event)."""
+
+    @socketio.on('disconnect')
+    def handle_disconnect(*args):
+        for cleanup in cleanups:
+            try:
+                cleanup(request.sid)
+            except Exception:
+                pass
+
+
 def create_app() -> tuple[Flask, SocketIO]:
     app = Flask(__name__, static_folder='static')
 
+    service_cache.ttl = get_service_cache_ttl()
+
     configure_session(app)
     Session(app)
 
@@ -69,10 +117,14 @@ def create_app() -> tuple[Flask, SocketIO]:
     # HTTP routes
     app.register_blueprint(build_auth_blueprint())
     app.register_blueprint(build_metrics_blueprint())
+    app.register_blueprint(build_metrics_archive_blueprint())
     app.register_blueprint(build_services_blueprint())
     app.register_blueprint(build_processes_blueprint())
     app.register_blueprint(build_mqtt_blueprint())
+    app.register_blueprint(build_prometheus_blueprint())
     app.register_blueprint(build_file_explorer_blueprint())
+    app.register_blueprint(build_journal_index_blueprint())
+    app.register_blueprint(build_filename_index_blueprint())
 
     # Socket.IO
     init_services_socketio(socketio)
@@ -80,6 +132,18 @@ def create_app() -> tuple[Flask, SocketIO]:
     register_console_socket_handlers(socketio)
     register_mqtt_socket_handlers(socketio)
     register_file_exec_socket_handlers(socketio)
+    register_scan_socket_handlers(socketio)
+    register_dir_watch_socket_handlers(socketio)
+    register_journal_socket_handlers(socketio)
+    register_process_socket_handlers(socketio)
+    register_disconnect_handler(
+        socketio,
+        journal_cleanup_on_disconnect,
+        processes_cleanup_on_disconnect,
+        process_watch_cleanup_on_disconnect,
+        scan_jobs_cleanup_on_disconnect,
+        dir_watch_cleanup_on_disconnect,
+    )
 
     return app, socketio
 
@@ -89,6 +153,9 @@ app, socketio = create_app()
 
 if __name__ == '__main__':
     start_background_update(socketio)
+    start_journal_indexer()
+    start_metrics_archive()
+    start_filename_indexer()
     try:
         socketio.run(app, host='0.0.0.0', port=2137, debug=False, allow_unsafe_werkzeug=True)
     finally:
@@ -62,6 +62,8 @@ def build_auth_blueprint() -> Blueprint:
             'auth.login',
             'auth.logout',
             'auth.api_sudo_login',
+            # Scrapers can't log in; the endpoint checks its own bearer token.
+            'prometheus.metrics',
         }:
             return None
         if not is_authenticated():
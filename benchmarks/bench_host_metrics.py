@@ -0,0 +1,61 @@
+"""Per-sample cost of the /proc fast path versus the psutil host metrics path.
+
+Both collectors produce the fields `sample_system_metrics` reports. Run it on
+the target board; the CPU time column is what the sampler thread costs per
+second at the default 1 s interval.
+
+    python benchmarks/bench_host_metrics.py --samples 2000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from host_stats import HostStatsCollector, psutil_host_stats  # noqa: E402
+
+
+def run(label, func, samples, repeat):
+    func()
+    timings = []
+    cpu_timings = []
+    for _ in range(repeat):
+        started, cpu_started = time.perf_counter(), time.process_time()
+        for _ in range(samples):
+            func()
+        timings.append((time.perf_counter() - started) / samples)
+        cpu_timings.append((time.process_time() - cpu_started) / samples)
+    best = min(timings) * 1e6
+    avg = sum(timings) / len(timings) * 1e6
+    cpu = min(cpu_timings) * 1e6
+    print(f"{label:<10} best {best:8.1f} us   avg {avg:8.1f} us   cpu {cpu:8.1f} us/sample")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    collector = HostStatsCollector()
+    if not collector.available():
+        print('/proc is not readable here; the fast path would fall back to psutil')
+        return 1
+
+    print(f"{os.cpu_count()} CPUs, {args.samples} samples x {args.repeat} runs")
+    slow = run('psutil', psutil_host_stats, args.samples, args.repeat)
+    fast = run('proc', collector.sample, args.samples, args.repeat)
+    print(f"speedup    {slow / fast:.1f}x")
+
+    missing = set(psutil_host_stats()) - set(collector.sample())
+    if missing:
+        print(f"MISMATCH: fast path lacks {sorted(missing)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Compare the batched service inventory with the per-unit `systemctl show` path.
+
+A fake `systemctl` shell script is put first on PATH, so this runs on any
+machine and measures process-spawn and parsing overhead only.
+
+    python benchmarks/bench_service_inventory.py --units 300 --repeat 5
+"""
+
+import argparse
+import os
+import stat
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from systemd_manager import SystemdManager  # noqa: E402
+
+FAKE_SYSTEMCTL = r'''#!/bin/sh
+if [ -n "$FAKE_SYSTEMCTL_LOG" ]; then
+    echo "$1" >> "$FAKE_SYSTEMCTL_LOG"
+fi
+case "$1" in
+list-unit-files)
+    i=0
+    while [ "$i" -lt "$FAKE_SYSTEMCTL_UNITS" ]; do
+        echo "bench-unit-$i.service enabled enabled"
+        i=$((i + 1))
+    done
+    ;;
+show)
+    shift
+    first=1
+    for unit in "$@"; do
+        case "$unit" in
+        --*) continue ;;
+        esac
+        [ "$first" = 1 ] || echo
+        first=0
+        echo "ActiveState=active"
+        echo "UnitFileState=enabled"
+        echo "ExecMainPID=1234"
+        echo "FragmentPath=/etc/systemd/system/$unit"
+        echo "TasksCurrent=3"
+        echo "Restart=no"
+    done
+    ;;
+esac
+'''
+
+
+def per_unit_inventory():
+    services = []
+    for name in SystemdManager.list_service_units():
+        status = SystemdManager.get_service_status(name)
+        if status:
+            services.append(status)
+    return services
+
+
+def run(label, func, repeat, log_path):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        open(log_path, 'w').close()
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    with open(log_path, 'r', encoding='utf-8') as f:
+        spawns = sum(1 for _ in f)
+    best = min(timings) * 1000.0
+    avg = sum(timings) / len(timings) * 1000.0
+    print(f"{label:<10} best {best:9.1f} ms   avg {avg:9.1f} ms   systemctl spawns {spawns:5d}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--units', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fake = os.path.join(tmp, 'systemctl')
+        with open(fake, 'w', encoding='utf-8') as f:
+            f.write(FAKE_SYSTEMCTL)
+        os.chmod(fake, os.stat(fake).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+        log_path = os.path.join(tmp, 'calls.log')
+        os.environ['PATH'] = tmp + os.pathsep + os.environ.get('PATH', '')
+        os.environ['FAKE_SYSTEMCTL_UNITS'] = str(args.units)
+        os.environ['FAKE_SYSTEMCTL_LOG'] = log_path
+
+        print(f"{args.units} units, {args.repeat} runs each")
+        per_unit = run('per-unit', per_unit_inventory, args.repeat, log_path)
+        batched = run('batched', SystemdManager.get_all_services, args.repeat, log_path)
+
+        if per_unit != batched:
+            print('MISMATCH: batched inventory differs from the per-unit inventory')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
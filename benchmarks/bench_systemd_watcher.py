@@ -0,0 +1,230 @@
+"""Signal-to-update latency of the D-Bus service watcher, against a fake systemd.
+
+A private `dbus-daemon` is started and a fake `org.freedesktop.systemd1` is
+served on it (Manager.Subscribe, Properties.GetAll, PropertiesChanged), so this
+runs on any machine with dbus-daemon and jeepney installed. Each round flips one
+unit's ActiveState and times the watcher's `on_change`; a PropertiesChanged
+that changes nothing must not call it.
+
+    python benchmarks/bench_systemd_watcher.py --units 300 --rounds 50
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jeepney import (  # noqa: E402
+    DBusAddress,
+    HeaderFields,
+    MessageType,
+    message_bus,
+    new_error,
+    new_method_return,
+    new_signal,
+)
+from jeepney.io.blocking import open_dbus_connection  # noqa: E402
+
+from systemd_watcher import (  # noqa: E402
+    PROPERTIES_INTERFACE,
+    SERVICE_INTERFACE,
+    SYSTEMD_BUS_NAME,
+    SYSTEMD_PATH,
+    SYSTEMD_UNIT_PATH,
+    UNIT_INTERFACE,
+    SystemdWatcher,
+)
+
+BUS_CONFIG = '''<!DOCTYPE busconfig PUBLIC "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>session</type>
+  <listen>unix:dir={dir}</listen>
+  <policy context="default">
+    <allow send_destination="*" eavesdrop="true"/>
+    <allow eavesdrop="true"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+'''
+
+
+def unit_path(name):
+    # systemd's bus label escaping: everything but [A-Za-z0-9] becomes _XX.
+    return SYSTEMD_UNIT_PATH + '/' + ''.join(c if c.isalnum() else f'_{ord(c):02x}' for c in name)
+
+
+class FakeSystemd:
+    """Serves unit properties from `units` (name -> {'active': bool}) on the bus."""
+
+    def __init__(self, address, count):
+        self.units = {f'bench-unit-{i}.service': {'active': True} for i in range(count)}
+        self.paths = {unit_path(name): name for name in self.units}
+        self.conn = open_dbus_connection(bus=address)
+        self.conn.send_and_get_reply(message_bus.RequestName(SYSTEMD_BUS_NAME))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def record(self, name):
+        """The record SystemdWatcher builds for `name` (also what the loader returns)."""
+        return {
+            'name': name,
+            'active': self.units[name]['active'],
+            'enabled': True,
+            'main_pid': '1234' if self.units[name]['active'] else '0',
+            'fragment_path': f'/etc/systemd/system/{name}',
+            'tasks': '3',
+        }
+
+    def _properties(self, name, interface):
+        unit = self.units[name]
+        if interface == UNIT_INTERFACE:
+            return {
+                'ActiveState': ('s', 'active' if unit['active'] else 'inactive'),
+                'UnitFileState': ('s', 'enabled'),
+                'FragmentPath': ('s', f'/etc/systemd/system/{name}'),
+            }
+        return {
+            'ExecMainPID': ('u', 1234 if unit['active'] else 0),
+            'TasksCurrent': ('t', 3),
+        }
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                msg = self.conn.receive(timeout=0.5)
+            except TimeoutError:
+                continue
+            except Exception:
+                return
+            if msg.header.message_type != MessageType.method_call:
+                continue
+            member = msg.header.fields.get(HeaderFields.member)
+            path = msg.header.fields.get(HeaderFields.path)
+            if member == 'Subscribe' and path == SYSTEMD_PATH:
+                reply = new_method_return(msg)
+            elif member == 'GetAll' and path in self.paths:
+                with self._lock:
+                    props = self._properties(self.paths[path], msg.body[0])
+                reply = new_method_return(msg, 'a{sv}', (props,))
+            else:
+                reply = new_error(msg, 'org.freedesktop.DBus.Error.UnknownMethod', 's', (f'{member} on {path}',))
+            self.conn.send(reply)
+
+    def changed(self, name, interface=UNIT_INTERFACE):
+        """Emit PropertiesChanged for `name` with its current state."""
+        with self._lock:
+            props = self._properties(name, interface)
+        address = DBusAddress(unit_path(name), interface=PROPERTIES_INTERFACE)
+        self.conn.send(new_signal(address, 'PropertiesChanged', 'sa{sv}as', (interface, props, [])))
+
+    def set_active(self, name, active):
+        with self._lock:
+            self.units[name]['active'] = active
+        self.changed(name)
+        self.changed(name, SERVICE_INTERFACE)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        self.conn.close()
+
+
+def start_bus(tmp):
+    config = os.path.join(tmp, 'bus.conf')
+    with open(config, 'w', encoding='utf-8') as f:
+        f.write(BUS_CONFIG.format(dir=tmp))
+    daemon = subprocess.Popen(
+        ['dbus-daemon', f'--config-file={config}', '--nofork', '--print-address'],
+        stdout=subprocess.PIPE,
+    )
+    address = daemon.stdout.readline().decode().strip()
+    return daemon, address
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--units', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--debounce', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if shutil.which('dbus-daemon') is None:
+        print('dbus-daemon not found')
+        return 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        daemon, address = start_bus(tmp)
+        fake = FakeSystemd(address, args.units)
+        names = list(fake.units)
+        updates = []
+        updated = threading.Event()
+
+        def on_change(services):
+            updates.append(services)
+            updated.set()
+
+        watcher = SystemdWatcher(
+            on_change,
+            bus=address,
+            loader=lambda: [fake.record(name) for name in names],
+            debounce=args.debounce,
+        )
+        try:
+            if not watcher.start():
+                print('watcher did not start')
+                return 1
+
+            timings = []
+            failures = 0
+            noisy = False
+            for i in range(args.rounds):
+                name = names[i % len(names)]
+                updated.clear()
+                started = time.perf_counter()
+                fake.set_active(name, not fake.units[name]['active'])
+                if not updated.wait(5.0):
+                    failures += 1
+                    continue
+                timings.append(time.perf_counter() - started)
+                current = {s['name']: s for s in updates[-1]}
+                if current.get(name) != fake.record(name):
+                    failures += 1
+
+            # Same values again: the watcher must stay quiet.
+            before = len(updates)
+            fake.changed(names[0])
+            time.sleep(args.debounce + 0.5)
+            if len(updates) != before:
+                print('MISMATCH: on_change called for a signal that changed nothing')
+                noisy = True
+        finally:
+            watcher.stop()
+            fake.close()
+            daemon.terminate()
+            daemon.wait()
+
+    if timings:
+        timings.sort()
+        best = timings[0] * 1000.0
+        avg = sum(timings) / len(timings) * 1000.0
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000.0
+        print(
+            f"{args.units} units, {len(timings)}/{args.rounds} updates, debounce {args.debounce * 1000:.0f} ms: "
+            f"best {best:.1f} ms   avg {avg:.1f} ms   p95 {p95:.1f} ms"
+        )
+    if failures:
+        print(f'MISMATCH: {failures} rounds without the expected update')
+    return 1 if failures or noisy else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""Per-service resource accounting read straight from the cgroup v2 hierarchy.
+
+One sweep walks the slices under the unified hierarchy and reads `cpu.stat`,
+`memory.current`, `memory.peak`, `io.stat` and `pids.current` of every
+`*.service` cgroup; no `systemctl` is run. CPU and IO rates are computed
+against the previous sweep.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+import psutil
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+
+def find_unified_root() -> str | None:
+    for path in (CGROUP_ROOT, os.path.join(CGROUP_ROOT, 'unified')):
+        if os.path.exists(os.path.join(path, 'cgroup.controllers')):
+            return path
+    return None
+
+
+def _read_text(path: str) -> str | None:
+    try:
+        with open(path, 'r', encoding='ascii') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_int(path: str) -> int | None:
+    text = _read_text(path)
+    if text is None:
+        return None
+    text = text.strip()
+    # memory.max & co. use 'max' for "unlimited".
+    return int(text) if text.isdigit() else None
+
+
+def _cpu_usage_usec(path: str) -> int | None:
+    text = _read_text(os.path.join(path, 'cpu.stat'))
+    if text is None:
+        return None
+    for line in text.splitlines():
+        key, _, value = line.partition(' ')
+        if key == 'usage_usec':
+            return int(value)
+    return None
+
+
+def _io_bytes(path: str) -> tuple[int, int] | None:
+    # Lines look like: "8:0 rbytes=1 wbytes=2 rios=3 wios=4 dbytes=0 dios=0"
+    text = _read_text(os.path.join(path, 'io.stat'))
+    if text is None:
+        return None
+    rbytes = wbytes = 0
+    for line in text.splitlines():
+        for field in line.split()[1:]:
+            key, _, value = field.partition('=')
+            if key == 'rbytes':
+                rbytes += int(value)
+            elif key == 'wbytes':
+                wbytes += int(value)
+    return rbytes, wbytes
+
+
+def _rate(current, previous, elapsed: float) -> float | None:
+    if current is None or previous is None or elapsed <= 0 or current < previous:
+        return None
+    return (current - previous) / elapsed
+
+
+class CgroupSampler:
+    """Sweeps all service cgroups; `sample()` reuses a sweep younger than `max_age`."""
+
+    def __init__(self, root: str | None = None, max_age: float = 1.0):
+        self.root = root or find_unified_root()
+        self.max_age = max_age
+        self._previous: dict[str, tuple] = {}
+        self._snapshot: dict[str, dict] = {}
+        self._sampled_at = 0.0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return self.root is not None
+
+    def _service_cgroups(self) -> dict[str, str]:
+        """unit name -> cgroup path; descends into slices only, never into services."""
+        found: dict[str, str] = {}
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if not entry.is_dir(follow_symlinks=False):
+                            continue
+                        if entry.name.endswith('.service'):
+                            found[entry.name] = entry.path
+                        elif entry.name.endswith('.slice'):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        return found
+
+    def sample(self, max_age: float | None = None) -> dict[str, dict]:
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            now = time.monotonic()
+            if self.root is None or now - self._sampled_at < max_age:
+                return self._snapshot
+
+            cores = psutil.cpu_count() or 1
+            snapshot: dict[str, dict] = {}
+            current: dict[str, tuple] = {}
+            for unit, path in self._service_cgroups().items():
+                usage = _cpu_usage_usec(path)
+                io = _io_bytes(path)
+                rbytes, wbytes = io if io is not None else (None, None)
+                current[unit] = (now, usage, rbytes, wbytes)
+
+                cpu_percent = io_read_rate = io_write_rate = None
+                previous = self._previous.get(unit)
+                if previous is not None:
+                    elapsed = now - previous[0]
+                    usage_rate = _rate(usage, previous[1], elapsed)
+                    if usage_rate is not None:
+                        # usec of CPU per second -> percent of the whole machine.
+                        cpu_percent = round(usage_rate / 10_000.0 / cores, 2)
+                    io_read_rate = _rate(rbytes, previous[2], elapsed)
+                    io_write_rate = _rate(wbytes, previous[3], elapsed)
+                    io_read_rate = round(io_read_rate, 1) if io_read_rate is not None else None
+                    io_write_rate = round(io_write_rate, 1) if io_write_rate is not None else None
+
+                snapshot[unit] = {
+                    'cpu_usage_usec': usage,
+                    'cpu_percent': cpu_percent,
+                    'memory_current': _read_int(os.path.join(path, 'memory.current')),
+                    'memory_peak': _read_int(os.path.join(path, 'memory.peak')),
+                    'io_read_bytes': rbytes,
+                    'io_write_bytes': wbytes,
+                    'io_read_rate': io_read_rate,
+                    'io_write_rate': io_write_rate,
+                    'pids': _read_int(os.path.join(path, 'pids.current')),
+                }
+
+            # Units that went away are dropped with the old sweep.
+            self._previous = current
+            self._snapshot = snapshot
+            self._sampled_at = now
+            return snapshot
+
+
+cgroup_sampler = CgroupSampler()
+
+
+__all__ = ['CgroupSampler', 'cgroup_sampler']
@@ -6,6 +6,45 @@ CONFIG_FILE = 'config.json'
 
 MAX_MQTT_CONNECTION_HISTORY = 10
 
+DEFAULT_SERVICE_CACHE_TTL = 2.0
+
+DEFAULT_JOURNAL_INDEX_SETTINGS = {
+    'enabled': True,
+    'path': 'journal_index.db',
+    'max_entries': 2_000_000,
+    'max_age_days': 7,
+    'interval': 5.0,
+}
+
+DEFAULT_METRICS_ARCHIVE_SETTINGS = {
+    'enabled': True,
+    'path': 'metrics_archive.bin',
+    'retention_days': 30,
+    'interval': 10.0,
+}
+
+DEFAULT_PROMETHEUS_SETTINGS = {
+    'enabled': True,
+    # Scrapers send "Authorization: Bearer <token>"; while empty only logged-in sessions can read /metrics.
+    'bearer_token': '',
+    'top_processes': 10,
+    'cache_seconds': 5.0,
+}
+
+# (config.json mtime_ns, settings) of the last read, see get_prometheus_settings.
+_prometheus_settings = None
+
+DEFAULT_FILENAME_INDEX_SETTINGS = {
+    'enabled': True,
+    'path': 'filename_index.bin',
+    'roots': ['/etc', '/home', '/opt', '/root', '/srv', '/usr', '/var'],
+    'exclude': ['/var/cache', '/var/lib/docker', '/var/tmp'],
+    # About 130 bytes of memory per indexed path.
+    'max_paths': 500_000,
+    # Seconds between rescans; unchanged directories cost one stat each.
+    'interval': 300.0,
+}
+
 
 def load_config() -> dict:
     if not os.path.exists(CONFIG_FILE):
@@ -29,6 +68,28 @@ def load_config() -> dict:
         config['services'] = {}
     if 'favorites' not in config['services']:
         config['services']['favorites'] = []
+    if 'cache_ttl' not in config['services']:
+        config['services']['cache_ttl'] = DEFAULT_SERVICE_CACHE_TTL
+
+    if 'journal_index' not in config or not isinstance(config['journal_index'], dict):
+        config['journal_index'] = {}
+    for key, value in DEFAULT_JOURNAL_INDEX_SETTINGS.items():
+        config['journal_index'].setdefault(key, value)
+
+    if 'metrics_archive' not in config or not isinstance(config['metrics_archive'], dict):
+        config['metrics_archive'] = {}
+    for key, value in DEFAULT_METRICS_ARCHIVE_SETTINGS.items():
+        config['metrics_archive'].setdefault(key, value)
+
+    if 'prometheus' not in config or not isinstance(config['prometheus'], dict):
+        config['prometheus'] = {}
+    for key, value in DEFAULT_PROMETHEUS_SETTINGS.items():
+        config['prometheus'].setdefault(key, value)
+
+    if 'filename_index' not in config or not isinstance(config['filename_index'], dict):
+        config['filename_index'] = {}
+    for key, value in DEFAULT_FILENAME_INDEX_SETTINGS.items():
+        config['filename_index'].setdefault(key, value)
 
     if 'folders' not in config:
         config['folders'] = {}
@@ -81,6 +142,45 @@ def load_config() -> dict:
     return config
 
 
+def get_service_cache_ttl() -> float:
+    config = load_config()
+    try:
+        return max(0.0, float(config['services'].get('cache_ttl', DEFAULT_SERVICE_CACHE_TTL)))
+    except Exception:
+        return DEFAULT_SERVICE_CACHE_TTL
+
+
+def get_journal_index_settings() -> dict:
+    config = load_config()
+    return dict(config['journal_index'])
+
+
+def get_metrics_archive_settings() -> dict:
+    config = load_config()
+    return dict(config['metrics_archive'])
+
+
+def get_prometheus_settings() -> dict:
+    """Read per scrape, so the parsed settings are reused until config.json changes."""
+    global _prometheus_settings
+    try:
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+    cached = _prometheus_settings
+    if cached is not None and mtime is not None and cached[0] == mtime:
+        return dict(cached[1])
+    settings = dict(load_config()['prometheus'])
+    if mtime is not None:
+        _prometheus_settings = (mtime, settings)
+    return dict(settings)
+
+
+def get_filename_index_settings() -> dict:
+    config = load_config()
+    return dict(config['filename_index'])
+
+
 def get_mqtt_connection_settings() -> dict:
     config = load_config()
     return config.get('mqtt', {}).get('connections', {'history': [], 'last': {'host': 'localhost', 'port': 1883}})
@@ -109,8 +209,10 @@ def save_mqtt_connection(host: str, port: int) -> None:
 
 
 def save_config(config: dict) -> None:
+    global _prometheus_settings
     with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
         json.dump(config, f, indent=2)
+    _prometheus_settings = None
 
 
 def save_favorites(favorites: list) -> None:
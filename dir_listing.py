@@ -0,0 +1,287 @@
+"""Directory listings for the file explorer.
+
+A listing is one `os.scandir` pass: the entry type comes from the directory
+read and `DirEntry.stat()` is the only per-entry syscall (symlinks are
+followed, as `Path.stat()` did); the executable bit is derived from that
+stat instead of an `os.access` call. A listing is kept as a snapshot for the
+cursor pages that follow it, so paging through a large directory scans and
+sorts it once. A fresh listing reuses a snapshot only for a couple of seconds,
+since files growing in place or changing mode leave the directory's mtime
+alone.
+
+`query_files` sorts, filters, pages (keyset cursor) and projects a listing.
+`listing_etag` derives a validator from the directory's identity, the state
+of its entries and the query, so a client revalidating an unchanged folder
+gets a 304 without the body being built or sent.
+"""
+
+from __future__ import annotations
+
+import base64
+import bisect
+import hashlib
+import json
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+
+FILE_LIST_FIELDS = ('name', 'path', 'is_directory', 'is_executable', 'size', 'permissions', 'modified')
+FILE_SORT_KEYS = {
+    'name': lambda f: f['name'].lower(),
+    'size': lambda f: f['size'],
+    'modified': lambda f: f['modified'],
+    'type': lambda f: os.path.splitext(f['name'])[1].lower(),
+}
+FILE_TYPE_FILTERS = {
+    'folders': None,
+    'files': None,
+    'images': ('png', 'jpg', 'jpeg', 'gif', 'bmp', 'svg', 'webp'),
+    'code': ('js', 'py', 'html', 'css', 'json', 'xml', 'php', 'java', 'cpp', 'c', 'h', 'sh'),
+    'documents': ('txt', 'pdf', 'doc', 'docx', 'md', 'rtf', 'odt'),
+}
+# Query parameters that change the response body (and so the ETag).
+QUERY_PARAMS = ('sort', 'order', 'dirs_first', 'type', 'q', 'limit', 'cursor', 'fields')
+# How long a snapshot answers a fresh listing, and the cursor pages following one.
+FRESH_LISTING_SECONDS = 2.0
+PAGED_LISTING_SECONDS = 120.0
+# Orderings kept per snapshot (distinct sort/filter combinations).
+MAX_VIEWS = 8
+
+
+def _is_executable(st: os.stat_result) -> bool:
+    """What os.access(X_OK) answers for a regular file, from its stat."""
+    if not stat.S_ISREG(st.st_mode):
+        return False
+    if os.geteuid() == 0:
+        return bool(st.st_mode & 0o111)
+    if st.st_uid == os.geteuid():
+        return bool(st.st_mode & stat.S_IXUSR)
+    if st.st_gid == os.getegid() or st.st_gid in os.getgroups():
+        return bool(st.st_mode & stat.S_IXGRP)
+    return bool(st.st_mode & stat.S_IXOTH)
+
+
+def file_entry(name: str, path: str, st: os.stat_result) -> dict:
+    return {
+        'name': name,
+        'path': path,
+        'is_directory': stat.S_ISDIR(st.st_mode),
+        'is_executable': _is_executable(st),
+        'size': st.st_size if stat.S_ISREG(st.st_mode) else 0,
+        'permissions': stat.filemode(st.st_mode),
+        'modified': st.st_mtime,
+    }
+
+
+def scan_directory(path: str) -> list[dict]:
+    files = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                st = entry.stat()
+            except OSError:
+                # Dangling symlink or entry removed while listing.
+                continue
+            files.append(file_entry(entry.name, entry.path, st))
+    return files
+
+
+class ListingSnapshot:
+    """One stat pass over a directory, plus the sorted/filtered views paged from it."""
+
+    __slots__ = ('mtime_ns', 'taken_at', 'files', 'state', 'views')
+
+    def __init__(self, mtime_ns: int, files: list[dict]):
+        self.mtime_ns = mtime_ns
+        self.taken_at = time.monotonic()
+        self.files = files
+        self.state = listing_state(files)
+        # (sort, order, dirs_first, type, q) -> ordered rows, see query_files.
+        self.views: dict[tuple, list[dict]] = {}
+
+
+class DirectoryListingCache:
+    """Recent listing snapshots, keyed by (dev, inode, path).
+
+    A snapshot is reused while the directory's mtime is unchanged and it is
+    younger than the `max_age` the caller passes: a short one for a fresh
+    listing (entries can change size or mode without touching the directory's
+    mtime) and a longer one for the cursor pages that follow it, so paging
+    through a large directory stats it once. At most `max_files` entries are
+    kept across all snapshots.
+    """
+
+    def __init__(self, max_files: int = 250_000, max_snapshots: int = 64):
+        self.max_files = max_files
+        self.max_snapshots = max_snapshots
+        self._snapshots: OrderedDict[tuple, ListingSnapshot] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, st: os.stat_result, max_age: float) -> ListingSnapshot:
+        key = (st.st_dev, st.st_ino, path)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if (
+                snapshot is not None
+                and snapshot.mtime_ns == st.st_mtime_ns
+                and time.monotonic() - snapshot.taken_at <= max_age
+            ):
+                self._snapshots.move_to_end(key)
+                return snapshot
+        snapshot = ListingSnapshot(st.st_mtime_ns, scan_directory(path))
+        try:
+            changed = os.stat(path).st_mtime_ns != st.st_mtime_ns
+        except OSError:
+            changed = True
+        if not changed:
+            with self._lock:
+                self._snapshots[key] = snapshot
+                self._snapshots.move_to_end(key)
+                total = sum(len(s.files) for s in self._snapshots.values())
+                while total > self.max_files or len(self._snapshots) > self.max_snapshots:
+                    _, dropped = self._snapshots.popitem(last=False)
+                    total -= len(dropped.files)
+        return snapshot
+
+
+directory_listings = DirectoryListingCache()
+
+
+def listing_state(files: list[dict]) -> str:
+    """Digest of what a listing shows, for `listing_etag`."""
+    digest = hashlib.sha1()
+    for f in sorted(files, key=lambda f: f['name']):
+        line = f"{f['name']}\0{f['size']}\0{f['modified']}\0{f['permissions']}\0{f['is_executable']}\n"
+        digest.update(line.encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+
+def listing_etag(st: os.stat_result, args, state) -> str:
+    """`state` identifies the listing's content: a watch version or `listing_state()`."""
+    query = '&'.join(f'{name}={args.get(name, "")}' for name in QUERY_PARAMS)
+    digest = hashlib.sha1(f'{st.st_dev}:{st.st_ino}:{state}?{query}'.encode()).hexdigest()
+    return digest[:24]
+
+
+def _encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return tuple(json.loads(base64.urlsafe_b64decode(padded)))
+    except (ValueError, TypeError) as e:
+        raise ValueError('bad cursor') from e
+
+
+def query_files(files: list[dict], args, views: dict | None = None) -> dict:
+    """Filter, order, page and project a listing according to query `args`.
+
+    `sort` (name|size|modified|type) and `order` (asc|desc), `dirs_first`
+    (default 1), `type` (folders|files|images|code|documents), `q` (name
+    substring, case-insensitive), `limit`, `cursor` (from the previous
+    page's `next_cursor`) and `fields` (comma separated). The cursor names
+    the last entry returned, so pages stay consistent when entries are
+    added or removed between requests. Raises ValueError on bad parameters.
+
+    `views` (a `ListingSnapshot.views`) keeps the filtered, ordered rows so
+    later pages of the same listing only bisect to their cursor.
+    """
+    sort = args.get('sort') or 'name'
+    sort_key = FILE_SORT_KEYS.get(sort)
+    if sort_key is None:
+        raise ValueError(f'unknown sort key: {sort}')
+    order = args.get('order') or 'asc'
+    if order not in ('asc', 'desc'):
+        raise ValueError('order must be asc or desc')
+    dirs_first = (args.get('dirs_first') or '1') != '0'
+
+    file_type = args.get('type') or ''
+    if file_type and file_type not in FILE_TYPE_FILTERS:
+        raise ValueError(f'unknown type filter: {file_type}')
+
+    fields = [f.strip() for f in (args.get('fields') or '').split(',') if f.strip()]
+    unknown = [f for f in fields if f not in FILE_LIST_FIELDS]
+    if unknown:
+        raise ValueError(f'unknown fields: {", ".join(unknown)}')
+
+    limit = int(args['limit']) if args.get('limit') not in (None, '') else None
+    if limit is not None and limit < 0:
+        raise ValueError('limit must not be negative')
+    cursor = _decode_cursor(args['cursor']) if args.get('cursor') else None
+
+    needle = (args.get('q') or '').lower()
+
+    def key(f) -> tuple:
+        # Directory group first (always ascending), then the sort value with the name as tie-break.
+        return (0 if dirs_first and f['is_directory'] else 1, sort_key(f), f['name'])
+
+    desc = order == 'desc'
+    view = (sort, order, dirs_first, file_type, needle)
+    rows = views.get(view) if views is not None else None
+    if rows is None:
+        rows = _ordered_rows(files, key, desc, file_type, needle)
+        if views is not None:
+            if len(views) >= MAX_VIEWS:
+                views.clear()
+            views[view] = rows
+    total = len(rows)
+
+    start = 0
+    if cursor is not None:
+        def after(f) -> bool:
+            k = key(f)
+            if k[0] != cursor[0]:
+                return k[0] > cursor[0]
+            return k[1:] < tuple(cursor[1:]) if desc else k[1:] > tuple(cursor[1:])
+
+        try:
+            start = bisect.bisect_left(rows, True, key=after)
+        except TypeError as e:
+            raise ValueError('cursor does not match sort') from e
+
+    end = total if limit is None else min(total, start + limit)
+    page = rows[start:end]
+    next_cursor = _encode_cursor(key(page[-1])) if page and end < total else None
+
+    if fields:
+        page = [{f: row[f] for f in fields} for row in page]
+    return {'total': total, 'limit': limit, 'next_cursor': next_cursor, 'files': page}
+
+
+def _ordered_rows(files: list[dict], key, desc: bool, file_type: str, needle: str) -> list[dict]:
+    if file_type or needle:
+        extensions = FILE_TYPE_FILTERS.get(file_type)
+
+        def matches(f) -> bool:
+            if file_type == 'folders' and not f['is_directory']:
+                return False
+            if file_type == 'files' and f['is_directory']:
+                return False
+            if extensions is not None and f['name'].rpartition('.')[2].lower() not in extensions:
+                return False
+            return not needle or needle in f['name'].lower()
+
+        files = [f for f in files if matches(f)]
+
+    rows = sorted(files, key=lambda f: key(f)[1:], reverse=desc)
+    rows.sort(key=lambda f: key(f)[0])
+    return rows
+
+
+__all__ = [
+    'DirectoryListingCache',
+    'FILE_LIST_FIELDS',
+    'FILE_SORT_KEYS',
+    'FRESH_LISTING_SECONDS',
+    'ListingSnapshot',
+    'PAGED_LISTING_SECONDS',
+    'directory_listings',
+    'file_entry',
+    'listing_etag',
+    'query_files',
+    'scan_directory',
+]
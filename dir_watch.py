@@ -0,0 +1,356 @@
+"""Live directory listings backed by inotify.
+
+Directories that are open in the explorer (or were listed recently) get an
+inotify watch (`inotify_init1` / `inotify_add_watch` / `inotify_rm_watch`
+through ctypes). Each watch keeps the directory's listing in memory and
+applies events to it by name: created, modified and moved-in entries are
+re-stat'ed, deleted and moved-out ones dropped. Nothing is rescanned unless
+the kernel queue overflows. Changes are coalesced for COALESCE_SECONDS and
+pushed as one `dir_delta` per directory to the room `dir:<path>`.
+
+Watches are keyed by the directory's real path, but listings and deltas
+carry the path the client asked for: `/lib` stays `/lib` even though it
+resolves to `/usr/lib`. Watches are reference counted by the socket ids
+viewing the directory (under any of its paths).
+Unreferenced watches stay as a listing cache and are evicted least recently
+used first, keeping the total under `max_watches` (derived from
+`fs.inotify.max_user_watches`, which the whole user shares). Without inotify
+(non-Linux, no instances left) `listing()` returns None and callers scan.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import itertools
+import os
+import select
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from dir_listing import file_entry, scan_directory
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK
+)
+REMOVE_EVENTS = IN_DELETE | IN_MOVED_FROM
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+MAX_USER_WATCHES = '/proc/sys/fs/inotify/max_user_watches'
+# Listings above this many entries are not kept in memory; deltas still flow.
+MAX_CACHED_ENTRIES = 20000
+COALESCE_SECONDS = 0.1
+MAX_DELAY_SECONDS = 0.5
+
+# Listing versions are global so a re-created watch never repeats an ETag.
+_versions = itertools.count(1)
+
+
+def _room(path: str) -> str:
+    return f'dir:{path}'
+
+
+def _rebase(entries: list[dict], path: str) -> list[dict]:
+    """`entries` with their `path` under `path` instead of the watched real path."""
+    return [{**entry, 'path': os.path.join(path, entry['name'])} for entry in entries]
+
+
+def _default_max_watches() -> int:
+    try:
+        with open(MAX_USER_WATCHES) as f:
+            user_limit = int(f.read())
+    except (OSError, ValueError):
+        user_limit = 8192
+    # Leave most of the per-user budget to other inotify users (editors, systemd, ...).
+    return max(16, min(1024, user_limit // 8))
+
+
+class Inotify:
+    """Thin ctypes wrapper over the inotify syscalls."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm_watch(self.fd, wd)
+
+    def read(self) -> list[tuple[int, int, str]]:
+        """Pending events as (wd, mask, name); empty when none are queued."""
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class _Watch:
+    __slots__ = ('path', 'wd', 'refs', 'files', 'oversized', 'version', 'pending', 'pending_since')
+
+    def __init__(self, path: str, wd: int):
+        self.path = path
+        self.wd = wd
+        # Requested path -> socket ids viewing the directory under it.
+        self.refs: dict[str, set[str]] = {}
+        # name -> entry; None until first listed (or if `oversized`).
+        self.files: dict[str, dict] | None = None
+        self.oversized = False
+        self.version = next(_versions)
+        # name -> mask bits seen since the last flush.
+        self.pending: dict[str, int] = {}
+        self.pending_since = 0.0
+
+
+class DirectoryWatchManager:
+    def __init__(self, max_watches: int | None = None):
+        self.max_watches = max_watches or _default_max_watches()
+        self._inotify: Inotify | None = None
+        self._unavailable = False
+        self._watches: OrderedDict[str, _Watch] = OrderedDict()
+        self._by_wd: dict[int, _Watch] = {}
+        self._thread: threading.Thread | None = None
+        self._lock = threading.RLock()
+        self._socketio = None
+
+    def init_socketio(self, socketio) -> None:
+        self._socketio = socketio
+
+    def _emit(self, event: str, payload: dict, path: str) -> None:
+        if self._socketio is not None:
+            self._socketio.emit(event, payload, room=_room(path), namespace='/')
+
+    def _ensure_inotify(self) -> Inotify | None:
+        if self._inotify is None and not self._unavailable:
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError):
+                self._unavailable = True
+                return None
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self._inotify
+
+    def _watch(self, path: str) -> _Watch | None:
+        """Existing or new watch for `path` (a real path), most recently used last."""
+        watch = self._watches.get(path)
+        if watch is not None:
+            self._watches.move_to_end(path)
+            return watch
+        inotify = self._ensure_inotify()
+        if inotify is None or not self._make_room():
+            return None
+        try:
+            wd = inotify.add_watch(path, WATCH_MASK)
+        except OSError:
+            return None
+        watch = self._by_wd.get(wd)
+        if watch is not None:
+            # Same directory under another path (bind mount): inotify returns the same wd.
+            return watch
+        watch = _Watch(path, wd)
+        self._watches[path] = watch
+        self._by_wd[wd] = watch
+        return watch
+
+    def _make_room(self) -> bool:
+        while len(self._watches) >= self.max_watches:
+            victim = next((w for w in self._watches.values() if not w.refs), None)
+            if victim is None:
+                return False
+            self._drop(victim, remove=True)
+        return True
+
+    def _drop(self, watch: _Watch, remove: bool) -> None:
+        self._watches.pop(watch.path, None)
+        self._by_wd.pop(watch.wd, None)
+        if remove and self._inotify is not None:
+            self._inotify.rm_watch(watch.wd)
+
+    def listing(self, path: str) -> tuple[list[dict], int] | None:
+        """(entries, version) of a directory kept current by events, or None.
+
+        Entry paths are under `path` as given. Registers an (unreferenced)
+        watch on first use; returns None if no watch can be had or the
+        directory is too large to keep in memory.
+        """
+        with self._lock:
+            watch = self._watch(os.path.realpath(path))
+            if watch is None or watch.oversized:
+                return None
+            if watch.files is None:
+                # The watch exists before the scan, so nothing in between is missed.
+                files = scan_directory(watch.path)
+                if len(files) > MAX_CACHED_ENTRIES:
+                    watch.oversized = True
+                    return None
+                watch.files = {f['name']: f for f in files}
+            else:
+                # Apply events already queued in the kernel, so changes made just
+                # before this request (by the request's own client, say) are in.
+                for wd, mask, name in self._inotify.read():
+                    self._queue(wd, mask, name, time.monotonic())
+                if watch.files is None or self._by_wd.get(watch.wd) is not watch:
+                    return None
+            delta = self._flush(watch) if watch.pending else None
+            files = list(watch.files.values())
+            version = watch.version
+        if delta is not None:
+            self._emit_all('dir_delta', delta, watch)
+        return (files if path == watch.path else _rebase(files, path)), version
+
+    def subscribe(self, sid: str, path: str) -> bool:
+        """Reference `path` for `sid`; False if no watch is possible.
+
+        Events for it go to the room of `path` as given.
+        """
+        with self._lock:
+            watch = self._watch(os.path.realpath(path))
+            if watch is None:
+                return False
+            watch.refs.setdefault(path, set()).add(sid)
+            return True
+
+    def unsubscribe(self, sid: str, path: str | None = None) -> None:
+        """Drop `sid`'s reference to `path`, or to every directory if `path` is None."""
+        with self._lock:
+            for watch in self._watches.values():
+                for requested in [p for p in watch.refs if path is None or p == path]:
+                    watch.refs[requested].discard(sid)
+                    if not watch.refs[requested]:
+                        del watch.refs[requested]
+
+    def _emit_all(self, event: str, payload: dict, watch: _Watch) -> None:
+        """Send `payload` to the room of every path `watch` is viewed under."""
+        for requested in list(watch.refs):
+            data = dict(payload, path=requested)
+            if requested != watch.path:
+                for key in ('added', 'changed'):
+                    if key in data:
+                        data[key] = _rebase(data[key], requested)
+            self._emit(event, data, requested)
+
+    def _run(self) -> None:
+        inotify = self._inotify
+        while True:
+            with self._lock:
+                waiting = any(w.pending for w in self._watches.values())
+            try:
+                readable, _, _ = select.select([inotify.fd], [], [], COALESCE_SECONDS if waiting else 1.0)
+            except (OSError, ValueError):
+                return
+            now = time.monotonic()
+            with self._lock:
+                if readable:
+                    for wd, mask, name in inotify.read():
+                        self._queue(wd, mask, name, now)
+                ready = [
+                    w for w in self._watches.values()
+                    if w.pending and (not readable or now - w.pending_since >= MAX_DELAY_SECONDS)
+                ]
+                deltas = [(w, self._flush(w)) for w in ready]
+            for watch, delta in deltas:
+                if delta is not None:
+                    self._emit_all('dir_delta', delta, watch)
+
+    def _queue(self, wd: int, mask: int, name: str, now: float) -> None:
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost: forget every listing and have clients reload.
+            for watch in self._watches.values():
+                watch.files = None
+                watch.pending.clear()
+                watch.version = next(_versions)
+                self._emit_all('dir_resync', {}, watch)
+            return
+        watch = self._by_wd.get(wd)
+        if watch is None:
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+            self._drop(watch, remove=not mask & IN_IGNORED)
+            self._emit_all('dir_removed', {}, watch)
+            return
+        if not name:
+            return
+        if not watch.pending:
+            watch.pending_since = now
+        watch.pending[name] = watch.pending.get(name, 0) | mask
+
+    def _flush(self, watch: _Watch) -> dict | None:
+        pending, watch.pending = watch.pending, {}
+        added, changed, removed = [], [], []
+        for name, mask in pending.items():
+            path = os.path.join(watch.path, name)
+            try:
+                entry = file_entry(name, path, os.stat(path))
+            except OSError:
+                entry = None
+            previous = watch.files.get(name) if watch.files is not None else None
+            if entry is None:
+                if watch.files is not None:
+                    watch.files.pop(name, None)
+                if previous is not None or (watch.files is None and mask & REMOVE_EVENTS):
+                    removed.append(name)
+                continue
+            if watch.files is not None:
+                watch.files[name] = entry
+            if previous is None and (watch.files is not None or mask & (IN_CREATE | IN_MOVED_TO)):
+                added.append(entry)
+            elif previous != entry:
+                changed.append(entry)
+        if not (added or changed or removed):
+            return None
+        watch.version = next(_versions)
+        return {'path': watch.path, 'version': watch.version, 'added': added, 'changed': changed, 'removed': removed}
+
+
+dir_watches = DirectoryWatchManager()
+
+
+def dir_watch_cleanup_on_disconnect(sid: str) -> None:
+    dir_watches.unsubscribe(sid)
+
+
+__all__ = ['DirectoryWatchManager', 'Inotify', 'dir_watch_cleanup_on_disconnect', 'dir_watches']
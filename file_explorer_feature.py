@@ -14,6 +14,15 @@ from flask import Blueprint, current_app, jsonify, render_template, request
 from flask_socketio import join_room, leave_room
 
 from config_store import get_folder_preferences, save_folder_preferences
+from dir_listing import (
+    FRESH_LISTING_SECONDS,
+    PAGED_LISTING_SECONDS,
+    directory_listings,
+    listing_etag,
+    query_files,
+)
+from dir_watch import dir_watches
+from scan_jobs import scan_jobs, scan_room
 
 from auth import is_authenticated
 
@@ -40,6 +49,10 @@ class _ExecSession:
 _EXEC_SESSIONS: dict[str, _ExecSession] = {}
 _EXEC_SESSIONS_LOCK = threading.Lock()
 
+# How long /api/folder-size waits for its scan. A request whose client went away
+# cannot be noticed, so the wait is bounded; longer scans belong in scan jobs.
+FOLDER_SIZE_WAIT_SECONDS = 60.0
+
 
 def _get_socketio():
     sock = current_app.extensions.get('socketio')
@@ -142,6 +155,94 @@ def register_file_exec_socket_handlers(socketio):
         leave_room(process_id)
 
 
+def register_scan_socket_handlers(socketio):
+    scan_jobs.init_socketio(socketio)
+
+    @socketio.on('scan_start')
+    def on_scan_start(data):
+        if not is_authenticated():
+            return
+        data = data or {}
+        path = data.get('path')
+        if not path:
+            socketio.emit('scan_error', {'error': 'Path parameter required'}, room=request.sid)
+            return
+        try:
+            job, attached = scan_jobs.start(
+                data.get('kind', 'size'),
+                path,
+                request.sid,
+                one_file_system=bool(data.get('xdev')),
+                on_job=lambda job: join_room(scan_room(job.id)),
+            )
+        except FileNotFoundError:
+            socketio.emit('scan_error', {'path': path, 'error': 'Path does not exist'}, room=request.sid)
+            return
+        except NotADirectoryError:
+            socketio.emit('scan_error', {'path': path, 'error': 'Path is not a directory'}, room=request.sid)
+            return
+        except (ValueError, OSError) as e:
+            socketio.emit('scan_error', {'path': path, 'error': str(e)}, room=request.sid)
+            return
+        # The room was joined before the walk started; if it has finished since, this status carries the result.
+        socketio.emit('scan_started', {**job.status(), 'attached': attached, 'request_path': path}, room=request.sid)
+
+    @socketio.on('scan_join')
+    def on_scan_join(data):
+        if not is_authenticated():
+            return
+        job_id = (data or {}).get('job_id')
+        job = scan_jobs.get(job_id) if job_id else None
+        if job is not None and job.kind == 'list' and job.state == 'running':
+            # Entry batches already sent are not kept, so a late joiner would get part of the listing.
+            socketio.emit(
+                'scan_error',
+                {'job_id': job_id, 'error': 'A running listing cannot be joined; start a new one'},
+                room=request.sid,
+            )
+            return
+        job = scan_jobs.attach(job_id, request.sid) if job_id else None
+        if job is None:
+            socketio.emit('scan_error', {'job_id': job_id, 'error': 'scan_not_found'}, room=request.sid)
+            return
+        join_room(scan_room(job.id))
+        socketio.emit('scan_started', {**job.status(), 'attached': True}, room=request.sid)
+
+    @socketio.on('scan_cancel')
+    def on_scan_cancel(data):
+        job_id = (data or {}).get('job_id')
+        if not job_id:
+            return
+        leave_room(scan_room(job_id))
+        # Stops the walk unless another client is still attached to it.
+        scan_jobs.release(job_id, request.sid)
+
+
+def register_dir_watch_socket_handlers(socketio):
+    dir_watches.init_socketio(socketio)
+
+    @socketio.on('dir_watch')
+    def on_dir_watch(data):
+        if not is_authenticated():
+            return
+        path = (data or {}).get('path')
+        if not path:
+            return
+        if not dir_watches.subscribe(request.sid, path):
+            socketio.emit('dir_watch_error', {'path': path, 'error': 'watch_unavailable'}, room=request.sid)
+            return
+        join_room(f'dir:{path}')
+        socketio.emit('dir_watching', {'path': path}, room=request.sid)
+
+    @socketio.on('dir_unwatch')
+    def on_dir_unwatch(data):
+        path = (data or {}).get('path')
+        if not path:
+            return
+        leave_room(f'dir:{path}')
+        dir_watches.unsubscribe(request.sid, path)
+
+
 def format_size(bytes_size: float) -> str:
     for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
         if bytes_size < 1024.0:
@@ -161,37 +262,37 @@ def build_file_explorer_blueprint() -> Blueprint:
     def get_files():
         try:
             path = request.args.get('path', '/home')
-            path_obj = Path(path)
 
-            if not path_obj.exists():
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
                 return jsonify({'success': False, 'error': 'Path does not exist'})
 
-            if not path_obj.is_dir():
+            if not stat.S_ISDIR(st.st_mode):
                 return jsonify({'success': False, 'error': 'Path is not a directory'})
 
-            files = []
-            for item in path_obj.iterdir():
+            # Watched directories are kept current by inotify, including in-place size changes.
+            live = dir_watches.listing(path)
+            if live:
+                files, state, views = live[0], f'v{live[1]}', None
+            else:
+                # Cursor pages reuse the snapshot their first page came from.
+                max_age = PAGED_LISTING_SECONDS if request.args.get('cursor') else FRESH_LISTING_SECONDS
+                snapshot = directory_listings.get(path, st, max_age)
+                files, state, views = snapshot.files, snapshot.state, snapshot.views
+            etag = listing_etag(st, request.args, state)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
                 try:
-                    stat_info = item.stat()
-
-                    is_dir = item.is_dir()
-                    is_exec = (not is_dir) and _is_executable_file(item)
-
-                    files.append(
-                        {
-                            'name': item.name,
-                            'path': str(item),
-                            'is_directory': is_dir,
-                            'is_executable': is_exec,
-                            'size': stat_info.st_size if item.is_file() else 0,
-                            'permissions': stat.filemode(stat_info.st_mode),
-                            'modified': stat_info.st_mtime,
-                        }
-                    )
-                except (PermissionError, OSError):
-                    continue
-
-            return jsonify({'success': True, 'files': files})
+                    result = query_files(files, request.args, views)
+                except ValueError as e:
+                    return jsonify({'success': False, 'error': str(e)}), 400
+                response = jsonify({'success': True, **result})
+            response.set_etag(etag, weak=True)
+            # Revalidate every time; an unchanged directory costs a 304 instead of the body.
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
         except PermissionError as e:
             return jsonify({'success': False, 'error': f'Permission denied: {str(e)}'})
         except Exception as e:
@@ -212,17 +313,38 @@ def build_file_explorer_blueprint() -> Blueprint:
             if not path_obj.is_dir():
                 return jsonify({'success': False, 'error': 'Path is not a directory'}), 400
 
+            # Shares the walk with a scan job already running for this path.
+            holder = f'http:{uuid.uuid4().hex}'
+            job, _ = scan_jobs.start('size', str(path_obj), holder, one_file_system=request.args.get('xdev') == '1')
             try:
-                total_size = sum(f.stat().st_size for f in path_obj.rglob('*') if f.is_file())
-                size_display = format_size(total_size)
+                finished = job.done.wait(FOLDER_SIZE_WAIT_SECONDS)
+            finally:
+                # Cancels the walk unless a socket client is following the same scan.
+                scan_jobs.release(job.id, holder)
+
+            if not finished:
+                # The walk was released above (unless a socket client follows it), so there is no job to point at.
+                return (
+                    jsonify(
+                        {'success': False, 'error': 'Folder size calculation timed out; use a scan job for large folders'}
+                    ),
+                    504,
+                )
+            if job.state != 'done':
+                return jsonify({'success': False, 'error': job.error or f'Folder size calculation {job.state}'}), 409
 
-                return jsonify({'success': True, 'size': total_size, 'size_display': size_display})
-            except (PermissionError, OSError):
-                return jsonify({'success': False, 'error': 'Permission denied or unable to calculate size'}), 403
+            return jsonify({'success': True, 'size_display': format_size(job.result['size']), **job.result})
 
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @bp.route('/api/scan-jobs/<job_id>')
+    def get_scan_job(job_id: str):
+        job = scan_jobs.get(job_id)
+        if job is None:
+            return jsonify({'success': False, 'error': 'scan_not_found'}), 404
+        return jsonify({'success': True, **job.status()})
+
     @bp.route('/api/file-details')
     def get_file_details():
         try:
@@ -433,13 +555,17 @@ def build_file_explorer_blueprint() -> Blueprint:
             if not path_obj.exists() or not path_obj.is_dir():
                 return jsonify({'success': False, 'error': 'Invalid directory'})
 
-            directories = []
-            for item in path_obj.iterdir():
-                try:
-                    if item.is_dir():
-                        directories.append({'name': item.name, 'path': str(item)})
-                except (PermissionError, OSError):
-                    continue
+            live = dir_watches.listing(path)
+            if live:
+                directories = [{'name': f['name'], 'path': f['path']} for f in live[0] if f['is_directory']]
+            else:
+                directories = []
+                for item in path_obj.iterdir():
+                    try:
+                        if item.is_dir():
+                            directories.append({'name': item.name, 'path': str(item)})
+                    except (PermissionError, OSError):
+                        continue
 
             directories.sort(key=lambda x: x['name'].lower())
 
@@ -679,4 +805,9 @@ def build_file_explorer_blueprint() -> Blueprint:
     return bp
 
 
-__all__ = ['build_file_explorer_blueprint', 'register_file_exec_socket_handlers']
+__all__ = [
+    'build_file_explorer_blueprint',
+    'register_dir_watch_socket_handlers',
+    'register_file_exec_socket_handlers',
+    'register_scan_socket_handlers',
+]
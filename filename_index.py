@@ -0,0 +1,540 @@
+"""Background filename index with trigram lookup and `/api/search`.
+
+Every file and directory below the configured roots is one entry: its name,
+its parent directory and a type flag, kept in flat arrays (names share one
+byte blob) rather than per-entry Python objects, about 130 bytes per path
+including the postings. Names are indexed by trigram (three lowercase UTF-8
+bytes packed into an int -> sorted array of entry ids), so a query only
+verifies the entries that contain all of its trigrams:
+
+- a plain query is a case-insensitive substring of the name, or of the whole
+  path when it contains `/` (`systemd/system/foo`): then the longest
+  component is looked up, the remaining levels are walked down from the
+  matching directories, and everything below a matching path matches too;
+- a query with `*`, `?` or `[...]` is a glob, matched case-insensitively
+  against the name, or against the whole path when it contains `/`.
+
+Queries without a usable three-character literal fall back to a scan.
+
+The index stays current by rescanning: each directory's mtime is kept and
+only directories whose mtime changed are read again, so a rescan of an idle
+tree is one `stat` per directory. (inotify would need a watch per directory,
+far more than `max_user_watches` allows for whole trees.) Removed entries are
+tombstoned and dropped when the index is saved. The index is written to
+`path` in a compact binary layout after every rescan that changed it and
+loaded at startup, so a restart does not wait for a full walk.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from flask import Blueprint, jsonify, request
+
+from auth import is_authenticated
+from config_store import get_filename_index_settings
+
+MAGIC = b'SCFNIDX2'
+FS_ENCODING = sys.getfilesystemencoding()
+SECTIONS = 11
+MAX_SEARCH_LIMIT = 1000
+# Upper bound on entries looked at by one query (candidates or fallback scan).
+SCAN_BUDGET = 2_000_000
+IS_DIR = 1
+DEAD = 2
+GLOB_CHARS = re.compile(r'[*?[]')
+EMPTY = array('I')
+
+
+def _trigrams(text: str) -> set[int]:
+    data = text.lower().encode('utf-8', 'surrogateescape')
+    return {data[i] << 16 | data[i + 1] << 8 | data[i + 2] for i in range(len(data) - 2)}
+
+
+def _glob_literals(pattern: str) -> list[str]:
+    """Literal runs of a glob pattern (bracket expressions count as wildcards)."""
+    return [run for run in re.split(r'\[[^\]]*\]|[*?]', pattern) if run]
+
+
+class FilenameIndex:
+    def __init__(self, roots: list[str], exclude: list[str] = (), max_paths: int = 500_000):
+        self.roots = [os.path.realpath(root) for root in roots]
+        self.exclude = {os.path.realpath(path) for path in exclude}
+        self.max_paths = max_paths
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        # Entries by entry id: the name's bytes in one blob (entry i spans
+        # name_offsets[i]:name_offsets[i + 1]), parent dir id, flags, and the
+        # dir id a directory entry names (-1 for files and removed directories).
+        self.name_blob = bytearray()
+        self.name_offsets = array('Q', [0])
+        self.parents = array('I')
+        self.flags = bytearray()
+        self.entry_dirs = array('i')
+        self.postings: dict[int, array] = {}
+        self.dead = 0
+        # Directories by dir id: path, mtime_ns at the last read, child entry ids
+        # and the entry id naming the directory in its parent (-1 for roots).
+        self.dir_paths: list[str | None] = []
+        self.dir_mtimes = array('q')
+        self.dir_children: list[array | None] = []
+        self.dir_entry = array('i')
+        self.dir_ids: dict[str, int] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.parents) - self.dead
+
+    def name(self, entry_id: int) -> str:
+        offsets = self.name_offsets
+        return self.name_blob[offsets[entry_id]:offsets[entry_id + 1]].decode(FS_ENCODING, 'surrogateescape')
+
+    # -- building -----------------------------------------------------------
+
+    def _add_dir(self, path: str, entry_id: int) -> int:
+        dir_id = len(self.dir_paths)
+        self.dir_paths.append(path)
+        self.dir_mtimes.append(-1)
+        self.dir_children.append(array('I'))
+        self.dir_entry.append(entry_id)
+        self.dir_ids[path] = dir_id
+        if entry_id >= 0:
+            self.entry_dirs[entry_id] = dir_id
+        return dir_id
+
+    def _add_entry(self, name: str, dir_id: int, is_dir: bool) -> int:
+        entry_id = len(self.parents)
+        self.name_blob += os.fsencode(name)
+        self.name_offsets.append(len(self.name_blob))
+        self.parents.append(dir_id)
+        self.flags.append(IS_DIR if is_dir else 0)
+        self.entry_dirs.append(-1)
+        self.dir_children[dir_id].append(entry_id)
+        for gram in _trigrams(name):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array('I')
+            posting.append(entry_id)
+        if is_dir:
+            self._add_dir(os.path.join(self.dir_paths[dir_id], name), entry_id)
+        return entry_id
+
+    def _remove_entry(self, entry_id: int) -> None:
+        stack = [entry_id]
+        while stack:
+            eid = stack.pop()
+            if self.flags[eid] & DEAD:
+                continue
+            self.flags[eid] |= DEAD
+            self.dead += 1
+            dir_id = self.entry_dirs[eid]
+            if dir_id >= 0:
+                self.entry_dirs[eid] = -1
+                stack.extend(self.dir_children[dir_id])
+                self.dir_ids.pop(self.dir_paths[dir_id], None)
+                self.dir_paths[dir_id] = None
+                self.dir_children[dir_id] = None
+
+    def _refresh_dir(self, dir_id: int) -> list[int]:
+        """Re-read one directory if its mtime changed; returns its live subdirectory ids."""
+        path = self.dir_paths[dir_id]
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self.dir_mtimes[dir_id]:
+            current: dict[str, bool] = {}
+            if mtime is not None:
+                try:
+                    with os.scandir(path) as it:
+                        for entry in it:
+                            try:
+                                current[entry.name] = entry.is_dir(follow_symlinks=False)
+                            except OSError:
+                                continue
+                except OSError:
+                    pass
+            with self._lock:
+                kept = array('I')
+                known = set()
+                for entry_id in self.dir_children[dir_id]:
+                    name = self.name(entry_id)
+                    is_dir = current.get(name)
+                    if is_dir is None or is_dir != bool(self.flags[entry_id] & IS_DIR):
+                        self._remove_entry(entry_id)
+                    else:
+                        kept.append(entry_id)
+                        known.add(name)
+                self.dir_children[dir_id] = kept
+                for name, is_dir in current.items():
+                    if name in known or self.size >= self.max_paths:
+                        continue
+                    if is_dir and os.path.join(path, name) in self.exclude:
+                        continue
+                    self._add_entry(name, dir_id, is_dir)
+                self.dir_mtimes[dir_id] = -2 if mtime is None else mtime
+        children = self.dir_children[dir_id] or EMPTY
+        return [self.entry_dirs[eid] for eid in children if self.entry_dirs[eid] >= 0]
+
+    def rescan(self) -> int:
+        """Bring the index in line with the filesystem; returns the number of changed entries."""
+        before = (len(self.parents), self.dead)
+        with self._lock:
+            stack = []
+            for root in self.roots:
+                dir_id = self.dir_ids.get(root)
+                if dir_id is None:
+                    dir_id = self._add_dir(root, -1)
+                stack.append(dir_id)
+        while stack:
+            dir_id = stack.pop()
+            if self.dir_paths[dir_id] is not None:
+                stack.extend(self._refresh_dir(dir_id))
+        return (len(self.parents) - before[0]) + (self.dead - before[1])
+
+    # -- searching ----------------------------------------------------------
+
+    def path(self, entry_id: int) -> str:
+        return os.path.join(self.dir_paths[self.parents[entry_id]], self.name(entry_id))
+
+    def _lookup(self, literal: str) -> list[int] | None:
+        """Entry ids whose name contains every trigram of `literal` (None if it has none)."""
+        grams = _trigrams(literal)
+        if not grams:
+            return None
+        lists = sorted((self.postings.get(gram, EMPTY) for gram in grams), key=len)
+        result = list(lists[0])
+        for other in lists[1:]:
+            if not result:
+                break
+            n = len(other)
+            result = [i for i in result if (j := bisect_left(other, i)) < n and other[j] == i]
+        return result
+
+    def _descend(self, entry_ids, levels: int) -> list[int]:
+        """Entries exactly `levels` below the given directory entries."""
+        for _ in range(levels):
+            below = []
+            for entry_id in entry_ids:
+                dir_id = self.entry_dirs[entry_id]
+                if dir_id >= 0:
+                    below.extend(self.dir_children[dir_id])
+                    if len(below) > SCAN_BUDGET:
+                        break
+            entry_ids = below
+        return entry_ids
+
+    def _subtree(self, entry_id: int):
+        stack = [entry_id]
+        while stack:
+            eid = stack.pop()
+            yield eid
+            dir_id = self.entry_dirs[eid]
+            if dir_id >= 0:
+                stack.extend(self.dir_children[dir_id])
+
+    def _candidates(self, query: str, glob: bool):
+        """Entry ids worth verifying for `query`."""
+        if glob:
+            literals = _glob_literals(query)
+            if '/' in query:
+                # Only a trailing literal without '/' is known to sit in the name.
+                tail = literals[-1] if literals and query.endswith(literals[-1]) else ''
+                literals = [tail.rsplit('/', 1)[-1]] if tail else []
+            best = max(literals, key=len, default='')
+            ids = self._lookup(best) if len(best) >= 3 else None
+            return ids if ids is not None else range(len(self.parents))
+
+        if '/' not in query:
+            ids = self._lookup(query)
+            return ids if ids is not None else range(len(self.parents))
+
+        # Candidates are the entries a match can end in: the longest component is
+        # looked up and the entries len(parts)-1-index levels below it taken.
+        parts = query.lower().split('/')
+        index = max(range(len(parts)), key=lambda i: (len(parts[i]), i))
+        ids = self._lookup(parts[index]) if len(parts[index]) >= 3 else None
+        if ids is None:
+            return range(len(self.parents))
+        candidates = self._descend(ids, len(parts) - 1 - index)
+        # The component may also lie in a root's own path, which has no entry.
+        for root in self.roots:
+            dir_id = self.dir_ids.get(root)
+            if dir_id is not None and parts[index] in root.lower():
+                level = list(self.dir_children[dir_id])
+                for _ in range(len(parts) - 1):
+                    candidates.extend(level)
+                    level = self._descend(level, 1)
+        return candidates
+
+    def _path_match(self, entry_id: int, needle: str) -> bool:
+        """The path contains `needle` and the match ends in this entry's name (not above it)."""
+        if needle not in self.path(entry_id).lower():
+            return False
+        return needle not in self.dir_paths[self.parents[entry_id]].lower()
+
+    def search(self, query: str, limit: int = 100) -> dict:
+        """Up to `limit` matches, names starting with the query first, then shorter paths."""
+        started = time.monotonic()
+        glob = bool(GLOB_CHARS.search(query))
+        by_path = '/' in query
+        needle = query.lower()
+        cap = limit * 4
+        matches: list[int] = []
+        truncated = False
+        with self._lock:
+            examined = 0
+            for entry_id in self._candidates(query, glob):
+                examined += 1
+                if examined > SCAN_BUDGET or len(matches) >= cap:
+                    truncated = True
+                    break
+                if self.flags[entry_id] & DEAD:
+                    continue
+                if glob:
+                    subject = self.path(entry_id) if by_path else self.name(entry_id)
+                    if fnmatch.fnmatchcase(subject.lower(), needle):
+                        matches.append(entry_id)
+                elif not by_path:
+                    if needle in self.name(entry_id).lower():
+                        matches.append(entry_id)
+                elif self._path_match(entry_id, needle):
+                    # Everything below a matching path matches too.
+                    for eid in self._subtree(entry_id):
+                        matches.append(eid)
+                        if len(matches) >= cap:
+                            break
+            rows = [
+                (not self.name(eid).lower().startswith(needle), self.path(eid), bool(self.flags[eid] & IS_DIR))
+                for eid in matches
+            ]
+        rows.sort(key=lambda r: (r[0], len(r[1]), r[1]))
+        if len(rows) > limit:
+            truncated = True
+        return {
+            'results': [{'path': path, 'is_directory': is_dir} for _, path, is_dir in rows[:limit]],
+            'truncated': truncated,
+            'indexed': self.size,
+            'took_ms': round((time.monotonic() - started) * 1000, 2),
+        }
+
+    # -- persistence --------------------------------------------------------
+
+    def _compact(self) -> None:
+        """Drop tombstoned entries and dead directories, renumbering everything."""
+        name_blob, name_offsets, parents, flags = self.name_blob, self.name_offsets, self.parents, self.flags
+        entry_dirs, dir_paths, dir_mtimes, dir_entry = self.entry_dirs, self.dir_paths, self.dir_mtimes, self.dir_entry
+        self._reset()
+        dir_map = {}
+        for dir_id, path in enumerate(dir_paths):
+            if path is not None and dir_entry[dir_id] < 0:
+                dir_map[dir_id] = self._add_dir(path, -1)
+                self.dir_mtimes[dir_map[dir_id]] = dir_mtimes[dir_id]
+        # A directory's entry always precedes the entries inside it.
+        for entry_id, parent in enumerate(parents):
+            if flags[entry_id] & DEAD or parent not in dir_map:
+                continue
+            name = name_blob[name_offsets[entry_id]:name_offsets[entry_id + 1]].decode(FS_ENCODING, 'surrogateescape')
+            new_id = self._add_entry(name, dir_map[parent], bool(flags[entry_id] & IS_DIR))
+            old_dir = entry_dirs[entry_id]
+            if old_dir >= 0:
+                dir_map[old_dir] = self.entry_dirs[new_id]
+                self.dir_mtimes[dir_map[old_dir]] = dir_mtimes[old_dir]
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            if self.dead:
+                self._compact()
+            meta = json.dumps({'roots': self.roots, 'saved_at': time.time()}).encode()
+            dirs = b'\0'.join(os.fsencode(p) for p in self.dir_paths)
+            keys = array('I', sorted(self.postings))
+            counts = array('I', (len(self.postings[key]) for key in keys))
+            ids = array('I')
+            for key in keys:
+                ids.extend(self.postings[key])
+            sections = [
+                meta,
+                bytes(self.name_blob),
+                self.name_offsets.tobytes(),
+                self.parents.tobytes(),
+                bytes(self.flags),
+                dirs,
+                self.dir_mtimes.tobytes(),
+                self.dir_entry.tobytes(),
+                keys.tobytes(),
+                counts.tobytes(),
+                ids.tobytes(),
+            ]
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC)
+            for section in sections:
+                f.write(struct.pack('<Q', len(section)))
+                f.write(section)
+            # The rename must not reach the disk before the data (power loss on SD cards).
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> bool:
+        """Replace the index with the one saved at `path`.
+
+        Returns False, leaving the index empty, if the file is missing,
+        foreign, truncated or corrupt, or was saved for other roots.
+        """
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return False
+                sections = []
+                for _ in range(SECTIONS):
+                    (length,) = struct.unpack('<Q', f.read(8))
+                    section = f.read(length)
+                    if len(section) != length:
+                        return False
+                    sections.append(section)
+            meta = json.loads(sections[0])
+            if not isinstance(meta, dict) or meta.get('roots') != self.roots:
+                return False
+            with self._lock:
+                self._reset()
+                try:
+                    self._load_sections(sections)
+                except (ValueError, IndexError):
+                    self._reset()
+                    raise
+        except (OSError, struct.error, ValueError, IndexError):
+            return False
+        return True
+
+    def _load_sections(self, sections: list[bytes]) -> None:
+        """Fill the (reset) index from saved sections; ValueError if they do not fit together."""
+
+        def unpack(typecode: str, data: bytes) -> array:
+            values = array(typecode)
+            values.frombytes(data)
+            return values
+
+        self.name_blob = bytearray(sections[1])
+        self.name_offsets = unpack('Q', sections[2])
+        self.parents = unpack('I', sections[3])
+        self.flags = bytearray(sections[4])
+        self.dir_paths = [os.fsdecode(p) for p in sections[5].split(b'\0')] if sections[5] else []
+        self.dir_mtimes = unpack('q', sections[6])
+        self.dir_entry = unpack('i', sections[7])
+        keys, counts, ids = unpack('I', sections[8]), unpack('I', sections[9]), unpack('I', sections[10])
+        entries, dirs = len(self.parents), len(self.dir_paths)
+        offsets = self.name_offsets
+        if (
+            len(offsets) != entries + 1
+            or offsets[0] != 0
+            or offsets[-1] != len(self.name_blob)
+            or any(offsets[i] > offsets[i + 1] for i in range(entries))
+            or len(self.flags) != entries
+            or len(self.dir_mtimes) != dirs
+            or len(self.dir_entry) != dirs
+            or len(keys) != len(counts)
+            or sum(counts) != len(ids)
+            or (entries and max(self.parents) >= dirs)
+            or (dirs and max(self.dir_entry) >= entries)
+            or (ids and max(ids) >= entries)
+        ):
+            raise ValueError('inconsistent index sections')
+        self.entry_dirs = array('i', [-1]) * entries
+        for dir_id, entry_id in enumerate(self.dir_entry):
+            if entry_id >= 0:
+                self.entry_dirs[entry_id] = dir_id
+        self.dir_children = [array('I') for _ in self.dir_paths]
+        for entry_id, parent in enumerate(self.parents):
+            self.dir_children[parent].append(entry_id)
+        self.dir_ids = {p: dir_id for dir_id, p in enumerate(self.dir_paths)}
+        offset = 0
+        for key, count in zip(keys, counts):
+            self.postings[key] = ids[offset:offset + count]
+            offset += count
+
+
+class FilenameIndexer:
+    def __init__(self, index: FilenameIndex, path: str, interval: float):
+        self.index = index
+        self.path = path
+        self.interval = interval
+        self.ready = False
+        self._stop = threading.Event()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        loaded = None
+        while not self._stop.is_set():
+            try:
+                if loaded is None:
+                    loaded = False
+                    # A loaded index answers queries right away; the rescan below catches up.
+                    loaded = self.ready = self.index.load(self.path)
+                changed = self.index.rescan()
+                if changed or not loaded:
+                    self.index.save(self.path)
+                    loaded = True
+                self.ready = True
+            except Exception:
+                pass
+            self._stop.wait(self.interval)
+
+
+filename_indexer: FilenameIndexer | None = None
+
+
+def start_filename_indexer() -> FilenameIndexer | None:
+    global filename_indexer
+    settings = get_filename_index_settings()
+    if not settings.get('enabled'):
+        return None
+    index = FilenameIndex(settings['roots'], exclude=settings['exclude'], max_paths=settings['max_paths'])
+    filename_indexer = FilenameIndexer(index, settings['path'], interval=settings['interval'])
+    filename_indexer.start()
+    return filename_indexer
+
+
+def build_filename_index_blueprint() -> Blueprint:
+    bp = Blueprint('filename_index', __name__)
+
+    @bp.route('/api/search')
+    def filename_search():
+        if not is_authenticated():
+            return jsonify({'success': False, 'error': 'unauthorized'}), 401
+        if filename_indexer is None:
+            return jsonify({'success': False, 'error': 'filename index disabled'}), 503
+
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'success': False, 'error': 'q parameter required'}), 400
+        try:
+            limit = int(request.args.get('limit') or 100)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+
+        result = filename_indexer.index.search(query, limit=max(1, min(limit, MAX_SEARCH_LIMIT)))
+        return jsonify(success=True, ready=filename_indexer.ready, **result)
+
+    return bp
+
+
+__all__ = ['FilenameIndex', 'build_filename_index_blueprint', 'start_filename_indexer']
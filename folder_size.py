@@ -0,0 +1,196 @@
+"""Directory size totals (`du -b` style) for the file explorer.
+
+Walking uses `os.scandir`, so file type comes from the directory read and each
+file costs a single `lstat` (`DirEntry.stat`). Subtrees are walked on a thread
+pool: a task walks depth first up to `BATCH_DIRS` directories and hands the
+rest of its stack back to the pool. Files with several hard links are counted
+once per (dev, inode). Unreadable directories are skipped and counted in
+`errors` instead of failing the whole answer.
+
+What a directory holds directly (its files' sizes and its subdirectory names)
+is cached per (dev, inode) together with the directory's mtime. The mtime
+changes whenever an entry is added, removed or renamed, so a revisit only
+`lstat`s each directory and rescans the ones that changed. Files growing in
+place do not touch the mtime; such entries are rescanned once older than
+`max_age`.
+"""
+
+from __future__ import annotations
+
+import os
+import stat
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+BATCH_DIRS = 64
+
+
+class ScanCancelled(Exception):
+    pass
+
+
+class _DirNode:
+    __slots__ = ('mtime_ns', 'scanned_at', 'size', 'files', 'links', 'subdirs', 'error')
+
+    def __init__(self, mtime_ns: int, scanned_at: float):
+        self.mtime_ns = mtime_ns
+        self.scanned_at = scanned_at
+        # Files with a single link; multiply-linked ones go to `links` as ((dev, ino), size).
+        self.size = 0
+        self.files = 0
+        self.links: list[tuple[tuple[int, int], int]] = []
+        self.subdirs: list[str] = []
+        self.error = False
+
+
+class FolderSizeEngine:
+    def __init__(self, max_age: float = 300.0, max_entries: int = 500_000, workers: int | None = None):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.workers = workers or min(8, (os.cpu_count() or 1) * 2)
+        self._nodes: dict[tuple[int, int], _DirNode] = {}
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='folder-size')
+            return self._pool
+
+    def _scan(self, path: str, st: os.stat_result, now: float) -> _DirNode:
+        node = _DirNode(st.st_mtime_ns, now)
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            node.subdirs.append(entry.name)
+                            continue
+                        info = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    node.files += 1
+                    if info.st_nlink > 1:
+                        node.links.append(((info.st_dev, info.st_ino), info.st_size))
+                    else:
+                        node.size += info.st_size
+        except OSError:
+            node.error = True
+        return node
+
+    def _node(self, path: str, st: os.stat_result, now: float) -> tuple[_DirNode, bool]:
+        key = (st.st_dev, st.st_ino)
+        node = self._nodes.get(key)
+        if node is not None and node.mtime_ns == st.st_mtime_ns and now - node.scanned_at <= self.max_age:
+            return node, True
+        node = self._scan(path, st, now)
+        with self._lock:
+            self._nodes[key] = node
+        return node, False
+
+    def _walk(self, stack: list, now: float, seen: set, root_dev: int | None, cancel) -> tuple[dict, list, list, str]:
+        """Walk up to BATCH_DIRS directories from `stack`.
+
+        Returns (counts, hard links, leftover stack, last directory visited).
+        """
+        counts = {'size': 0, 'files': 0, 'directories': 0, 'errors': 0, 'cached': 0}
+        links: list = []
+        path = ''
+        for _ in range(BATCH_DIRS):
+            if not stack or (cancel is not None and cancel.is_set()):
+                break
+            path, st = stack.pop()
+            node, cached = self._node(path, st, now)
+            counts['directories'] += 1
+            counts['cached'] += cached
+            counts['errors'] += node.error
+            counts['size'] += node.size
+            counts['files'] += node.files
+            links.extend(node.links)
+            for name in node.subdirs:
+                child = os.path.join(path, name)
+                try:
+                    child_st = os.lstat(child)
+                except OSError:
+                    counts['errors'] += 1
+                    continue
+                if not stat.S_ISDIR(child_st.st_mode):
+                    continue
+                if root_dev is not None and child_st.st_dev != root_dev:
+                    continue
+                key = (child_st.st_dev, child_st.st_ino)
+                # Bind mounts can show one directory twice (or inside itself).
+                with self._lock:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                stack.append((child, child_st))
+        return counts, links, stack, path
+
+    def measure(self, path: str, one_file_system: bool = False, progress=None, cancel=None) -> dict:
+        """Total apparent size of the files below `path`.
+
+        `progress(totals, current_path)` is called from this thread as batches
+        finish; setting the `cancel` event stops the walk with ScanCancelled.
+        Raises OSError if `path` cannot be stat'ed, NotADirectoryError if it is
+        not a directory.
+        """
+        started = time.monotonic()
+        st = os.stat(path)
+        if not stat.S_ISDIR(st.st_mode):
+            raise NotADirectoryError(path)
+
+        root_dev = st.st_dev if one_file_system else None
+        seen = {(st.st_dev, st.st_ino)}
+        seen_links: set[tuple[int, int]] = set()
+        totals = {'size': 0, 'files': 0, 'directories': 0, 'errors': 0, 'cached': 0}
+
+        pool = self._executor()
+        pending = {pool.submit(self._walk, [(path, st)], started, seen, root_dev, cancel)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                counts, links, stack, current = future.result()
+                for field, value in counts.items():
+                    totals[field] += value
+                for key, size in links:
+                    if key not in seen_links:
+                        seen_links.add(key)
+                        totals['size'] += size
+                if cancel is not None and cancel.is_set():
+                    continue
+                # Split what is left so idle workers can take part of it.
+                while stack:
+                    share = stack[: max(1, len(stack) // self.workers)]
+                    del stack[: len(share)]
+                    pending.add(pool.submit(self._walk, share, started, seen, root_dev, cancel))
+                if progress is not None:
+                    progress(totals, current)
+                # Keep a walk over a huge tree from growing the cache past its bound.
+                if len(self._nodes) > self.max_entries:
+                    self._prune()
+
+        if cancel is not None and cancel.is_set():
+            raise ScanCancelled(path)
+
+        totals['duration'] = round(time.monotonic() - started, 4)
+        return totals
+
+    def _prune(self) -> None:
+        """Drop the oldest scans down to 90% of max_entries, so a long walk prunes now and then, not per batch."""
+        with self._lock:
+            excess = len(self._nodes) - self.max_entries * 9 // 10
+            if excess <= 0:
+                return
+            # Oldest scans first; writers hold the lock, so the items cannot change under the sort.
+            oldest = sorted(self._nodes.items(), key=lambda item: item[1].scanned_at)[:excess]
+            for key, _ in oldest:
+                del self._nodes[key]
+
+
+folder_sizes = FolderSizeEngine()
+
+
+__all__ = ['FolderSizeEngine', 'ScanCancelled', 'folder_sizes']
@@ -0,0 +1,242 @@
+"""Host CPU, memory, load and temperature read straight from /proc and /sys.
+
+`/proc/stat`, `/proc/meminfo`, `/proc/loadavg` and every thermal zone's
+`temp` file are opened once and re-read with `os.pread` at offset 0, so a
+sample costs a handful of syscalls and no per-call object setup. CPU usage is
+the delta against the previous sample, computed like psutil does. Anything
+that cannot be read this way (non-Linux hosts, hidden /proc) falls back to
+psutil.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import threading
+
+import psutil
+
+PROC_STAT = '/proc/stat'
+PROC_MEMINFO = '/proc/meminfo'
+PROC_LOADAVG = '/proc/loadavg'
+THERMAL_GLOB = '/sys/class/thermal/thermal_zone*'
+READ_SIZE = 65536
+GB = 1024 * 1024 * 1024
+
+
+def _open(path: str) -> int | None:
+    try:
+        return os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+
+
+def _zone_number(path: str) -> int:
+    suffix = path.rsplit('thermal_zone', 1)[-1]
+    return int(suffix) if suffix.isdigit() else 1 << 30
+
+
+def _cpu_busy_total(fields: list[int]) -> tuple[int, int]:
+    # user nice system idle iowait irq softirq steal guest guest_nice; guest
+    # time is already counted in user/nice, iowait counts as idle (as psutil).
+    total = sum(fields[:8])
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    return total - idle, total
+
+
+def cpu_temp_psutil() -> float:
+    try:
+        with open('/sys/class/thermal/thermal_zone0/temp', 'r', encoding='utf-8') as f:
+            return round(float(f.read()) / 1000.0, 1)
+    except Exception:
+        return 0.0
+
+
+def psutil_host_stats(root: str = '/') -> dict:
+    """The same fields as `HostStatsCollector.sample()`, collected through psutil."""
+    cpu_per_core = psutil.cpu_percent(interval=None, percpu=True) or []
+    cpu_percent = round(float(sum(cpu_per_core)) / float(len(cpu_per_core)), 1) if cpu_per_core else 0.0
+    memory = psutil.virtual_memory()
+    try:
+        load_average = [round(value, 2) for value in os.getloadavg()]
+    except (AttributeError, OSError):
+        load_average = None
+    return {
+        'cpu_temp': cpu_temp_psutil(),
+        'cpu_percent': cpu_percent,
+        'cpu_percent_per_core': cpu_per_core,
+        'load_average': load_average,
+        'memory_percent': memory.percent,
+        # Same definition as the /proc path (and memory.percent): what is not available.
+        'memory_used': round((memory.total - memory.available) / GB, 2),
+        'memory_free': round(memory.available / GB, 2),
+        'memory_total': round(memory.total / GB, 2),
+        'memory_total_bytes': memory.total,
+        'memory_available_bytes': memory.available,
+        **disk_stats(root),
+    }
+
+
+def disk_stats(root: str = '/') -> dict:
+    # psutil.disk_usage is statvfs plus arithmetic; do it directly.
+    st = os.statvfs(root)
+    total = st.f_blocks * st.f_frsize
+    free = st.f_bavail * st.f_frsize
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    usable = used + free
+    return {
+        'storage_percent': round(used / usable * 100, 1) if usable else 0.0,
+        'storage_used': round(used / GB, 2),
+        'storage_free': round(free / GB, 2),
+        'storage_total': round(total / GB, 2),
+        'storage_total_bytes': total,
+        'storage_used_bytes': used,
+        'storage_free_bytes': free,
+    }
+
+
+class HostStatsCollector:
+    """Keeps the /proc and /sys files open; `sample()` is meant for one thread at a time."""
+
+    def __init__(self, root: str = '/'):
+        self.root = root
+        self._lock = threading.Lock()
+        self._fds: dict[str, int | None] = {}
+        self._zones: list[tuple[str, int]] = []
+        self._previous_cpu: list[tuple[int, int]] | None = None
+        self._open_all()
+
+    def _open_all(self) -> None:
+        for path in (PROC_STAT, PROC_MEMINFO, PROC_LOADAVG):
+            self._fds[path] = _open(path)
+        zones = []
+        for zone in sorted(glob.glob(THERMAL_GLOB), key=_zone_number):
+            fd = _open(os.path.join(zone, 'temp'))
+            if fd is None:
+                continue
+            try:
+                with open(os.path.join(zone, 'type'), 'r', encoding='utf-8') as f:
+                    name = f.read().strip() or os.path.basename(zone)
+            except OSError:
+                name = os.path.basename(zone)
+            zones.append((name, fd))
+        self._zones = zones
+
+    def available(self) -> bool:
+        return self._fds.get(PROC_STAT) is not None and self._fds.get(PROC_MEMINFO) is not None
+
+    def close(self) -> None:
+        with self._lock:
+            for fd in [*self._fds.values(), *(fd for _, fd in self._zones)]:
+                if fd is not None:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+            self._fds = {}
+            self._zones = []
+
+    def _read(self, path: str) -> bytes | None:
+        fd = self._fds.get(path)
+        if fd is None:
+            return None
+        try:
+            return os.pread(fd, READ_SIZE, 0)
+        except OSError:
+            return None
+
+    def _cpu(self) -> tuple[float, list[float]] | None:
+        data = self._read(PROC_STAT)
+        if data is None:
+            return None
+        cores = []
+        for line in data.split(b'\n'):
+            if not line.startswith(b'cpu'):
+                break
+            name, *fields = line.split()
+            if name != b'cpu':
+                cores.append(_cpu_busy_total([int(v) for v in fields]))
+        if not cores:
+            return None
+
+        previous, self._previous_cpu = self._previous_cpu, cores
+        if previous is None or len(previous) != len(cores):
+            # First sample (or CPUs went on/offline): nothing to diff against yet.
+            previous = [(busy, total) for busy, total in cores]
+        per_core = []
+        for (busy, total), (prev_busy, prev_total) in zip(cores, previous):
+            delta_total = total - prev_total
+            percent = (busy - prev_busy) / delta_total * 100 if delta_total > 0 else 0.0
+            per_core.append(round(min(100.0, max(0.0, percent)), 1))
+        return round(sum(per_core) / len(per_core), 1), per_core
+
+    def _memory(self) -> dict | None:
+        data = self._read(PROC_MEMINFO)
+        if data is None:
+            return None
+        info = {}
+        for line in data.split(b'\n'):
+            key, _, rest = line.partition(b':')
+            if key in (b'MemTotal', b'MemFree', b'MemAvailable'):
+                info[key] = int(rest.split()[0]) * 1024
+        total = info.get(b'MemTotal')
+        if not total:
+            return None
+        available = info.get(b'MemAvailable', info.get(b'MemFree', 0))
+        return {
+            'memory_percent': round((total - available) / total * 100, 1),
+            'memory_used': round((total - available) / GB, 2),
+            'memory_free': round(available / GB, 2),
+            'memory_total': round(total / GB, 2),
+            'memory_total_bytes': total,
+            'memory_available_bytes': available,
+        }
+
+    def _load_average(self) -> list[float] | None:
+        data = self._read(PROC_LOADAVG)
+        if data is None:
+            return None
+        try:
+            return [float(value) for value in data.split()[:3]]
+        except ValueError:
+            return None
+
+    def _temperatures(self) -> dict[str, float]:
+        temps = {}
+        for name, fd in self._zones:
+            try:
+                value = os.pread(fd, 32, 0).strip()
+                temps.setdefault(name, round(int(value) / 1000.0, 1))
+            except (OSError, ValueError):
+                continue
+        return temps
+
+    def sample(self) -> dict:
+        with self._lock:
+            if not self.available():
+                return psutil_host_stats(self.root)
+
+            cpu = self._cpu()
+            memory = self._memory()
+            if cpu is None or memory is None:
+                return psutil_host_stats(self.root)
+
+            temps = self._temperatures()
+            load_average = self._load_average()
+            cpu_percent, per_core = cpu
+            return {
+                # thermal_zone0 is the SoC sensor on the boards we run on.
+                'cpu_temp': next(iter(temps.values())) if temps else 0.0,
+                'temperatures': temps,
+                'cpu_percent': cpu_percent,
+                'cpu_percent_per_core': per_core,
+                'load_average': load_average,
+                **memory,
+                **disk_stats(self.root),
+            }
+
+
+host_stats = HostStatsCollector()
+
+
+__all__ = ['HostStatsCollector', 'host_stats', 'psutil_host_stats']
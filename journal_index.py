@@ -0,0 +1,288 @@
+"""Background journal indexer and search API.
+
+A daemon thread tails the system journal by cursor (`journalctl -o json
+--after-cursor`) into a local SQLite database with an FTS5 index on the
+message text, trimmed to a maximum age and entry count. `/api/journal/search`
+filters it by time range, unit, priority and full text without touching
+journalctl at all.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import subprocess
+import threading
+import time
+
+from flask import Blueprint, jsonify, request
+
+from auth import is_authenticated
+from config_store import get_journal_index_settings
+from systemd_manager import parse_journal_entry
+
+INSERT_BATCH = 5000
+MAX_SEARCH_LIMIT = 500
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    unit TEXT NOT NULL,
+    priority INTEGER,
+    identifier TEXT,
+    pid TEXT,
+    message TEXT,
+    cursor TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries(ts);
+CREATE INDEX IF NOT EXISTS entries_unit ON entries(unit, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(message, content='entries', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, message) VALUES (new.id, new.message);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, message) VALUES ('delete', old.id, old.message);
+END;
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+'''
+
+
+def _fts_query(text: str) -> str:
+    # Quote every term so user input can't use (or break on) FTS5 syntax; a
+    # trailing '*' keeps prefix search available. Terms that are nothing but
+    # '*' are dropped: `""*` is not a query FTS5 accepts everywhere.
+    terms = []
+    for term in text.split():
+        prefix = term.endswith('*')
+        term = term.rstrip('*')
+        if not term:
+            continue
+        terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+class JournalIndexer:
+    def __init__(self, path: str, max_entries: int, max_age_days: float, interval: float = 5.0):
+        self.path = path
+        self.max_entries = int(max_entries)
+        self.max_age_days = float(max_age_days)
+        self.interval = float(interval)
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._connect().close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        conn = self._connect()
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.ingest(conn)
+                    self.prune(conn)
+                except Exception:
+                    pass
+                self._stop.wait(self.interval)
+        finally:
+            conn.close()
+
+    def ingest(self, conn: sqlite3.Connection) -> int:
+        """Append everything journalctl has after the stored cursor."""
+        row = conn.execute("SELECT value FROM state WHERE key = 'cursor'").fetchone()
+        args = ['journalctl', '-o', 'json', '--no-pager']
+        if row:
+            args += ['--after-cursor', row[0]]
+        else:
+            since = time.time() - self.max_age_days * 86400
+            args += ['--since', time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(since))]
+
+        process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        total = 0
+        batch: list[tuple] = []
+        try:
+            for line in process.stdout:
+                entry = parse_journal_entry(line)
+                if entry is None:
+                    continue
+                batch.append(
+                    (
+                        entry['timestamp'],
+                        entry['unit'],
+                        entry['priority'],
+                        entry['identifier'],
+                        entry['pid'],
+                        entry['message'],
+                        entry['cursor'],
+                    )
+                )
+                if len(batch) >= INSERT_BATCH:
+                    total += self._insert(conn, batch)
+                    batch = []
+                if self._stop.is_set():
+                    break
+            total += self._insert(conn, batch)
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+        return total
+
+    def _insert(self, conn: sqlite3.Connection, batch: list[tuple]) -> int:
+        if not batch:
+            return 0
+        # Rows and the resume cursor commit together, so a crash never
+        # duplicates or skips entries.
+        with conn:
+            conn.executemany(
+                'INSERT INTO entries (ts, unit, priority, identifier, pid, message, cursor) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                batch,
+            )
+            conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('cursor', ?)", (batch[-1][6],))
+        return len(batch)
+
+    def prune(self, conn: sqlite3.Connection) -> None:
+        cutoff = int((time.time() - self.max_age_days * 86400) * 1_000_000)
+        with conn:
+            conn.execute('DELETE FROM entries WHERE ts < ?', (cutoff,))
+            max_id = conn.execute('SELECT max(id) FROM entries').fetchone()[0]
+            if max_id is not None and self.max_entries > 0:
+                conn.execute('DELETE FROM entries WHERE id <= ?', (max_id - self.max_entries,))
+
+    def search(
+        self,
+        text: str = '',
+        unit: str = '',
+        priority: int | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        before: int | None = None,
+        limit: int = 100,
+    ) -> dict:
+        """Newest-first matches; pass `next_before` back as `before` for the next page."""
+        where = []
+        params: list = []
+        source = 'entries e'
+        match = _fts_query(text)
+        if match:
+            source = 'entries_fts f JOIN entries e ON e.id = f.rowid'
+            where.append('entries_fts MATCH ?')
+            params.append(match)
+        if unit:
+            where.append('e.unit = ?')
+            params.append(unit)
+        if priority is not None:
+            where.append('e.priority <= ?')
+            params.append(priority)
+        if since is not None:
+            where.append('e.ts >= ?')
+            params.append(int(since * 1_000_000))
+        if until is not None:
+            where.append('e.ts <= ?')
+            params.append(int(until * 1_000_000))
+        if before is not None:
+            where.append('e.id < ?')
+            params.append(before)
+
+        sql = f'SELECT e.id, e.ts, e.unit, e.priority, e.identifier, e.pid, e.message, e.cursor FROM {source}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY e.id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            # FTS5 rejecting the search text is a bad request, not a server error.
+            if match and str(e).startswith('fts5:'):
+                raise ValueError(f'invalid search text: {e}') from e
+            raise
+        finally:
+            conn.close()
+
+        entries = [
+            {
+                'id': r[0],
+                'timestamp': r[1],
+                'unit': r[2],
+                'priority': r[3],
+                'identifier': r[4],
+                'pid': r[5],
+                'message': r[6],
+                'cursor': r[7],
+            }
+            for r in rows[:limit]
+        ]
+        return {'entries': entries, 'next_before': entries[-1]['id'] if len(rows) > limit else None}
+
+
+journal_indexer: JournalIndexer | None = None
+
+
+def start_journal_indexer() -> JournalIndexer | None:
+    global journal_indexer
+    settings = get_journal_index_settings()
+    if not settings.get('enabled'):
+        return None
+    journal_indexer = JournalIndexer(
+        settings['path'],
+        max_entries=settings['max_entries'],
+        max_age_days=settings['max_age_days'],
+        interval=settings['interval'],
+    )
+    journal_indexer.start()
+    return journal_indexer
+
+
+def _float_arg(name: str) -> float | None:
+    value = request.args.get(name)
+    return float(value) if value not in (None, '') else None
+
+
+def build_journal_index_blueprint() -> Blueprint:
+    bp = Blueprint('journal_index', __name__)
+
+    @bp.route('/api/journal/search')
+    def journal_search():
+        if not is_authenticated():
+            return jsonify({'success': False, 'error': 'unauthorized'}), 401
+        if journal_indexer is None:
+            return jsonify({'success': False, 'error': 'journal index disabled'}), 503
+
+        try:
+            priority = request.args.get('priority')
+            before = request.args.get('before')
+            limit = int(request.args.get('limit') or 100)
+            result = journal_indexer.search(
+                text=request.args.get('q', ''),
+                unit=request.args.get('unit', ''),
+                priority=int(priority) if priority not in (None, '') else None,
+                since=_float_arg('since'),
+                until=_float_arg('until'),
+                before=int(before) if before not in (None, '') else None,
+                limit=max(1, min(limit, MAX_SEARCH_LIMIT)),
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except sqlite3.Error as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+        return jsonify(success=True, **result)
+
+    return bp
+
+
+__all__ = ['build_journal_index_blueprint', 'start_journal_indexer']
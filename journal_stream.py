@@ -0,0 +1,193 @@
+"""Live journal follow over Socket.IO.
+
+One `journalctl -f -o json` process runs per watched unit, no matter how many
+clients view it. Entries are batched and emitted to the unit's room; clients
+that reconnect pass the last cursor they saw and get what they missed.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import threading
+
+from flask import request, session
+from flask_socketio import join_room, leave_room
+
+from auth import SUDO_SESSION_KEY, is_authenticated
+from systemd_manager import SystemdManager, parse_journal_entry
+
+FLUSH_INTERVAL = 0.25
+MAX_BATCH = 500
+HISTORY_LINES = 100
+RESUME_LINES = 1000
+
+
+def journal_room(service: str) -> str:
+    return f'journal:{service}'
+
+
+class JournalFollower:
+    def __init__(self, socketio, service: str, sudo_password: str | None = None):
+        self.socketio = socketio
+        self.service = service
+        self.sudo_password = sudo_password
+        self.room = journal_room(service)
+        self.viewers: set[str] = set()
+        self.process: subprocess.Popen | None = None
+        self._buffer: list[dict] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        args = ['journalctl', '-u', self.service, '-f', '-o', 'json', '-n', '0', '--no-pager']
+        if self.sudo_password:
+            args = ['sudo', '-S', '-p', ''] + args
+
+        self.process = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            stdin=subprocess.PIPE if self.sudo_password else subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        if self.sudo_password:
+            try:
+                self.process.stdin.write(self.sudo_password + '\n')
+                self.process.stdin.close()
+            except Exception:
+                pass
+
+        threading.Thread(target=self._reader, daemon=True).start()
+        threading.Thread(target=self._flusher, daemon=True).start()
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None and not self._stopped.is_set()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self.process is not None and self.process.poll() is None:
+            try:
+                self.process.terminate()
+                self.process.wait(timeout=2.0)
+            except Exception:
+                try:
+                    self.process.kill()
+                except Exception:
+                    pass
+
+    def _reader(self) -> None:
+        try:
+            for line in iter(self.process.stdout.readline, ''):
+                entry = parse_journal_entry(line)
+                if entry:
+                    with self._lock:
+                        self._buffer.append(entry)
+        except Exception:
+            pass
+        finally:
+            self._stopped.set()
+
+    def _flusher(self) -> None:
+        while True:
+            stopped = self._stopped.wait(FLUSH_INTERVAL)
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            # Drop the oldest lines of a flood rather than falling further behind.
+            for start in range(max(0, len(batch) - MAX_BATCH * 4), len(batch), MAX_BATCH):
+                entries = batch[start:start + MAX_BATCH]
+                self.socketio.emit(
+                    'journal_lines',
+                    {'service': self.service, 'entries': entries, 'cursor': entries[-1]['cursor']},
+                    room=self.room,
+                    namespace='/',
+                )
+            if stopped:
+                return
+
+
+_FOLLOWERS: dict[str, JournalFollower] = {}
+_FOLLOWERS_LOCK = threading.Lock()
+
+
+def _add_viewer(socketio, sid: str, service: str, sudo_password: str | None) -> None:
+    with _FOLLOWERS_LOCK:
+        follower = _FOLLOWERS.get(service)
+        if follower is None or not follower.alive():
+            viewers = follower.viewers if follower is not None else set()
+            follower = JournalFollower(socketio, service, sudo_password=sudo_password)
+            follower.viewers = viewers
+            follower.start()
+            _FOLLOWERS[service] = follower
+        follower.viewers.add(sid)
+
+
+def _remove_viewer(sid: str, service: str) -> None:
+    with _FOLLOWERS_LOCK:
+        follower = _FOLLOWERS.get(service)
+        if follower is None:
+            return
+        follower.viewers.discard(sid)
+        if follower.viewers:
+            return
+        del _FOLLOWERS[service]
+    follower.stop()
+
+
+def journal_cleanup_on_disconnect(sid: str) -> None:
+    with _FOLLOWERS_LOCK:
+        services = [service for service, follower in _FOLLOWERS.items() if sid in follower.viewers]
+    for service in services:
+        _remove_viewer(sid, service)
+
+
+def register_journal_socket_handlers(socketio):
+    @socketio.on('journal_follow')
+    def on_journal_follow(data):
+        if not is_authenticated():
+            return
+        service = ((data or {}).get('service') or '').strip()
+        cursor = (data or {}).get('cursor') or None
+        if not service:
+            return
+
+        sudo_password = session.get(SUDO_SESSION_KEY)
+        # Join before reading the backlog so nothing falls between the two;
+        # clients drop entries they already have by cursor/timestamp.
+        join_room(journal_room(service))
+        try:
+            _add_viewer(socketio, request.sid, service, sudo_password)
+        except Exception as e:
+            leave_room(journal_room(service))
+            socketio.emit('journal_error', {'service': service, 'error': str(e)}, room=request.sid)
+            return
+
+        entries = SystemdManager.get_journal_entries(
+            service,
+            cursor=cursor,
+            lines=RESUME_LINES if cursor else HISTORY_LINES,
+            sudo_password=sudo_password,
+        )
+        socketio.emit(
+            'journal_history',
+            {
+                'service': service,
+                'entries': entries,
+                'resumed': bool(cursor),
+                'cursor': entries[-1]['cursor'] if entries else cursor,
+            },
+            room=request.sid,
+        )
+
+    @socketio.on('journal_unfollow')
+    def on_journal_unfollow(data):
+        if not is_authenticated():
+            return
+        service = ((data or {}).get('service') or '').strip()
+        if not service:
+            return
+        leave_room(journal_room(service))
+        _remove_viewer(request.sid, service)
+
+
+__all__ = ['journal_cleanup_on_disconnect', 'register_journal_socket_handlers']
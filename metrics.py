@@ -1,81 +1,130 @@
-import fcntl
 import socket
-import struct
-from flask import Blueprint, jsonify
-import psutil
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Mapping
 
+from flask import Blueprint, jsonify, request
 
-def get_cpu_temp() -> float:
-    try:
-        with open('/sys/class/thermal/thermal_zone0/temp', 'r', encoding='utf-8') as f:
-            temp = float(f.read()) / 1000.0
-        return round(temp, 1)
-    except Exception:
-        return 0.0
+from host_stats import host_stats
+from metrics_history import metrics_history
+from net_devices import default_route_interface, interface_address, net_devices
 
 
 def check_internet_connection() -> bool:
     try:
-        socket.create_connection(('8.8.8.8', 53), timeout=3)
-        return True
+        with socket.create_connection(('8.8.8.8', 53), timeout=3):
+            return True
     except OSError:
         return False
 
 
-def get_system_metrics() -> dict:
-    cpu_temp = get_cpu_temp()
-
-    # CPU percent: normalize overall to 0..100 by averaging per-core usage.
-    cpu_per_core = psutil.cpu_percent(interval=0.1, percpu=True) or []
-    cpu_percent = round(float(sum(cpu_per_core)) / float(len(cpu_per_core)), 1) if cpu_per_core else 0.0
-
-    memory = psutil.virtual_memory()
-    disk = psutil.disk_usage('/')
-    has_internet = check_internet_connection()
-
-    return {
-        'cpu_temp': cpu_temp,
-        'cpu_percent': cpu_percent,
-        'cpu_percent_per_core': cpu_per_core,
-        'memory_percent': memory.percent,
-        'memory_used': round(memory.used / (1024 * 1024 * 1024), 2),
-        'memory_free': round(memory.available / (1024 * 1024 * 1024), 2),
-        'memory_total': round(memory.total / (1024 * 1024 * 1024), 2),
-        'storage_percent': disk.percent,
-        'storage_used': round(disk.used / (1024 * 1024 * 1024), 2),
-        'storage_free': round(disk.free / (1024 * 1024 * 1024), 2),
-        'storage_total': round(disk.total / (1024 * 1024 * 1024), 2),
-        'has_internet': has_internet,
-    }
+def sample_system_metrics(has_internet: bool) -> dict:
+    # CPU percent is measured since the previous call, i.e. the previous sample.
+    metrics = host_stats.sample()
+    metrics['has_internet'] = has_internet
+    return metrics
+
+
+class MetricsSampler:
+    """Samples host metrics on its own thread; readers get the latest snapshot.
+
+    Each sample replaces an immutable mapping, so reads never block on psutil
+    or the network. Connectivity is probed on a separate thread, backing off
+    while the host is offline. Listeners are called with every new snapshot.
+    """
+
+    def __init__(
+        self,
+        interval: float = 1.0,
+        probe_interval: float = 30.0,
+        offline_probe_delay: float = 5.0,
+        max_probe_backoff: float = 60.0,
+    ):
+        self.interval = interval
+        self.probe_interval = probe_interval
+        self.offline_probe_delay = offline_probe_delay
+        self.max_probe_backoff = max_probe_backoff
+        self.has_internet = False
+        self._snapshot: MappingProxyType = MappingProxyType({})
+        self._sampled_at = 0.0
+        self._listeners: list[Callable[[Mapping], None]] = []
+        self._started = False
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback: Callable[[Mapping], None]) -> None:
+        self._listeners.append(callback)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            # Prime the CPU counters so the first real sample covers one interval.
+            host_stats.sample()
+            self._sample()
+        threading.Thread(target=self._sample_loop, daemon=True).start()
+        threading.Thread(target=self._probe_loop, daemon=True).start()
+
+    def snapshot(self) -> dict:
+        snapshot, sampled_at = self._snapshot, self._sampled_at
+        metrics = dict(snapshot)
+        metrics['age'] = round(time.monotonic() - sampled_at, 3)
+        return metrics
+
+    def _sample(self) -> None:
+        metrics = sample_system_metrics(self.has_internet)
+        metrics['sampled_at'] = time.time()
+        snapshot = MappingProxyType(metrics)
+        self._snapshot, self._sampled_at = snapshot, time.monotonic()
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception:
+                pass
+
+    def _sample_loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self._sample()
+            except Exception:
+                pass
+
+    def _probe_loop(self) -> None:
+        offline_delay = self.offline_probe_delay
+        while True:
+            self.has_internet = check_internet_connection()
+            if self.has_internet:
+                offline_delay = self.offline_probe_delay
+                time.sleep(self.probe_interval)
+            else:
+                time.sleep(offline_delay)
+                offline_delay = min(self.max_probe_backoff, offline_delay * 2)
+
+
+metrics_sampler = MetricsSampler()
+metrics_sampler.add_listener(metrics_history.record)
+# Sweep interfaces on every tick so /api/devices rates cover one interval.
+metrics_sampler.add_listener(lambda _snapshot: net_devices.sample(max_age=0))
 
 
-def get_network_info() -> dict:
-    ip_address = 'N/A'
-    mac_address = 'N/A'
+def get_system_metrics() -> dict:
+    """Latest sampled metrics (with their `age` in seconds); never blocks on sampling."""
+    metrics_sampler.start()
+    return metrics_sampler.snapshot()
 
-    for interface in ['wlan0', 'eth0', 'en0', 'enp0s3']:
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            ip_address = socket.inet_ntoa(
-                fcntl.ioctl(
-                    s.fileno(),
-                    0x8915,  # SIOCGIFADDR
-                    struct.pack('256s', interface.encode('utf-8')[:15]),
-                )[20:24]
-            )
-            break
-        except Exception:
-            pass
-
-    for interface in ['wlan0', 'eth0', 'en0', 'enp0s3']:
-        try:
-            with open(f'/sys/class/net/{interface}/address', 'r', encoding='utf-8') as f:
-                mac_address = f.readline().strip()
-            break
-        except Exception:
-            pass
 
-    return {'ip_address': ip_address, 'mac_address': mac_address}
+def get_network_info() -> dict:
+    """Address of the default-route interface (else the first one that is up)."""
+    devices = [d for d in net_devices.sample() if d['type'] != 'Loopback']
+    preferred = default_route_interface()
+    devices.sort(key=lambda d: (d['name'] != preferred, d['operstate'] != 'up'))
+    for device in devices:
+        ip_address = interface_address(device['name'])
+        if ip_address:
+            return {'ip_address': ip_address, 'mac_address': device['mac'] or 'N/A'}
+    return {'ip_address': 'N/A', 'mac_address': devices[0]['mac'] if devices and devices[0]['mac'] else 'N/A'}
 
 
 def build_metrics_blueprint() -> Blueprint:
@@ -85,6 +134,30 @@ def build_metrics_blueprint() -> Blueprint:
     def system_metrics():
         return jsonify(get_system_metrics())
 
+    @bp.route('/api/metrics/history')
+    def metrics_history_route():
+        metrics_sampler.start()
+        names = [n.strip() for n in (request.args.get('series') or '').split(',') if n.strip()]
+        if not names:
+            return jsonify({'success': True, 'series': metrics_history.series_names()})
+
+        try:
+            end = float(request.args.get('to') or time.time())
+            start = float(request.args.get('from') or end - 3600)
+            step = float(request.args['step']) if request.args.get('step') else None
+        except ValueError:
+            return jsonify({'success': False, 'error': 'from, to and step must be numbers'}), 400
+        if step is not None and step <= 0:
+            return jsonify({'success': False, 'error': 'step must be positive'}), 400
+
+        results = {}
+        for name in names:
+            result = metrics_history.query(name, start, end, step)
+            if result is None:
+                return jsonify({'success': False, 'error': f'unknown series: {name}'}), 404
+            results[name] = result
+        return jsonify({'success': True, 'from': start, 'to': end, 'history': results})
+
     @bp.route('/api/network_info')
     def network_info():
         return jsonify(get_network_info())
@@ -92,4 +165,4 @@ def build_metrics_blueprint() -> Blueprint:
     return bp
 
 
-__all__ = ['build_metrics_blueprint', 'get_system_metrics']
+__all__ = ['build_metrics_blueprint', 'get_system_metrics', 'metrics_sampler']
@@ -0,0 +1,233 @@
+"""Persistent metrics archive in a preallocated, memory-mapped ring file.
+
+The file is a small header followed by `capacity` fixed-size records, so
+record N always lives at the same offset: appends are a `struct.pack_into`
+into the mapping (no read-modify-write, no fsync - the kernel writes dirty
+pages back on its own schedule, which keeps SD cards happy) and range reads
+binary-search the ring and unpack only the records they return.
+
+Records are kept in timestamp order for that search. Appends are spaced on
+the monotonic clock; when the wall clock steps back behind the newest record
+(NTP correcting a clock that ran ahead), the records now in the future are
+dropped before appending.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Mapping
+
+from flask import Blueprint, jsonify, request
+
+from auth import is_authenticated
+from config_store import get_metrics_archive_settings
+from metrics import metrics_sampler
+
+MAGIC = b'SCMA'
+VERSION = 1
+# magic, version, record size, capacity, records written so far, oldest kept record
+# (files written before the last field existed read 0 there, which the clamp in
+# _first_index() turns into the right value).
+HEADER = struct.Struct('<4sHHQQQ')
+HEADER_SIZE = 64
+# timestamp, cpu %, memory %, disk %, temperature, memory used GB, storage used GB, has internet
+RECORD = struct.Struct('<dffffffB3x')
+FIELDS = ('cpu_percent', 'memory_percent', 'storage_percent', 'cpu_temp', 'memory_used', 'storage_used', 'has_internet')
+
+
+class MetricsArchive:
+    def __init__(self, path: str, retention_days: float = 30, interval: float = 10.0):
+        self.path = path
+        self.interval = float(interval)
+        self.capacity = max(1, int(float(retention_days) * 86400 / self.interval))
+        self._lock = threading.Lock()
+        self._last_ts = 0.0
+        self._recorded_at: float | None = None
+        self._first = 0
+        self._open()
+
+    def _open(self) -> None:
+        size = HEADER_SIZE + self.capacity * RECORD.size
+        carried: list[bytes] = []
+        if os.path.exists(self.path):
+            carried = self._existing_records(size)
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if carried or os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                # Reserve the blocks now so later appends never grow or fragment the file.
+                if hasattr(os, 'posix_fallocate'):
+                    try:
+                        os.posix_fallocate(fd, 0, size)
+                    except OSError:
+                        pass
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        magic, version, record_size, capacity, count, first = HEADER.unpack_from(self._mm, 0)
+        if carried or (magic, version, record_size, capacity) != (MAGIC, VERSION, RECORD.size, self.capacity):
+            self._count = self._first = 0
+            self._write_header()
+            for record in carried[-self.capacity:]:
+                self._append_raw(record)
+        else:
+            self._count, self._first = count, min(first, count)
+        if self._count > self._first_index():
+            self._last_ts = RECORD.unpack_from(self._mm, self._offset(self._count - 1))[0]
+
+    def _existing_records(self, size: int) -> list[bytes]:
+        """Records of a file written with another capacity (retention change); [] if reusable as is."""
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return []
+                magic, version, record_size, capacity, count, first = HEADER.unpack(header)
+                if (magic, version, record_size) != (MAGIC, VERSION, RECORD.size) or capacity == self.capacity:
+                    return []
+                records = []
+                first = max(0, min(first, count), count - capacity)
+                for n in range(first, count):
+                    f.seek(HEADER_SIZE + (n % capacity) * record_size)
+                    records.append(f.read(record_size))
+                return records
+        except OSError:
+            return []
+
+    def _write_header(self) -> None:
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, RECORD.size, self.capacity, self._count, self._first)
+
+    def _first_index(self) -> int:
+        """Index of the oldest record still in the ring."""
+        return max(self._first, self._count - self.capacity, 0)
+
+    def _offset(self, n: int) -> int:
+        return HEADER_SIZE + (n % self.capacity) * RECORD.size
+
+    def _append_raw(self, record: bytes) -> None:
+        offset = self._offset(self._count)
+        self._mm[offset:offset + RECORD.size] = record
+        self._count += 1
+        self._write_header()
+
+    def record(self, snapshot: Mapping) -> None:
+        """Sampler listener: append at most one record per `interval`."""
+        now = time.monotonic()
+        if self._recorded_at is not None and now - self._recorded_at < self.interval:
+            return
+        ts = float(snapshot.get('sampled_at') or 0.0)
+        values = [float(snapshot.get(field) or 0.0) for field in FIELDS[:-1]]
+        with self._lock:
+            first = self._first_index()
+            if self._count > first and ts < self._last_ts:
+                # The wall clock stepped back: drop what now lies in the future, keeping the ring sorted.
+                self._first = first
+                self._count = self._bisect(first, ts, after=True)
+            RECORD.pack_into(self._mm, self._offset(self._count), ts, *values, 1 if snapshot.get('has_internet') else 0)
+            self._count += 1
+            self._write_header()
+            self._last_ts = ts
+            self._recorded_at = now
+
+    def _bisect(self, first: int, t: float, after: bool = False) -> int:
+        """Index of the first record at or after `t` (strictly after it if `after`)."""
+        lo, hi = first, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            ts = RECORD.unpack_from(self._mm, self._offset(mid))[0]
+            if ts < t or (after and ts == t):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def query(self, start: float, end: float, step: float | None = None) -> list[list]:
+        """Points [timestamp, *FIELDS] between `start` and `end`, averaged per `step` seconds."""
+        step = max(float(step or self.interval), self.interval)
+        points: list[list] = []
+        with self._lock:
+            bucket = None
+            for n in range(self._bisect(self._first_index(), start), self._count):
+                ts, *values = RECORD.unpack_from(self._mm, self._offset(n))
+                if ts > end:
+                    break
+                key = ts - ts % step
+                if bucket is None or bucket[0] != key:
+                    if bucket is not None:
+                        points.append(self._point(bucket))
+                    bucket = [key, 0, [0.0] * len(values)]
+                bucket[1] += 1
+                bucket[2] = [total + value for total, value in zip(bucket[2], values)]
+            if bucket is not None:
+                points.append(self._point(bucket))
+        return points
+
+    @staticmethod
+    def _point(bucket: list) -> list:
+        key, count, totals = bucket
+        return [key] + [round(total / count, 2) for total in totals]
+
+    def close(self) -> None:
+        with self._lock:
+            self._mm.flush()
+            self._mm.close()
+
+
+metrics_archive: MetricsArchive | None = None
+
+
+def start_metrics_archive() -> MetricsArchive | None:
+    global metrics_archive
+    settings = get_metrics_archive_settings()
+    if not settings.get('enabled'):
+        return None
+    metrics_archive = MetricsArchive(
+        settings['path'],
+        retention_days=settings['retention_days'],
+        interval=settings['interval'],
+    )
+    metrics_sampler.add_listener(metrics_archive.record)
+    metrics_sampler.start()
+    return metrics_archive
+
+
+def build_metrics_archive_blueprint() -> Blueprint:
+    bp = Blueprint('metrics_archive', __name__)
+
+    @bp.route('/api/metrics/archive')
+    def metrics_archive_route():
+        if not is_authenticated():
+            return jsonify({'success': False, 'error': 'unauthorized'}), 401
+        if metrics_archive is None:
+            return jsonify({'success': False, 'error': 'metrics archive disabled'}), 503
+        try:
+            end = float(request.args.get('to') or time.time())
+            start = float(request.args.get('from') or end - 86400)
+            step = float(request.args['step']) if request.args.get('step') else None
+        except ValueError:
+            return jsonify({'success': False, 'error': 'from, to and step must be numbers'}), 400
+        if step is not None and step <= 0:
+            return jsonify({'success': False, 'error': 'step must be positive'}), 400
+
+        points = metrics_archive.query(start, end, step)
+        return jsonify(
+            {
+                'success': True,
+                'from': start,
+                'to': end,
+                'fields': ['timestamp', *FIELDS],
+                'points': points,
+            }
+        )
+
+    return bp
+
+
+__all__ = ['FIELDS', 'MetricsArchive', 'build_metrics_archive_blueprint', 'start_metrics_archive']
@@ -0,0 +1,170 @@
+"""Fixed-size in-memory history of host metrics.
+
+Every series keeps one ring buffer per resolution (1 s, 10 s and 1 min by
+default), backed by `array` so memory use is fixed at startup no matter how
+long the server runs. Coarser rings hold min/avg/max per bucket; queries
+re-bucket the best matching ring to the requested step.
+"""
+
+from __future__ import annotations
+
+import threading
+from array import array
+from typing import Mapping
+
+# (bucket seconds, buckets kept): 1 h of 1 s, 1 day of 10 s, 7 days of 1 min.
+RESOLUTIONS = ((1, 3600), (10, 8640), (60, 10080))
+
+
+class _Ring:
+    """Circular buffer of (timestamp, min, avg, max) buckets, oldest first."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ts = array('d', bytes(8 * capacity))
+        self.mins = array('f', bytes(4 * capacity))
+        self.avgs = array('f', bytes(4 * capacity))
+        self.maxs = array('f', bytes(4 * capacity))
+        self.start = 0
+        self.size = 0
+
+    def append(self, ts: float, mn: float, avg: float, mx: float) -> None:
+        if self.size < self.capacity:
+            i = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            i = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.ts[i] = ts
+        self.mins[i] = mn
+        self.avgs[i] = avg
+        self.maxs[i] = mx
+
+    def oldest(self) -> float | None:
+        return self.ts[self.start] if self.size else None
+
+    def _first_at_or_after(self, t: float) -> int:
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts[(self.start + mid) % self.capacity] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def range(self, t0: float, t1: float):
+        for n in range(self._first_at_or_after(t0), self.size):
+            i = (self.start + n) % self.capacity
+            if self.ts[i] > t1:
+                break
+            yield self.ts[i], self.mins[i], self.avgs[i], self.maxs[i]
+
+
+class _Series:
+    def __init__(self, resolutions):
+        self.steps = [step for step, _ in resolutions]
+        self.rings = [_Ring(capacity) for _, capacity in resolutions]
+        # Open bucket per coarse level: [bucket start, count, sum, min, max].
+        self.pending: list[list | None] = [None] * len(resolutions)
+
+    def add(self, ts: float, value: float) -> None:
+        for level, step in enumerate(self.steps):
+            if step <= 1:
+                self.rings[level].append(ts, value, value, value)
+                continue
+            bucket = ts - ts % step
+            pending = self.pending[level]
+            if pending is not None and pending[0] != bucket:
+                self.rings[level].append(pending[0], pending[3], pending[2] / pending[1], pending[4])
+                pending = None
+            if pending is None:
+                self.pending[level] = [bucket, 1, value, value, value]
+            else:
+                pending[1] += 1
+                pending[2] += value
+                pending[3] = min(pending[3], value)
+                pending[4] = max(pending[4], value)
+
+
+class MetricsHistory:
+    def __init__(self, resolutions=RESOLUTIONS):
+        self.resolutions = resolutions
+        self._series: dict[str, _Series] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _values(snapshot: Mapping) -> dict[str, float]:
+        values = {
+            'cpu': snapshot.get('cpu_percent'),
+            'memory': snapshot.get('memory_percent'),
+            'disk': snapshot.get('storage_percent'),
+            'temperature': snapshot.get('cpu_temp'),
+        }
+        for core, value in enumerate(snapshot.get('cpu_percent_per_core') or []):
+            values[f'cpu_core_{core}'] = value
+        return {name: float(value) for name, value in values.items() if value is not None}
+
+    def record(self, snapshot: Mapping) -> None:
+        """Sampler listener: append one snapshot to every series."""
+        ts = float(snapshot.get('sampled_at') or 0.0)
+        with self._lock:
+            for name, value in self._values(snapshot).items():
+                series = self._series.get(name)
+                if series is None:
+                    series = self._series[name] = _Series(self.resolutions)
+                series.add(ts, value)
+
+    def series_names(self) -> list[str]:
+        with self._lock:
+            return sorted(self._series)
+
+    def query(self, name: str, start: float, end: float, step: float | None = None) -> dict | None:
+        """min/avg/max points of `step` seconds between `start` and `end` (epoch seconds)."""
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                return None
+
+            # Rings reaching back to `start`; among those, the coarsest one that
+            # is still at least as fine as `step` (fewest points to fold).
+            covering = [
+                level
+                for level, ring in enumerate(series.rings)
+                if ring.oldest() is not None and ring.oldest() <= start
+            ]
+            eligible = [level for level in covering if step is not None and series.steps[level] <= step]
+            if eligible:
+                level = max(eligible)
+            elif covering:
+                level = min(covering)
+            else:
+                # Nothing reaches back that far: use whichever ring holds the oldest data.
+                filled = [(ring.oldest(), level) for level, ring in enumerate(series.rings) if ring.size]
+                level = min(filled)[1] if filled else 0
+            resolution = series.steps[level]
+            step = max(float(step or resolution), float(resolution))
+
+            points = []
+            bucket = None
+            for ts, mn, avg, mx in series.rings[level].range(start, end):
+                key = ts - ts % step
+                if bucket is None or bucket[0] != key:
+                    if bucket is not None:
+                        points.append([bucket[0], round(bucket[1], 2), round(bucket[2] / bucket[4], 2), round(bucket[3], 2)])
+                    bucket = [key, mn, avg, mx, 1]
+                else:
+                    bucket[1] = min(bucket[1], mn)
+                    bucket[2] += avg
+                    bucket[3] = max(bucket[3], mx)
+                    bucket[4] += 1
+            if bucket is not None:
+                points.append([bucket[0], round(bucket[1], 2), round(bucket[2] / bucket[4], 2), round(bucket[3], 2)])
+
+        return {'series': name, 'resolution': resolution, 'step': step, 'points': points}
+
+
+metrics_history = MetricsHistory()
+
+
+__all__ = ['MetricsHistory', 'metrics_history']
@@ -1,3 +1,4 @@
+import threading
 import time
 
 import paho.mqtt.client as mqtt
@@ -7,6 +8,25 @@ from auth import is_authenticated
 from config_store import get_mqtt_connection_settings, save_mqtt_connection
 
 
+# Process-wide message counters; they survive broker reconnects (exported on /metrics).
+_counters = {'messages_received': 0, 'bytes_received': 0, 'messages_published': 0, 'bytes_published': 0}
+_counters_lock = threading.Lock()
+
+
+def _count(kind: str, size: int) -> None:
+    with _counters_lock:
+        _counters[f'messages_{kind}'] += 1
+        _counters[f'bytes_{kind}'] += size
+
+
+def get_mqtt_counters() -> dict:
+    with _counters_lock:
+        counters = dict(_counters)
+    counters['connected'] = bool(mqtt_manager and mqtt_manager.connected)
+    counters['topics'] = len(mqtt_manager.topics) if mqtt_manager else 0
+    return counters
+
+
 class MQTTManager:
     def __init__(self, socketio_instance):
         self.client = None
@@ -61,6 +81,7 @@ class MQTTManager:
         if self.client and self.connected:
             try:
                 self.client.publish(topic, payload, qos, retain)
+                _count('published', len(payload if isinstance(payload, bytes) else str(payload).encode('utf-8')))
                 return True
             except Exception as e:
                 self.socketio.emit('mqtt_error', {'error': str(e)}, namespace='/mqtt')
@@ -86,6 +107,7 @@ class MQTTManager:
 
     def on_message(self, client, userdata, msg):
         try:
+            _count('received', len(msg.payload))
             topic = msg.topic
             payload = msg.payload.decode('utf-8')
 
@@ -202,4 +224,4 @@ def mqtt_cleanup_on_shutdown():
         mqtt_manager = None
 
 
-__all__ = ['build_mqtt_blueprint', 'register_mqtt_socket_handlers', 'mqtt_cleanup_on_shutdown']
+__all__ = ['build_mqtt_blueprint', 'get_mqtt_counters', 'register_mqtt_socket_handlers', 'mqtt_cleanup_on_shutdown']
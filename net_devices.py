@@ -0,0 +1,182 @@
+"""Network interface inventory and traffic counters without spawning anything.
+
+Interfaces are enumerated from `/sys/class/net`; their counters come from one
+read of `/proc/net/dev` (kept open, re-read with `os.pread`). Rates are the
+delta against the previous sweep. The interface kind never changes and is
+cached per sysfs node, so a sweep with dozens of veths reads only `address`
+(MACs can be randomized or set at any time) and `operstate` besides the
+counters.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import socket
+import struct
+import threading
+import time
+
+SYS_CLASS_NET = '/sys/class/net'
+PROC_NET_DEV = '/proc/net/dev'
+PROC_NET_ROUTE = '/proc/net/route'
+SIOCGIFADDR = 0x8915
+ARPHRD_LOOPBACK = 772
+# /proc/net/dev columns we report, in file order (receive then transmit).
+RX_FIELDS = ('rx_bytes', 'rx_packets', 'rx_errors', 'rx_drop')
+TX_FIELDS = ('tx_bytes', 'tx_packets', 'tx_errors', 'tx_drop')
+
+
+def _read_text(path: str) -> str:
+    try:
+        with open(path, 'r', encoding='ascii', errors='replace') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def _device_type(name: str, path: str) -> str:
+    if name.startswith('wlan') or os.path.isdir(os.path.join(path, 'wireless')):
+        return 'Wireless'
+    if name.startswith(('eth', 'enp', 'eno', 'ens', 'enx')) and os.path.exists(os.path.join(path, 'device')):
+        return 'Ethernet'
+    if name.startswith(('docker', 'br-', 'veth')):
+        return 'Docker'
+    if _read_text(os.path.join(path, 'type')) == str(ARPHRD_LOOPBACK):
+        return 'Loopback'
+    if os.path.isdir(os.path.join(path, 'bridge')):
+        return 'Bridge'
+    if name.startswith(('eth', 'enp')):
+        return 'Ethernet'
+    if not os.path.exists(os.path.join(path, 'device')):
+        return 'Virtual'
+    return 'Unknown'
+
+
+def parse_net_dev(data: bytes) -> dict[str, tuple[int, ...]]:
+    counters = {}
+    for line in data.split(b'\n')[2:]:
+        name, sep, rest = line.partition(b':')
+        if not sep:
+            continue
+        values = rest.split()
+        if len(values) < 12:
+            continue
+        # bytes packets errs drop ... (8 receive columns), then the same for transmit.
+        counters[name.strip().decode('ascii', 'replace')] = tuple(int(v) for v in values[0:4] + values[8:12])
+    return counters
+
+
+def interface_address(name: str) -> str | None:
+    """IPv4 address of `name`, or None."""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            packed = fcntl.ioctl(s.fileno(), SIOCGIFADDR, struct.pack('256s', name.encode('utf-8')[:15]))
+            return socket.inet_ntoa(packed[20:24])
+    except OSError:
+        return None
+
+
+def default_route_interface() -> str | None:
+    text = _read_text(PROC_NET_ROUTE)
+    for line in text.splitlines()[1:]:
+        fields = line.split()
+        # Destination 00000000 with the gateway flag is the default route.
+        if len(fields) > 3 and fields[1] == '00000000' and int(fields[3], 16) & 0x2:
+            return fields[0]
+    return None
+
+
+class NetDeviceCollector:
+    """`sample()` reuses a sweep younger than `max_age`."""
+
+    def __init__(self, max_age: float = 1.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._types: dict[tuple[str, int], str] = {}
+        self._previous: dict[str, tuple] = {}
+        self._previous_at = 0.0
+        self._snapshot: list[dict] = []
+        self._sampled_at = 0.0
+        try:
+            self._dev_fd: int | None = os.open(PROC_NET_DEV, os.O_RDONLY)
+        except OSError:
+            self._dev_fd = None
+
+    def _counters(self) -> dict[str, tuple[int, ...]]:
+        if self._dev_fd is None:
+            return {}
+        try:
+            chunks = []
+            offset = 0
+            while True:
+                chunk = os.pread(self._dev_fd, 65536, offset)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                offset += len(chunk)
+            return parse_net_dev(b''.join(chunks))
+        except OSError:
+            return {}
+
+    def _device_type(self, key: tuple[str, int], path: str) -> str:
+        kind = self._types.get(key)
+        if kind is None:
+            kind = self._types[key] = _device_type(key[0], path)
+        return kind
+
+    def sample(self, max_age: float | None = None) -> list[dict]:
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            now = time.monotonic()
+            if now - self._sampled_at < max_age:
+                return self._snapshot
+
+            counters = self._counters()
+            elapsed = now - self._previous_at
+            devices = []
+            seen = set()
+            try:
+                entries = sorted(os.scandir(SYS_CLASS_NET), key=lambda e: e.name)
+            except OSError:
+                entries = []
+            for entry in entries:
+                try:
+                    # Interfaces are links to device directories; skip files such as bonding_masters.
+                    if not entry.is_dir():
+                        continue
+                except OSError:
+                    continue
+                name, path = entry.name, entry.path
+                # Keyed by (name, sysfs inode): a recreated interface gets a new node.
+                key = (name, entry.inode())
+                seen.add(key)
+                device = {
+                    'name': name,
+                    'type': self._device_type(key, path),
+                    'mac': _read_text(os.path.join(path, 'address')),
+                    'operstate': _read_text(os.path.join(path, 'operstate')),
+                }
+                values = counters.get(name)
+                if values is not None:
+                    device.update(zip(RX_FIELDS + TX_FIELDS, values))
+                    previous = self._previous.get(name)
+                    rates = [None, None]
+                    if previous is not None and elapsed > 0:
+                        for i, column in enumerate((0, 4)):
+                            delta = values[column] - previous[column]
+                            # Counters reset when a driver reloads; skip that interval.
+                            rates[i] = round(delta / elapsed, 1) if delta >= 0 else None
+                    device['rx_rate'], device['tx_rate'] = rates
+                devices.append(device)
+
+            self._types = {key: value for key, value in self._types.items() if key in seen}
+            self._previous, self._previous_at = counters, now
+            self._snapshot, self._sampled_at = devices, now
+            return devices
+
+
+net_devices = NetDeviceCollector()
+
+
+__all__ = ['NetDeviceCollector', 'default_route_interface', 'interface_address', 'net_devices', 'parse_net_dev']
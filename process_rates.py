@@ -0,0 +1,128 @@
+"""Per-process disk I/O and network byte rates.
+
+Disk rates come from `read_bytes`/`write_bytes` in `/proc/<pid>/io`. Network
+counters only exist per network namespace, so a process's traffic is known
+when it has a namespace of its own (containers, sandboxed services): then
+`/proc/<pid>/net/dev` summed over non-loopback interfaces is its traffic. For
+processes in the host namespace no rate is reported (`net_scope` 'host').
+
+Tracker state is one small tuple per PID, replaced when the PID is reused
+(different create_time), dropped when the process is gone and capped at
+`max_entries`.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+from net_devices import parse_net_dev
+
+
+def _host_netns() -> int | None:
+    try:
+        return os.stat('/proc/self/ns/net').st_ino
+    except OSError:
+        return None
+
+
+def read_io_bytes(pid: int) -> tuple[int, int] | None:
+    try:
+        with open(f'/proc/{pid}/io', 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    read_bytes = write_bytes = None
+    for line in data.split(b'\n'):
+        key, _, value = line.partition(b':')
+        if key == b'read_bytes':
+            read_bytes = int(value)
+        elif key == b'write_bytes':
+            write_bytes = int(value)
+    if read_bytes is None or write_bytes is None:
+        return None
+    return read_bytes, write_bytes
+
+
+def read_netns_bytes(pid: int) -> tuple[int, int] | None:
+    """(rx, tx) bytes of the process's network namespace, excluding loopback."""
+    try:
+        with open(f'/proc/{pid}/net/dev', 'rb') as f:
+            counters = parse_net_dev(f.read())
+    except OSError:
+        return None
+    rx = sum(values[0] for name, values in counters.items() if name != 'lo')
+    tx = sum(values[4] for name, values in counters.items() if name != 'lo')
+    return rx, tx
+
+
+def _rate(current, previous, elapsed: float) -> float | None:
+    if current is None or previous is None or elapsed <= 0 or current < previous:
+        return None
+    return round((current - previous) / elapsed, 1)
+
+
+class ProcessRateTracker:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.host_netns = _host_netns()
+        # pid -> (create_time, monotonic time, read_bytes, write_bytes, rx_bytes, tx_bytes)
+        self._state: dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _net_scope(self, pid: int) -> str | None:
+        try:
+            netns = os.stat(f'/proc/{pid}/ns/net').st_ino
+        except OSError:
+            return None
+        return 'host' if netns == self.host_netns else 'netns'
+
+    def rates(self, pid: int, create_time: float) -> dict:
+        """Rates since the previous call for this process (None on the first call)."""
+        now = time.monotonic()
+        io = read_io_bytes(pid)
+        read_bytes, write_bytes = io if io is not None else (None, None)
+        scope = self._net_scope(pid)
+        net = read_netns_bytes(pid) if scope == 'netns' else None
+        rx_bytes, tx_bytes = net if net is not None else (None, None)
+
+        with self._lock:
+            previous = self._state.pop(pid, None)
+            if previous is not None and previous[0] != create_time:
+                previous = None
+            self._state[pid] = (create_time, now, read_bytes, write_bytes, rx_bytes, tx_bytes)
+            if len(self._state) > self.max_entries:
+                self._prune()
+
+        elapsed = now - previous[1] if previous is not None else 0.0
+        previous = previous or (None,) * 6
+        return {
+            'io_read_bytes': read_bytes,
+            'io_write_bytes': write_bytes,
+            'io_read_rate': _rate(read_bytes, previous[2], elapsed),
+            'io_write_rate': _rate(write_bytes, previous[3], elapsed),
+            'net_scope': scope,
+            'net_rx_rate': _rate(rx_bytes, previous[4], elapsed),
+            'net_tx_rate': _rate(tx_bytes, previous[5], elapsed),
+        }
+
+    def _prune(self) -> None:
+        # Exited processes first, then the least recently queried ones.
+        for pid in [pid for pid in self._state if not os.path.exists(f'/proc/{pid}')]:
+            del self._state[pid]
+        excess = len(self._state) - self.max_entries
+        if excess > 0:
+            # Dicts keep insertion order and rates() re-inserts on every call.
+            for pid in list(self._state)[:excess]:
+                del self._state[pid]
+
+    def forget(self, pid: int) -> None:
+        with self._lock:
+            self._state.pop(pid, None)
+
+
+process_rates = ProcessRateTracker()
+
+
+__all__ = ['ProcessRateTracker', 'process_rates', 'read_io_bytes', 'read_netns_bytes']
@@ -0,0 +1,175 @@
+"""Shared process table snapshots.
+
+One background thread walks the process table every `interval` seconds while
+someone is reading it, and every reader gets that same immutable snapshot:
+
+- dynamic fields come from one `oneshot()` read per process (`process_iter`
+  with `attrs`), and psutil keeps the Process objects between passes so
+  `cpu_percent` covers one interval;
+- exe, cwd and cmdline are read once per process lifetime, keyed by
+  (pid, create_time);
+- network connection counts come from one pass over `/proc/net/{tcp,udp}*`
+  for the set of inet socket inodes plus one fd scan per process, instead of
+  a full socket-table scan per process.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from types import MappingProxyType
+
+import psutil
+
+DYNAMIC_ATTRS = ['pid', 'ppid', 'name', 'username', 'status', 'create_time', 'cpu_percent', 'memory_info', 'num_threads']
+STATIC_ATTRS = ['exe', 'cwd', 'cmdline']
+INET_TABLES = ('/proc/net/tcp', '/proc/net/tcp6', '/proc/net/udp', '/proc/net/udp6')
+MAX_CMDLINE_ARGS = 40
+
+
+def inet_socket_inodes(tables=INET_TABLES) -> set[int]:
+    """Inodes of every TCP/UDP socket on the host (what `net_connections()` reports)."""
+    inodes = set()
+    for path in tables:
+        try:
+            with open(path, 'rb') as f:
+                next(f, None)
+                for line in f:
+                    fields = line.split()
+                    if len(fields) > 9:
+                        inodes.add(int(fields[9]))
+        except OSError:
+            continue
+    return inodes
+
+
+def count_sockets(pid: int, inodes: set[int]) -> int:
+    count = 0
+    try:
+        with os.scandir(f'/proc/{pid}/fd') as it:
+            for entry in it:
+                try:
+                    target = os.readlink(entry.path)
+                except OSError:
+                    continue
+                # "socket:[12345]"
+                if target.startswith('socket:[') and int(target[8:-1]) in inodes:
+                    count += 1
+    except OSError:
+        return 0
+    return count
+
+
+class ProcessSnapshot:
+    """Immutable result of one pass: `processes` (tuple of read-only dicts) and `by_pid`."""
+
+    __slots__ = ('processes', 'by_pid', 'sampled_at', 'duration')
+
+    def __init__(self, processes: list[dict], sampled_at: float, duration: float):
+        self.processes = tuple(MappingProxyType(p) for p in processes)
+        self.by_pid = MappingProxyType({p['pid']: p for p in self.processes})
+        self.sampled_at = sampled_at
+        self.duration = duration
+
+
+class ProcessSnapshotEngine:
+    def __init__(self, interval: float = 2.0, idle_timeout: float = 30.0):
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self._static: dict[tuple[int, float], dict] = {}
+        self._snapshot: ProcessSnapshot | None = None
+        self._last_read = 0.0
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._sample_lock = threading.Lock()
+
+    def _static_fields(self, proc: psutil.Process, key: tuple[int, float]) -> dict:
+        fields = self._static.get(key)
+        if fields is None:
+            try:
+                fields = proc.as_dict(attrs=STATIC_ATTRS, ad_value=None)
+            except psutil.NoSuchProcess:
+                fields = {}
+            cmdline = fields.get('cmdline') or []
+            if len(cmdline) > MAX_CMDLINE_ARGS:
+                cmdline = cmdline[:MAX_CMDLINE_ARGS] + ['...']
+            fields = {'exe': fields.get('exe') or '', 'cwd': fields.get('cwd') or '', 'cmdline': cmdline}
+            self._static[key] = fields
+        return fields
+
+    def sample(self) -> ProcessSnapshot:
+        """Walk the process table now (one pass at a time)."""
+        with self._sample_lock:
+            started = time.monotonic()
+            inodes = inet_socket_inodes()
+            processes = []
+            alive = set()
+            for proc in psutil.process_iter(DYNAMIC_ATTRS, ad_value=None):
+                info = proc.info
+                pid = info['pid']
+                key = (pid, info.get('create_time') or 0.0)
+                alive.add(key)
+                memory = info.get('memory_info')
+                processes.append(
+                    {
+                        'pid': pid,
+                        'ppid': info.get('ppid'),
+                        'name': info.get('name') or 'unknown',
+                        'username': info.get('username') or '',
+                        'status': info.get('status') or '',
+                        'create_time': info.get('create_time'),
+                        'cpu_percent': info.get('cpu_percent') or 0.0,
+                        'memory_rss': memory.rss if memory else 0,
+                        'memory_vms': memory.vms if memory else 0,
+                        'threads': info.get('num_threads') or 0,
+                        'network_connections': count_sockets(pid, inodes) if inodes else 0,
+                        **self._static_fields(proc, key),
+                    }
+                )
+            # Forget processes that exited (their pid may be reused).
+            self._static = {key: value for key, value in self._static.items() if key in alive}
+            snapshot = ProcessSnapshot(processes, time.time(), time.monotonic() - started)
+            self._snapshot = snapshot
+            return snapshot
+
+    def get(self) -> ProcessSnapshot:
+        """Latest snapshot; starts the sampling thread on first use."""
+        self._last_read = time.monotonic()
+        self._ensure_running()
+        if not self._stale(self._snapshot):
+            return self._snapshot
+        # First read, or the thread had stopped: wait for a pass in flight
+        # rather than serving (or duplicating) an old one.
+        with self._sample_lock:
+            snapshot = self._snapshot
+        return snapshot if not self._stale(snapshot) else self.sample()
+
+    def _stale(self, snapshot: ProcessSnapshot | None) -> bool:
+        return snapshot is None or time.time() - snapshot.sampled_at > self.interval * 2 + snapshot.duration
+
+    def _ensure_running(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sample()
+            except Exception:
+                pass
+            time.sleep(self.interval)
+            with self._lock:
+                # Nobody has asked for a while: stop walking /proc until someone does.
+                if time.monotonic() - self._last_read > self.idle_timeout:
+                    self._thread = None
+                    return
+
+
+process_snapshots = ProcessSnapshotEngine()
+
+
+__all__ = ['ProcessSnapshot', 'ProcessSnapshotEngine', 'process_snapshots']
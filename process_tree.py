@@ -0,0 +1,151 @@
+"""Parent/child process hierarchy with subtree totals.
+
+The tree is kept between snapshots. Each update diffs the new snapshot
+against the previous one, marks processes whose own numbers or parent
+changed (plus everything above them) and recomputes totals for those nodes
+only; untouched branches keep their totals. A fleet of idle workers under
+one master therefore costs a dictionary lookup per worker, not a re-sum.
+"""
+
+from __future__ import annotations
+
+import threading
+
+# Summed over a subtree; `processes` counts the nodes themselves.
+TOTAL_FIELDS = ('cpu_percent', 'memory_rss', 'threads', 'network_connections')
+
+
+class _Node:
+    __slots__ = ('pid', 'proc', 'own', 'parent', 'children', 'totals')
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.proc = None
+        self.own: tuple = ()
+        self.parent: int | None = None
+        self.children: set[int] = set()
+        self.totals: tuple = ()
+
+
+class ProcessTree:
+    def __init__(self):
+        self._nodes: dict[int, _Node] = {}
+        self._created: dict[int, float | None] = {}
+        self.sampled_at = 0.0
+        self.recomputed = 0
+        self._lock = threading.Lock()
+
+    def update(self, snapshot) -> None:
+        """Bring the tree in line with a ProcessSnapshot (no-op if already applied)."""
+        with self._lock:
+            if snapshot.sampled_at == self.sampled_at:
+                return
+            nodes = self._nodes
+            current = snapshot.by_pid
+            dirty: set[int] = set()
+
+            for pid in [pid for pid in nodes if pid not in current or self._created[pid] != current[pid]['create_time']]:
+                self._detach(pid, dirty)
+                for child in nodes[pid].children:
+                    # Re-attached below, to whatever their ppid now names.
+                    if child in nodes:
+                        nodes[child].parent = None
+                        dirty.add(child)
+                del nodes[pid]
+                del self._created[pid]
+
+            for pid, proc in current.items():
+                if pid not in nodes:
+                    nodes[pid] = _Node(pid)
+                    self._created[pid] = proc['create_time']
+                    dirty.add(pid)
+
+            for pid, proc in current.items():
+                node = nodes[pid]
+                node.proc = proc
+                own = tuple(proc[field] for field in TOTAL_FIELDS)
+                if node.own != own:
+                    node.own = own
+                    dirty.add(pid)
+                parent = proc['ppid'] if proc['ppid'] in current and proc['ppid'] != pid else None
+                if node.parent != parent:
+                    self._detach(pid, dirty)
+                    node.parent = parent
+                    dirty.add(pid)
+                    if parent is not None:
+                        nodes[parent].children.add(pid)
+                        dirty.add(parent)
+
+            self._recompute(self._with_ancestors(dirty))
+            self.sampled_at = snapshot.sampled_at
+
+    def _detach(self, pid: int, dirty: set[int]) -> None:
+        node = self._nodes.get(pid)
+        if node is None or node.parent is None:
+            return
+        parent = self._nodes.get(node.parent)
+        if parent is not None:
+            parent.children.discard(pid)
+            dirty.add(parent.pid)
+        node.parent = None
+
+    def _with_ancestors(self, dirty: set[int]) -> set[int]:
+        marked = set()
+        for pid in dirty:
+            while pid is not None and pid not in marked and pid in self._nodes:
+                marked.add(pid)
+                pid = self._nodes[pid].parent
+        return marked
+
+    def _recompute(self, dirty: set[int]) -> None:
+        # Post-order over dirty nodes only; clean children contribute their cached totals.
+        nodes = self._nodes
+        done: set[int] = set()
+        for start in dirty:
+            stack = [(start, False)]
+            while stack:
+                pid, expanded = stack.pop()
+                if pid in done:
+                    continue
+                node = nodes[pid]
+                if not expanded:
+                    stack.append((pid, True))
+                    stack.extend((child, False) for child in node.children if child in dirty and child not in done)
+                    continue
+                totals = list(node.own) + [1]
+                for child in node.children:
+                    for i, value in enumerate(nodes[child].totals):
+                        totals[i] += value
+                node.totals = tuple(totals)
+                done.add(pid)
+        self.recomputed = len(done)
+
+    def roots(self) -> list[int]:
+        with self._lock:
+            return [pid for pid, node in self._nodes.items() if node.parent is None]
+
+    def subtree(self, pid: int, max_depth: int | None = None, visit=None):
+        """Nested view below `pid`; visit(proc, totals, children, child_count) builds each node.
+
+        Children are ordered by subtree totals (CPU first), largest first.
+        """
+        with self._lock:
+            node = self._nodes.get(pid)
+            if node is None:
+                return None
+            return self._build(node, max_depth, visit)
+
+    def _build(self, node: _Node, depth: int | None, visit):
+        totals = dict(zip(TOTAL_FIELDS + ('processes',), node.totals))
+        children = []
+        if depth is None or depth > 0:
+            kids = [self._nodes[child] for child in node.children]
+            kids.sort(key=lambda n: n.totals, reverse=True)
+            children = [self._build(kid, None if depth is None else depth - 1, visit) for kid in kids]
+        return visit(node.proc, totals, children, len(node.children))
+
+
+process_tree = ProcessTree()
+
+
+__all__ = ['ProcessTree', 'TOTAL_FIELDS', 'process_tree']
@@ -0,0 +1,181 @@
+"""Shared watch-list sampler for per-process metrics.
+
+Clients register the PIDs they chart; one ticker samples every watched PID
+once per tick and each client gets a single `process_metrics_batch` frame
+with the PIDs it asked for. CPU is `cpu_percent(interval=None)` on Process
+objects kept between ticks, so sampling never sleeps, and connection counts
+use one pass over the socket tables per tick for all PIDs together.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import psutil
+
+from process_rates import process_rates
+from process_snapshot import count_sockets, inet_socket_inodes
+
+MAX_WATCHED_PER_CLIENT = 64
+
+
+def _cores() -> int:
+    return psutil.cpu_count() or 1
+
+
+class ProcessMetricsSampler:
+    """Non-blocking metrics for individual PIDs; keeps one Process object per PID asked about."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._procs: dict[int, psutil.Process] = {}
+        self._lock = threading.Lock()
+
+    def _process(self, pid: int) -> psutil.Process:
+        proc = self._procs.get(pid)
+        # is_running() compares create_time, so a reused PID gets a fresh object.
+        if proc is None or not proc.is_running():
+            proc = psutil.Process(pid)
+            # Primes the CPU counter: the first reading of a new object is 0.0.
+            proc.cpu_percent(interval=None)
+            self._procs.pop(pid, None)
+            self._procs[pid] = proc
+            if len(self._procs) > self.max_entries:
+                # PIDs polled over HTTP are never unwatched; drop the oldest.
+                for stale in list(self._procs)[: len(self._procs) - self.max_entries]:
+                    del self._procs[stale]
+        return proc
+
+    def sample(self, pid: int, inodes: set[int] | None = None) -> dict:
+        """Metrics for one PID; raises psutil.NoSuchProcess / AccessDenied like psutil does."""
+        with self._lock:
+            proc = self._process(pid)
+        with proc.oneshot():
+            cpu = proc.cpu_percent(interval=None)
+            memory = proc.memory_info()
+            memory_percent = proc.memory_percent()
+            name = proc.name()
+            status = proc.status()
+            try:
+                threads = proc.num_threads()
+            except (psutil.AccessDenied, psutil.ZombieProcess):
+                threads = 0
+            create_time = proc.create_time()
+
+        if inodes is None:
+            inodes = inet_socket_inodes()
+        rates = process_rates.rates(pid, create_time)
+        # KB/s for the chart; only known for processes in their own network namespace.
+        net_rates = [rates['net_rx_rate'], rates['net_tx_rate']]
+        return {
+            'process_name': name,
+            'status': status,
+            'cpu_percent': min(100.0, max(0.0, cpu / _cores())),
+            'memory_rss': memory.rss,
+            'memory_vms': memory.vms,
+            'memory_percent': memory_percent,
+            'threads': threads,
+            'network_connections': count_sockets(pid, inodes) if inodes else 0,
+            'network_traffic': round(sum(r for r in net_rates if r is not None) / 1024.0, 2),
+            **rates,
+            'timestamp': time.time(),
+        }
+
+    def forget(self, pid: int) -> None:
+        with self._lock:
+            self._procs.pop(pid, None)
+        process_rates.forget(pid)
+
+
+process_metrics_sampler = ProcessMetricsSampler()
+
+
+class ProcessWatchList:
+    """sid -> watched PIDs, plus the ticker that serves them while any are watched."""
+
+    def __init__(self, sampler: ProcessMetricsSampler, interval: float = 1.0):
+        self.sampler = sampler
+        self.interval = interval
+        self._watches: dict[str, set[int]] = {}
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def watch(self, socketio, sid: str, pids, replace: bool = False) -> list[int]:
+        with self._lock:
+            watched = set() if replace else set(self._watches.get(sid, ()))
+            watched.update(int(pid) for pid in pids)
+            watched = set(sorted(watched)[:MAX_WATCHED_PER_CLIENT])
+            if watched:
+                self._watches[sid] = watched
+            else:
+                self._watches.pop(sid, None)
+            if self._watches and self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(socketio,), daemon=True)
+                self._thread.start()
+            return sorted(watched)
+
+    def unwatch(self, sid: str, pids=None) -> None:
+        with self._lock:
+            if pids is None:
+                self._watches.pop(sid, None)
+                return
+            watched = self._watches.get(sid)
+            if watched is not None:
+                watched.difference_update(int(pid) for pid in pids)
+                if not watched:
+                    del self._watches[sid]
+
+    def _run(self, socketio) -> None:
+        while True:
+            started = time.monotonic()
+            with self._lock:
+                if not self._watches:
+                    self._thread = None
+                    return
+                watches = {sid: set(pids) for sid, pids in self._watches.items()}
+            try:
+                self._tick(socketio, watches)
+            except Exception:
+                pass
+            socketio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _tick(self, socketio, watches: dict[str, set[int]]) -> None:
+        inodes = inet_socket_inodes()
+        results: dict[int, dict] = {}
+        errors: dict[int, str] = {}
+        exited: set[int] = set()
+        for pid in set().union(*watches.values()):
+            try:
+                results[pid] = self.sampler.sample(pid, inodes)
+            except psutil.NoSuchProcess:
+                exited.add(pid)
+                self.sampler.forget(pid)
+            except (psutil.AccessDenied, psutil.ZombieProcess) as e:
+                errors[pid] = str(e) or type(e).__name__
+
+        for sid, pids in watches.items():
+            gone = sorted(pids & exited)
+            if gone:
+                self.unwatch(sid, gone)
+            socketio.emit(
+                'process_metrics_batch',
+                {
+                    'timestamp': time.time(),
+                    'processes': {str(pid): results[pid] for pid in pids if pid in results},
+                    'errors': {str(pid): errors[pid] for pid in pids if pid in errors},
+                    'exited': gone,
+                },
+                room=sid,
+                namespace='/',
+            )
+
+
+process_watch_list = ProcessWatchList(process_metrics_sampler)
+
+
+def process_watch_cleanup_on_disconnect(sid: str) -> None:
+    process_watch_list.unwatch(sid)
+
+
+__all__ = ['process_metrics_sampler', 'process_watch_cleanup_on_disconnect', 'process_watch_list']
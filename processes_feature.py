@@ -1,16 +1,21 @@
 from __future__ import annotations
 
+import heapq
 import os
+import re
 import signal
 import threading
-import time
 from collections import defaultdict
 
 import psutil
 from flask import Blueprint, jsonify, render_template, request, session
+from flask_socketio import join_room, leave_room
 
-from auth import SUDO_SESSION_KEY, run_sudo
+from auth import SUDO_SESSION_KEY, is_authenticated, run_sudo
 from config_store import load_config, save_process_favorites
+from process_snapshot import process_snapshots
+from process_tree import process_tree
+from process_watch import process_metrics_sampler, process_watch_list
 
 
 def normalize_process_cpu_percent(cpu_percent) -> float:
@@ -33,64 +38,263 @@ def normalize_process_cpu_percent(cpu_percent) -> float:
             return 0.0
 
 
-# Global cache for network traffic data
-process_net_counters: dict[int, dict] = {}
-network_traffic_lock = threading.Lock()
+def process_list_entry(proc) -> dict:
+    """The fields the process list shows, from a `process_snapshots` entry."""
+    return {
+        'pid': proc['pid'],
+        'name': proc['name'],
+        'username': proc['username'],
+        'status': proc['status'],
+        'exe': proc['exe'],
+        'cwd': proc['cwd'],
+        'cmdline': proc['cmdline'],
+        # One decimal is all the UI shows; finer jitter would only make deltas bigger.
+        'cpu_percent': round(normalize_process_cpu_percent(proc['cpu_percent']), 1),
+        'memory_rss': proc['memory_rss'],
+        'network_connections': proc['network_connections'],
+    }
+
+
+PROCESS_LIST_FIELDS = (
+    'pid', 'name', 'username', 'status', 'exe', 'cwd', 'cmdline', 'cpu_percent', 'memory_rss', 'network_connections',
+)
+# Sort keys over raw snapshot entries (CPU normalization keeps the order).
+PROCESS_SORT_KEYS = {
+    'cpu': lambda p: (p['cpu_percent'], p['memory_rss']),
+    'mem': lambda p: p['memory_rss'],
+    'rss': lambda p: p['memory_rss'],
+    'net': lambda p: p['network_connections'],
+    'pid': lambda p: p['pid'],
+    'name': lambda p: p['name'].lower(),
+    'user': lambda p: p['username'],
+}
+
+
+def query_processes(processes, args) -> dict:
+    """Filter, order, page and project snapshot entries according to query `args`.
+
+    `sort` (cpu|mem|rss|net|pid|name|user) and `order` (asc|desc), regexes
+    `name`, `user` and `cmdline`, `status` (comma separated), `limit`,
+    `offset` and `fields` (comma separated). With a limit only the rows up to
+    offset + limit are selected (heap top-N) instead of sorting everything.
+    Raises ValueError on bad parameters.
+    """
+    sort = args.get('sort') or 'cpu'
+    key = PROCESS_SORT_KEYS.get(sort)
+    if key is None:
+        raise ValueError(f'unknown sort key: {sort}')
+    order = args.get('order') or ('asc' if sort in ('pid', 'name', 'user') else 'desc')
+    if order not in ('asc', 'desc'):
+        raise ValueError('order must be asc or desc')
+
+    fields = [f.strip() for f in (args.get('fields') or '').split(',') if f.strip()]
+    unknown = [f for f in fields if f not in PROCESS_LIST_FIELDS]
+    if unknown:
+        raise ValueError(f'unknown fields: {", ".join(unknown)}')
+
+    offset = int(args.get('offset') or 0)
+    limit = int(args['limit']) if args.get('limit') not in (None, '') else None
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValueError('limit and offset must not be negative')
 
-
-def get_process_network_traffic(pid: int) -> float:
-    """Calculate network traffic for a specific process using psutil (estimate)."""
     try:
-        process = psutil.Process(pid)
-        current_time = time.time()
-
-        connections = process.net_connections()
-        if not connections:
-            return 0.0
-
-        conn_count = len(connections)
-
-        with network_traffic_lock:
-            if pid not in process_net_counters:
-                process_net_counters[pid] = {
-                    'last_check': current_time,
-                    'last_conn_count': conn_count,
-                    'traffic_estimate': 0.0,
-                }
-                return 0.0
-
-            prev_data = process_net_counters[pid]
-            time_diff = current_time - prev_data['last_check']
-
-            if time_diff < 0.1:
-                return float(prev_data['traffic_estimate'])
-
-            conn_diff = abs(conn_count - prev_data['last_conn_count'])
-
-            cpu_percent = process.cpu_percent(interval=None) / 100.0
-
-            base_traffic = 5.0
-            conn_factor = 2.0 * float(conn_diff)
-            cpu_factor = 10.0 * float(cpu_percent)
-
-            if conn_count > 0:
-                new_estimate = base_traffic + conn_factor + cpu_factor
-                traffic_estimate = (0.7 * new_estimate) + (0.3 * float(prev_data['traffic_estimate']))
-            else:
-                traffic_estimate = 0.0
-
-            process_net_counters[pid] = {
-                'last_check': current_time,
-                'last_conn_count': conn_count,
-                'traffic_estimate': traffic_estimate,
-            }
-
-            return round(float(traffic_estimate), 2)
-
-    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-        return 0.0
-    except Exception:
-        return 0.0
+        patterns = {
+            name: re.compile(args[name], re.IGNORECASE) for name in ('name', 'user', 'cmdline') if args.get(name)
+        }
+    except re.error as e:
+        raise ValueError(f'bad regex: {e}') from e
+    statuses = {s.strip() for s in (args.get('status') or '').split(',') if s.strip()}
+
+    if patterns or statuses:
+        def matches(p) -> bool:
+            if statuses and p['status'] not in statuses:
+                return False
+            if 'name' in patterns and not patterns['name'].search(p['name']):
+                return False
+            if 'user' in patterns and not patterns['user'].search(p['username']):
+                return False
+            if 'cmdline' in patterns and not patterns['cmdline'].search(' '.join(p['cmdline'])):
+                return False
+            return True
+
+        processes = [p for p in processes if matches(p)]
+
+    total = len(processes)
+    if limit is None:
+        rows = sorted(processes, key=key, reverse=order == 'desc')[offset:]
+    else:
+        select = heapq.nlargest if order == 'desc' else heapq.nsmallest
+        rows = select(offset + limit, processes, key=key)[offset:]
+
+    entries = [process_list_entry(p) for p in rows]
+    if fields:
+        entries = [{f: entry[f] for f in fields} for entry in entries]
+    return {'total': total, 'offset': offset, 'limit': limit, 'processes': entries}
+
+
+def _tree_node(proc, totals, children, child_count) -> dict:
+    totals['cpu_percent'] = round(normalize_process_cpu_percent(totals['cpu_percent']), 1)
+    return {
+        'pid': proc['pid'],
+        'ppid': proc['ppid'],
+        'name': proc['name'],
+        'username': proc['username'],
+        'status': proc['status'],
+        'cpu_percent': round(normalize_process_cpu_percent(proc['cpu_percent']), 1),
+        'memory_rss': proc['memory_rss'],
+        'threads': proc['threads'],
+        'network_connections': proc['network_connections'],
+        'subtree': totals,
+        'child_count': child_count,
+        'children': children,
+    }
+
+
+class ProcessFeed:
+    """Versioned process list; turns snapshots into per-PID patches.
+
+    Works like ServiceFeed: `processes_snapshot` once, then `processes_delta`
+    patches with consecutive `seq`. Patches carry whole entries for new PIDs,
+    the PIDs that exited, and for live PIDs only the fields in DELTA_FIELDS
+    that changed.
+    """
+
+    # name changes on prctl(PR_SET_NAME) and exec without a new PID.
+    DELTA_FIELDS = ('name', 'status', 'cpu_percent', 'memory_rss', 'network_connections')
+
+    def __init__(self):
+        self.seq = 0
+        self.sampled_at = 0.0
+        self._processes: dict[int, dict] = {}
+        self._created: dict[int, float | None] = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'seq': self.seq, 'processes': list(self._processes.values())}
+
+    def update(self, snapshot) -> dict | None:
+        """Apply a ProcessSnapshot and return the patch, or None if nothing changed."""
+        current = {}
+        created = {}
+        for proc in snapshot.processes:
+            current[proc['pid']] = process_list_entry(proc)
+            created[proc['pid']] = proc['create_time']
+
+        with self._lock:
+            previous = self._processes
+            added, changed, removed = [], [], []
+            for pid, entry in current.items():
+                old = previous.get(pid)
+                if old is None or self._created.get(pid) != created[pid]:
+                    if old is not None:
+                        # PID reused by a new process.
+                        removed.append(pid)
+                    added.append(entry)
+                    continue
+                fields = {key: entry[key] for key in self.DELTA_FIELDS if entry[key] != old[key]}
+                if fields:
+                    fields['pid'] = pid
+                    changed.append(fields)
+            removed.extend(pid for pid in previous if pid not in current)
+
+            self._processes, self._created = current, created
+            self.sampled_at = snapshot.sampled_at
+            if not (added or changed or removed):
+                return None
+            self.seq += 1
+            return {'seq': self.seq, 'added': added, 'changed': changed, 'removed': removed}
+
+
+PROCESSES_ROOM = 'processes'
+_process_feed = ProcessFeed()
+_process_subscribers: set[str] = set()
+_process_feed_lock = threading.Lock()
+_process_publisher: threading.Thread | None = None
+
+
+def _publish_latest_processes(socketio) -> None:
+    # Held across the emit so patches leave in sequence order.
+    with _process_feed_lock:
+        snapshot = process_snapshots.get()
+        if snapshot.sampled_at == _process_feed.sampled_at:
+            return
+        delta = _process_feed.update(snapshot)
+        if delta:
+            socketio.emit('processes_delta', delta, room=PROCESSES_ROOM, namespace='/')
+
+
+def _run_process_publisher(socketio) -> None:
+    global _process_publisher
+    while True:
+        with _process_feed_lock:
+            if not _process_subscribers:
+                # Last subscriber left; the snapshot engine idles out on its own.
+                _process_publisher = None
+                return
+        try:
+            _publish_latest_processes(socketio)
+        except Exception:
+            pass
+        socketio.sleep(process_snapshots.interval / 2)
+
+
+def _add_process_subscriber(socketio, sid: str) -> None:
+    global _process_publisher
+    with _process_feed_lock:
+        _process_subscribers.add(sid)
+        if _process_publisher is None:
+            _process_publisher = threading.Thread(target=_run_process_publisher, args=(socketio,), daemon=True)
+            _process_publisher.start()
+
+
+def processes_cleanup_on_disconnect(sid: str) -> None:
+    with _process_feed_lock:
+        _process_subscribers.discard(sid)
+
+
+def register_process_socket_handlers(socketio):
+    @socketio.on('processes_subscribe')
+    def handle_processes_subscribe():
+        if not is_authenticated():
+            return
+        # Join before taking the snapshot; clients drop patches older than it.
+        join_room(PROCESSES_ROOM)
+        _add_process_subscriber(socketio, request.sid)
+        _publish_latest_processes(socketio)
+        socketio.emit('processes_snapshot', _process_feed.snapshot(), room=request.sid)
+
+    @socketio.on('processes_resync')
+    def handle_processes_resync():
+        if not is_authenticated():
+            return
+        socketio.emit('processes_snapshot', _process_feed.snapshot(), room=request.sid)
+
+    @socketio.on('processes_unsubscribe')
+    def handle_processes_unsubscribe():
+        leave_room(PROCESSES_ROOM)
+        processes_cleanup_on_disconnect(request.sid)
+
+    @socketio.on('process_watch')
+    def handle_process_watch(data):
+        if not is_authenticated():
+            return
+        data = data or {}
+        try:
+            pids = [int(pid) for pid in data.get('pids') or []]
+        except (TypeError, ValueError):
+            socketio.emit('process_watch_error', {'error': 'pids must be integers'}, room=request.sid)
+            return
+        watched = process_watch_list.watch(socketio, request.sid, pids, replace=bool(data.get('replace')))
+        socketio.emit('process_watching', {'pids': watched}, room=request.sid)
+
+    @socketio.on('process_unwatch')
+    def handle_process_unwatch(data=None):
+        pids = (data or {}).get('pids')
+        try:
+            process_watch_list.unwatch(request.sid, None if pids is None else [int(pid) for pid in pids])
+        except (TypeError, ValueError):
+            process_watch_list.unwatch(request.sid)
 
 
 def build_processes_blueprint() -> Blueprint:
@@ -115,69 +319,34 @@ def build_processes_blueprint() -> Blueprint:
 
     @bp.route('/api/processes')
     def api_processes():
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'username', 'status']):
-            try:
-                pid = proc.info.get('pid')
-                name = proc.info.get('name') or 'unknown'
-                username = proc.info.get('username') or ''
-                status = proc.info.get('status') or ''
-
-                try:
-                    exe = proc.exe()
-                except (psutil.AccessDenied, psutil.ZombieProcess):
-                    exe = ''
-                except Exception:
-                    exe = ''
-
-                try:
-                    cwd = proc.cwd()
-                except (psutil.AccessDenied, psutil.ZombieProcess):
-                    cwd = ''
-                except Exception:
-                    cwd = ''
-
-                try:
-                    cmdline = proc.cmdline() or []
-                except (psutil.AccessDenied, psutil.ZombieProcess):
-                    cmdline = []
-                except Exception:
-                    cmdline = []
-
-                if isinstance(cmdline, list) and len(cmdline) > 40:
-                    cmdline = cmdline[:40] + ['...']
-
-                cpu_percent = normalize_process_cpu_percent(proc.cpu_percent(interval=None))
-                memory_rss = proc.memory_info().rss
-
-                try:
-                    network_connections = len(proc.net_connections())
-                except (psutil.AccessDenied, psutil.ZombieProcess):
-                    network_connections = 0
-                except Exception:
-                    network_connections = 0
-
-                processes.append(
-                    {
-                        'pid': pid,
-                        'name': name,
-                        'username': username,
-                        'status': status,
-                        'exe': exe,
-                        'cwd': cwd,
-                        'cmdline': cmdline,
-                        'cpu_percent': cpu_percent,
-                        'memory_rss': memory_rss,
-                        'network_connections': network_connections,
-                    }
-                )
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
-            except Exception:
-                continue
-
-        processes.sort(key=lambda p: (p.get('cpu_percent', 0), p.get('memory_rss', 0)), reverse=True)
-        return jsonify(success=True, processes=processes)
+        snapshot = process_snapshots.get()
+        try:
+            result = query_processes(snapshot.processes, request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        return jsonify(success=True, sampled_at=snapshot.sampled_at, **result)
+
+    @bp.route('/api/process_tree')
+    def api_process_tree():
+        """Whole forest, or the subtree under `?pid=`; `?depth=` limits nesting (child_count still shows)."""
+        try:
+            pid = int(request.args['pid']) if request.args.get('pid') else None
+            depth = int(request.args['depth']) if request.args.get('depth') else None
+        except ValueError:
+            return jsonify({'success': False, 'error': 'pid and depth must be integers'}), 400
+
+        snapshot = process_snapshots.get()
+        process_tree.update(snapshot)
+        if pid is not None:
+            node = process_tree.subtree(pid, depth, _tree_node)
+            if node is None:
+                return jsonify({'success': False, 'process_exists': False, 'error': 'process_not_found'}), 404
+            tree = [node]
+        else:
+            tree = [process_tree.subtree(root, depth, _tree_node) for root in process_tree.roots()]
+            tree = [node for node in tree if node is not None]
+            tree.sort(key=lambda n: (n['subtree']['cpu_percent'], n['subtree']['memory_rss']), reverse=True)
+        return jsonify(success=True, sampled_at=snapshot.sampled_at, tree=tree)
 
     @bp.route('/api/process_info/<int:pid>')
     def api_process_info(pid: int):
@@ -234,45 +403,11 @@ def build_processes_blueprint() -> Blueprint:
     @bp.route('/api/process_metrics/<int:pid>')
     def process_metrics(pid: int):
         try:
-            process = psutil.Process(pid)
-
-            cpu_percent = normalize_process_cpu_percent(process.cpu_percent(interval=0.1))
-
-            memory_info = process.memory_info()
-            memory_percent = process.memory_percent()
-
-            network_connections = process.net_connections()
-            num_connections = len(network_connections)
-
-            network_traffic = get_process_network_traffic(pid)
-
-            process_name = process.name()
-            status = process.status()
-
-            try:
-                threads = process.num_threads()
-            except (psutil.AccessDenied, psutil.ZombieProcess):
-                threads = 0
-            except Exception:
-                threads = 0
-
-            return jsonify(
-                {
-                    'success': True,
-                    'process_exists': True,
-                    'process_name': process_name,
-                    'status': status,
-                    'cpu_percent': cpu_percent,
-                    'memory_rss': memory_info.rss,
-                    'memory_vms': memory_info.vms,
-                    'memory_percent': memory_percent,
-                    'threads': threads,
-                    'network_connections': num_connections,
-                    'network_traffic': network_traffic,
-                    'timestamp': time.time(),
-                }
-            )
+            # CPU is the delta since this PID was last sampled (by this route or the watch ticker).
+            metrics = process_metrics_sampler.sample(pid)
+            return jsonify({'success': True, 'process_exists': True, **metrics})
         except psutil.NoSuchProcess:
+            process_metrics_sampler.forget(pid)
             return jsonify({'success': False, 'process_exists': False, 'error': f'Process with PID {pid} not found'})
         except (psutil.AccessDenied, psutil.ZombieProcess) as e:
             return jsonify({'success': False, 'process_exists': True, 'error': str(e)})
@@ -314,4 +449,9 @@ def build_processes_blueprint() -> Blueprint:
     return bp
 
 
-__all__ = ['build_processes_blueprint', 'normalize_process_cpu_percent']
+__all__ = [
+    'build_processes_blueprint',
+    'normalize_process_cpu_percent',
+    'processes_cleanup_on_disconnect',
+    'register_process_socket_handlers',
+]
@@ -0,0 +1,203 @@
+"""OpenMetrics exposition of host, service, process and MQTT metrics at `/metrics`.
+
+Everything is read from state the app already keeps (the metrics sampler's
+snapshot, the service status cache, the shared process snapshot, the MQTT
+counters). The rendered body is cached for `cache_seconds` and
+rebuilt by one request at a time, so any number of scrapers share a render.
+"""
+
+from __future__ import annotations
+
+import heapq
+import hmac
+import threading
+import time
+
+import psutil
+from flask import Blueprint, Response, request
+
+from auth import is_authenticated
+from config_store import get_prometheus_settings
+from metrics import metrics_sampler
+from mqtt_feature import get_mqtt_counters
+from process_snapshot import process_snapshots
+from systemd_manager import service_cache
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PREFIX = 'servicecockpit'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: dict | None) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class _Writer:
+    def __init__(self):
+        self.lines: list[str] = []
+
+    def family(self, name: str, kind: str, help_text: str, samples, unit: str = '') -> None:
+        """`samples` is an iterable of (labels, value); counters get the `_total` suffix."""
+        full = f'{PREFIX}_{name}'
+        self.lines.append(f'# TYPE {full} {kind}')
+        if unit:
+            self.lines.append(f'# UNIT {full} {unit}')
+        self.lines.append(f'# HELP {full} {help_text}')
+        suffix = '_total' if kind == 'counter' else ''
+        for labels, value in samples:
+            if value is None:
+                continue
+            value = int(value) if isinstance(value, (bool, int)) else float(value)
+            self.lines.append(f'{full}{suffix}{_labels(labels)} {value}')
+
+    def render(self) -> str:
+        return '\n'.join(self.lines) + '\n# EOF\n'
+
+
+def _top_processes(limit: int) -> tuple[list, list]:
+    """(top by CPU, top by RSS) as (pid, name, value) tuples from the shared process snapshot."""
+    processes = process_snapshots.get().processes
+    cores = psutil.cpu_count() or 1
+    by_cpu = heapq.nlargest(limit, processes, key=lambda p: p['cpu_percent'])
+    by_rss = heapq.nlargest(limit, processes, key=lambda p: p['memory_rss'])
+    return (
+        [(p['pid'], p['name'], p['cpu_percent'] / cores) for p in by_cpu],
+        [(p['pid'], p['name'], p['memory_rss']) for p in by_rss],
+    )
+
+
+def render_metrics(top_processes: int = 10) -> str:
+    out = _Writer()
+    metrics_sampler.start()
+    host = metrics_sampler.snapshot()
+
+    out.family('cpu_usage_percent', 'gauge', 'Host CPU usage averaged over all cores.', [(None, host.get('cpu_percent'))])
+    out.family(
+        'cpu_core_usage_percent',
+        'gauge',
+        'CPU usage per core.',
+        [({'core': core}, value) for core, value in enumerate(host.get('cpu_percent_per_core') or [])],
+    )
+    load = host.get('load_average') or []
+    out.family(
+        'load_average',
+        'gauge',
+        'System load average.',
+        [({'period': period}, value) for period, value in zip(('1m', '5m', '15m'), load)],
+    )
+    temperatures = host.get('temperatures') or {}
+    out.family(
+        'temperature_celsius',
+        'gauge',
+        'Thermal zone temperature.',
+        [({'zone': zone}, value) for zone, value in temperatures.items()] or [({'zone': 'cpu'}, host.get('cpu_temp'))],
+        unit='celsius',
+    )
+    out.family('memory_total_bytes', 'gauge', 'Total memory.', [(None, host.get('memory_total_bytes'))], unit='bytes')
+    out.family(
+        'memory_available_bytes', 'gauge', 'Memory available without swapping.', [(None, host.get('memory_available_bytes'))], unit='bytes'
+    )
+    out.family('memory_usage_percent', 'gauge', 'Memory in use.', [(None, host.get('memory_percent'))])
+    out.family('storage_total_bytes', 'gauge', 'Size of the root filesystem.', [(None, host.get('storage_total_bytes'))], unit='bytes')
+    out.family('storage_used_bytes', 'gauge', 'Used space on the root filesystem.', [(None, host.get('storage_used_bytes'))], unit='bytes')
+    out.family('storage_free_bytes', 'gauge', 'Space available to unprivileged users.', [(None, host.get('storage_free_bytes'))], unit='bytes')
+    out.family('storage_usage_percent', 'gauge', 'Root filesystem usage.', [(None, host.get('storage_percent'))])
+    out.family('internet_up', 'gauge', 'Whether the last connectivity probe succeeded.', [(None, 1 if host.get('has_internet') else 0)])
+    out.family('metrics_sample_age_seconds', 'gauge', 'Age of the host metrics sample.', [(None, host.get('age'))], unit='seconds')
+
+    services = service_cache.peek()
+    out.family(
+        'service_active',
+        'gauge',
+        'Whether the systemd service is active.',
+        [({'service': s['name']}, 1 if s.get('active') else 0) for s in services],
+    )
+    out.family(
+        'service_enabled',
+        'gauge',
+        'Whether the systemd service is enabled.',
+        [({'service': s['name']}, 1 if s.get('enabled') else 0) for s in services],
+    )
+
+    if top_processes > 0:
+        by_cpu, by_rss = _top_processes(top_processes)
+        out.family(
+            'process_cpu_usage_percent',
+            'gauge',
+            f'CPU usage of the top {top_processes} processes by CPU, as a share of the whole host.',
+            [({'pid': pid, 'name': name}, round(cpu, 2)) for pid, name, cpu in by_cpu],
+        )
+        out.family(
+            'process_resident_memory_bytes',
+            'gauge',
+            f'Resident memory of the top {top_processes} processes by RSS.',
+            [({'pid': pid, 'name': name}, rss) for pid, name, rss in by_rss],
+            unit='bytes',
+        )
+
+    mqtt = get_mqtt_counters()
+    out.family('mqtt_connected', 'gauge', 'Whether the MQTT explorer is connected to a broker.', [(None, 1 if mqtt['connected'] else 0)])
+    out.family('mqtt_topics', 'gauge', 'Distinct topics seen on the current connection.', [(None, mqtt['topics'])])
+    out.family('mqtt_messages_received', 'counter', 'MQTT messages received.', [(None, mqtt['messages_received'])])
+    out.family('mqtt_received_bytes', 'counter', 'MQTT payload bytes received.', [(None, mqtt['bytes_received'])], unit='bytes')
+    out.family('mqtt_messages_published', 'counter', 'MQTT messages published.', [(None, mqtt['messages_published'])])
+    out.family('mqtt_published_bytes', 'counter', 'MQTT payload bytes published.', [(None, mqtt['bytes_published'])], unit='bytes')
+
+    return out.render()
+
+
+class MetricsPageCache:
+    def __init__(self, render=render_metrics):
+        self._render = render
+        self._body = ''
+        self._rendered_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, max_age: float, top_processes: int) -> str:
+        if time.monotonic() - self._rendered_at < max_age:
+            return self._body
+        # Single flight: concurrent scrapes wait here and reuse the new body.
+        with self._lock:
+            if time.monotonic() - self._rendered_at >= max_age:
+                self._body = self._render(top_processes)
+                self._rendered_at = time.monotonic()
+            return self._body
+
+
+metrics_page = MetricsPageCache()
+
+
+def _authorized(token: str) -> bool:
+    if is_authenticated():
+        return True
+    if not token:
+        # No token configured: only logged-in sessions may read the metrics.
+        return False
+    header = request.headers.get('Authorization', '')
+    scheme, _, supplied = header.partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(supplied.strip().encode(), token.encode())
+
+
+def build_prometheus_blueprint() -> Blueprint:
+    bp = Blueprint('prometheus', __name__)
+
+    @bp.route('/metrics')
+    def metrics():
+        settings = get_prometheus_settings()
+        if not settings.get('enabled'):
+            return Response('metrics endpoint disabled\n', status=404, mimetype='text/plain')
+        if not _authorized(settings.get('bearer_token') or ''):
+            return Response('unauthorized\n', status=401, mimetype='text/plain', headers={'WWW-Authenticate': 'Bearer'})
+
+        body = metrics_page.get(float(settings['cache_seconds']), int(settings['top_processes']))
+        return Response(body, content_type=CONTENT_TYPE)
+
+    return bp
+
+
+__all__ = ['build_prometheus_blueprint', 'render_metrics']
@@ -0,0 +1,257 @@
+"""Long directory scans as server-side jobs.
+
+A job (folder size or recursive listing) runs on its own daemon thread and
+streams to the Socket.IO room `scan:<job_id>`:
+
+- `scan_progress`: entries seen, bytes so far and the directory being read,
+  at most every PROGRESS_INTERVAL seconds;
+- `scan_entries`: batches of listed entries (listing jobs only);
+- `scan_done`: final state plus the result or the error.
+
+A running size job is keyed by (real path, options); asking for the same
+size again attaches to it instead of starting a second walk. Listing jobs
+are never shared: their entries are streamed once and not kept, so each
+request gets its own walk. Jobs are held
+by the clients attached to them (socket ids, or a token for an HTTP request
+waiting on the result) and are cancelled when the last holder lets go.
+Finished jobs stay readable for FINISHED_TTL seconds.
+"""
+
+from __future__ import annotations
+
+import os
+import stat
+import threading
+import time
+import uuid
+
+from folder_size import ScanCancelled, folder_sizes
+
+SCAN_KINDS = ('size', 'list')
+PROGRESS_INTERVAL = 0.25
+ENTRY_BATCH = 500
+FINISHED_TTL = 60.0
+
+
+def scan_room(job_id: str) -> str:
+    return f'scan:{job_id}'
+
+
+class ScanJob:
+    def __init__(self, kind: str, path: str, one_file_system: bool):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.path = path
+        self.one_file_system = one_file_system
+        self.state = 'running'
+        self.entries = 0
+        self.bytes = 0
+        self.current_path = path
+        self.result: dict | None = None
+        self.error: str | None = None
+        self.started_at = time.time()
+        self.finished_at: float | None = None
+        self.holders: set[str] = set()
+        self.cancel = threading.Event()
+        self.done = threading.Event()
+
+    @property
+    def key(self) -> tuple:
+        return (self.kind, self.path, self.one_file_system)
+
+    def status(self) -> dict:
+        status = {
+            'job_id': self.id,
+            'kind': self.kind,
+            'path': self.path,
+            'state': self.state,
+            'entries': self.entries,
+            'bytes': self.bytes,
+            'current_path': self.current_path,
+            'elapsed': round((self.finished_at or time.time()) - self.started_at, 3),
+        }
+        if self.state == 'done':
+            status['result'] = self.result
+        elif self.state == 'error':
+            status['error'] = self.error
+        return status
+
+
+class ScanJobManager:
+    def __init__(self):
+        self._jobs: dict[str, ScanJob] = {}
+        self._running: dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        self._socketio = None
+
+    def init_socketio(self, socketio) -> None:
+        self._socketio = socketio
+
+    def _emit(self, event: str, payload: dict, job: ScanJob) -> None:
+        if self._socketio is not None:
+            self._socketio.emit(event, payload, room=scan_room(job.id), namespace='/')
+
+    def start(
+        self,
+        kind: str,
+        path: str,
+        holder: str,
+        one_file_system: bool = False,
+        on_job=None,
+    ) -> tuple[ScanJob, bool]:
+        """Start a scan, or attach `holder` to the same size scan already running.
+
+        `on_job(job)` is called before the walk starts (e.g. to join the job's
+        room), so no event of a new job is emitted before it returns.
+        Returns (job, attached). Raises ValueError for an unknown kind and
+        OSError / NotADirectoryError if `path` cannot be scanned.
+        """
+        if kind not in SCAN_KINDS:
+            raise ValueError(f'unknown scan kind: {kind}')
+        path = os.path.realpath(path)
+        if not os.path.isdir(path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            raise NotADirectoryError(path)
+
+        with self._lock:
+            self._purge()
+            job_id = self._running.get((kind, path, one_file_system))
+            if job_id is not None:
+                job = self._jobs[job_id]
+                job.holders.add(holder)
+                attached = True
+            else:
+                job = ScanJob(kind, path, one_file_system)
+                job.holders.add(holder)
+                self._jobs[job.id] = job
+                if kind == 'size':
+                    self._running[job.key] = job.id
+                attached = False
+
+        if on_job is not None:
+            on_job(job)
+        if attached:
+            return job, True
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+        return job, False
+
+    def get(self, job_id: str) -> ScanJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def attach(self, job_id: str, holder: str) -> ScanJob | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.state == 'running':
+                job.holders.add(holder)
+            return job
+
+    def release(self, job_id: str, holder: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.holders.discard(holder)
+            if not job.holders and job.state == 'running':
+                job.cancel.set()
+
+    def release_all(self, holder: str) -> None:
+        with self._lock:
+            job_ids = [job.id for job in self._jobs.values() if holder in job.holders]
+        for job_id in job_ids:
+            self.release(job_id, holder)
+
+    def _purge(self) -> None:
+        now = time.time()
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and now - j.finished_at > FINISHED_TTL]:
+            del self._jobs[job_id]
+
+    def _run(self, job: ScanJob) -> None:
+        last_progress = 0.0
+
+        def progress(entries: int, size: int, current: str, force: bool = False) -> None:
+            nonlocal last_progress
+            job.entries, job.bytes, job.current_path = entries, size, current or job.current_path
+            now = time.monotonic()
+            if force or now - last_progress >= PROGRESS_INTERVAL:
+                last_progress = now
+                self._emit('scan_progress', job.status(), job)
+
+        try:
+            if job.kind == 'size':
+                job.result = folder_sizes.measure(
+                    job.path,
+                    one_file_system=job.one_file_system,
+                    progress=lambda totals, current: progress(totals['files'] + totals['directories'], totals['size'], current),
+                    cancel=job.cancel,
+                )
+                job.entries = job.result['files'] + job.result['directories']
+                job.bytes = job.result['size']
+            else:
+                job.result = self._list(job, progress)
+            job.state = 'done'
+        except ScanCancelled:
+            job.state = 'cancelled'
+        except Exception as e:
+            job.state = 'error'
+            job.error = str(e)
+        finally:
+            with self._lock:
+                job.finished_at = time.time()
+                if self._running.get(job.key) == job.id:
+                    del self._running[job.key]
+            job.done.set()
+            self._emit('scan_done', job.status(), job)
+
+    def _list(self, job: ScanJob, progress) -> dict:
+        """Depth-first listing below job.path, streamed in ENTRY_BATCH chunks."""
+        root_dev = os.stat(job.path).st_dev if job.one_file_system else None
+        stack = [job.path]
+        batch: list[dict] = []
+        entries = size = errors = 0
+        while stack:
+            if job.cancel.is_set():
+                raise ScanCancelled(job.path)
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            info = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        is_dir = stat.S_ISDIR(info.st_mode)
+                        if is_dir and (root_dev is None or info.st_dev == root_dev):
+                            stack.append(entry.path)
+                        entries += 1
+                        if not is_dir:
+                            size += info.st_size
+                        batch.append(
+                            {
+                                'path': entry.path,
+                                'is_directory': is_dir,
+                                'size': 0 if is_dir else info.st_size,
+                                'modified': info.st_mtime,
+                            }
+                        )
+                        if len(batch) >= ENTRY_BATCH:
+                            self._emit('scan_entries', {'job_id': job.id, 'entries': batch}, job)
+                            batch = []
+            except OSError:
+                errors += 1
+            progress(entries, size, directory)
+        if batch:
+            self._emit('scan_entries', {'job_id': job.id, 'entries': batch}, job)
+        progress(entries, size, job.path, force=True)
+        return {'entries': entries, 'size': size, 'errors': errors}
+
+
+scan_jobs = ScanJobManager()
+
+
+def scan_jobs_cleanup_on_disconnect(sid: str) -> None:
+    scan_jobs.release_all(sid)
+
+
+__all__ = ['SCAN_KINDS', 'ScanJob', 'ScanJobManager', 'scan_jobs', 'scan_jobs_cleanup_on_disconnect', 'scan_room']
@@ -1,19 +1,146 @@
+import fnmatch
 import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from flask import Blueprint, jsonify, render_template, request, session
 
-from systemd_manager import SystemdManager
+from cgroup_stats import cgroup_sampler
+from net_devices import net_devices
+from systemd_manager import VALID_ACTIONS, SystemdManager, service_cache
 from auth import SUDO_SESSION_KEY, is_authenticated, run_sudo
 from config_store import load_config, save_favorites
 
 _socketio = None
 
 
+class ServiceFeed:
+    """Versioned service list; turns full inventories into per-unit patches.
+
+    Clients get `snapshot()` once (as `update_services`) and then apply
+    `services_delta` patches whose `seq` must follow on directly. A client that
+    sees a gap asks for a fresh snapshot with `services_resync`.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.initialized = False
+        self._services: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'seq': self.seq, 'services': list(self._services.values())}
+
+    def update(self, services: list[dict]) -> dict | None:
+        """Replace the list and return the patch, or None if nothing changed."""
+        current = {s['name']: s for s in services}
+        with self._lock:
+            previous = self._services
+            added = [s for name, s in current.items() if name not in previous]
+            changed = [s for name, s in current.items() if name in previous and previous[name] != s]
+            removed = [name for name in previous if name not in current]
+
+            self._services = current
+            self.initialized = True
+            if not (added or changed or removed):
+                return None
+            self.seq += 1
+            return {'seq': self.seq, 'added': added, 'changed': changed, 'removed': removed}
+
+
+_service_feed = ServiceFeed()
+_publish_lock = threading.Lock()
+
+# Shared by every bulk job, so concurrent jobs together never run more than
+# this many `sudo systemctl` calls at once.
+BULK_ACTION_WORKERS = 8
+_bulk_executor = ThreadPoolExecutor(max_workers=BULK_ACTION_WORKERS, thread_name_prefix='bulk-action')
+
+
 def init_services_socketio(socketio):
     global _socketio
     _socketio = socketio
 
 
+def publish_services(services: list[dict]) -> None:
+    """Record the current service list and push the patch to every client."""
+    # Held across the emit so patches leave in sequence order.
+    with _publish_lock:
+        delta = _service_feed.update(services)
+        if delta and _socketio is not None:
+            _socketio.emit('services_delta', delta, namespace='/')
+
+
+def resolve_bulk_targets(data: dict) -> list[str]:
+    """Units named by a bulk request: explicit `services`, a glob `pattern` and/or `favorites`."""
+    known = [s['name'] for s in service_cache.peek()]
+    known_set = set(known)
+    selected: set[str] = set()
+
+    services = data.get('services') or []
+    if isinstance(services, list):
+        selected.update(name for name in services if name in known_set)
+
+    pattern = (data.get('pattern') or '').strip()
+    if pattern:
+        selected.update(fnmatch.filter(known, pattern))
+
+    if data.get('favorites'):
+        favorites = load_config()['services']['favorites']
+        selected.update(name for name in favorites if name in known_set)
+
+    return [name for name in known if name in selected]
+
+
+def run_bulk_action(socketio, sid: str, action: str, services: list[str], sudo_password: str) -> str:
+    """Apply `action` to every unit on the shared pool, reporting progress to `sid`.
+
+    Runs in its own thread and returns the job id immediately; the cache is
+    refreshed once for all units when the job finishes.
+    """
+    job_id = uuid.uuid4().hex
+
+    def job():
+        total = len(services)
+        results: dict[str, bool] = {}
+        futures = {
+            _bulk_executor.submit(SystemdManager.control_service, name, action, sudo_password, False): name
+            for name in services
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = bool(future.result())
+            except Exception:
+                results[name] = False
+            socketio.emit(
+                'bulk_action_progress',
+                {'job_id': job_id, 'service': name, 'success': results[name], 'done': len(results), 'total': total},
+                room=sid,
+            )
+
+        if services:
+            service_cache.refresh_units(services)
+            publish_services(service_cache.peek())
+        failed = sorted(name for name, ok in results.items() if not ok)
+        socketio.emit(
+            'bulk_action_done',
+            {'job_id': job_id, 'action': action, 'total': total, 'succeeded': total - len(failed), 'failed': failed},
+            room=sid,
+        )
+
+    socketio.emit(
+        'bulk_action_started',
+        {'job_id': job_id, 'action': action, 'services': services, 'total': len(services)},
+        room=sid,
+    )
+    thread = threading.Thread(target=job, daemon=True)
+    thread.start()
+    return job_id
+
+
 def build_services_blueprint() -> Blueprint:
     bp = Blueprint('services', __name__)
 
@@ -27,60 +154,25 @@ def build_services_blueprint() -> Blueprint:
         logs = SystemdManager.get_journal_logs(service, sudo_password=sudo_password)
         return {'logs': logs}
 
+    @bp.route('/api/services/resources')
+    def get_service_resources():
+        if not cgroup_sampler.available():
+            return jsonify({'success': False, 'error': 'cgroup v2 hierarchy not found'}), 503
+        return jsonify(success=True, resources=cgroup_sampler.sample())
+
+    @bp.route('/api/services/resources/<service>')
+    def get_single_service_resources(service: str):
+        if not cgroup_sampler.available():
+            return jsonify({'success': False, 'error': 'cgroup v2 hierarchy not found'}), 503
+        resources = cgroup_sampler.sample().get(service)
+        if resources is None:
+            return jsonify({'success': False, 'error': 'no cgroup for service (not running?)'}), 404
+        return jsonify(success=True, service=service, resources=resources)
+
     @bp.route('/api/devices')
     def get_devices():
         try:
-            result = subprocess.run(['ip', 'link'], capture_output=True, text=True, check=True)
-            output = result.stdout
-
-            devices = []
-            interfaces = output.strip().split('\n')
-
-            i = 0
-            while i < len(interfaces):
-                if interfaces[i].strip().startswith(tuple(str(x) + ':' for x in range(10))):
-                    parts = interfaces[i].split(':')
-                    if len(parts) > 2:
-                        interface_name = parts[1].strip()
-
-                        operstate_result = subprocess.run(
-                            ['cat', f'/sys/class/net/{interface_name}/operstate'],
-                            capture_output=True,
-                            text=True,
-                        )
-                        operstate = operstate_result.stdout.strip()
-
-                        mac_result = subprocess.run(
-                            ['cat', f'/sys/class/net/{interface_name}/address'],
-                            capture_output=True,
-                            text=True,
-                        )
-                        mac_address = mac_result.stdout.strip()
-
-                        if interface_name.startswith('wlan'):
-                            device_type = 'Wireless'
-                        elif interface_name.startswith(('eth', 'enp')):
-                            device_type = 'Ethernet'
-                        elif interface_name.startswith('docker'):
-                            device_type = 'Docker'
-                        elif interface_name == 'lo':
-                            device_type = 'Loopback'
-                        else:
-                            device_type = 'Unknown'
-
-                        devices.append(
-                            {
-                                'type': device_type,
-                                'name': interface_name,
-                                'mac': mac_address,
-                                'operstate': operstate,
-                            }
-                        )
-                i += 1
-
-            return jsonify(devices)
-        except subprocess.CalledProcessError as e:
-            return jsonify({'error': str(e)}), 500
+            return jsonify(net_devices.sample())
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
@@ -105,9 +197,7 @@ def build_services_blueprint() -> Blueprint:
             )
         success = SystemdManager.delete_service(service, sudo_password=sudo_password)
         if success:
-            if _socketio is not None:
-                services = SystemdManager.get_all_services()
-                _socketio.emit('update_services', {'services': services})
+            publish_services(service_cache.peek())
             return jsonify(success=True)
         return jsonify(success=False), 400
 
@@ -129,9 +219,8 @@ def build_services_blueprint() -> Blueprint:
             run_sudo(['tee', service_file_path], sudo_password, input_text=(service_content or '') + '\n', check=True)
             run_sudo(['systemctl', 'enable', service_name], sudo_password, check=True)
             run_sudo(['systemctl', 'start', service_name], sudo_password, check=True)
-            if _socketio is not None:
-                services = SystemdManager.get_all_services()
-                _socketio.emit('update_services', {'services': services})
+            service_cache.refresh_units([f'{service_name}.service'])
+            publish_services(service_cache.peek())
             return jsonify(success=True, message=f'Service {service_name} created and started successfully')
 
         except subprocess.CalledProcessError as e:
@@ -147,8 +236,15 @@ def register_services_socket_handlers(socketio):
     def handle_connect():
         if not is_authenticated():
             return False
-        services = SystemdManager.get_all_services()
-        socketio.emit('update_services', {'services': services})
+        if not _service_feed.initialized:
+            publish_services(service_cache.get_all())
+        socketio.emit('update_services', _service_feed.snapshot(), room=request.sid)
+
+    @socketio.on('services_resync')
+    def handle_services_resync():
+        if not is_authenticated():
+            return
+        socketio.emit('update_services', _service_feed.snapshot(), room=request.sid)
 
     @socketio.on('service_action')
     def handle_service_action(data):
@@ -167,10 +263,29 @@ def register_services_socket_handlers(socketio):
             socketio.emit('console_output', {'output': '[ERROR] Sudo password required'}, room=request.sid)
             return
 
+        # control_service refreshes just this unit in the shared cache.
         success = SystemdManager.control_service(service, action, sudo_password=sudo_password)
         if success:
-            services = SystemdManager.get_all_services()
-            socketio.emit('update_services', {'services': services})
+            publish_services(service_cache.peek())
+
+    @socketio.on('bulk_service_action')
+    def handle_bulk_service_action(data):
+        if not is_authenticated():
+            socketio.emit('console_output', {'output': '[ERROR] Not authenticated'}, room=request.sid)
+            return
+
+        data = data or {}
+        action = data.get('action')
+        if action not in VALID_ACTIONS:
+            socketio.emit('bulk_action_done', {'error': 'invalid_action', 'action': action}, room=request.sid)
+            return
+
+        sudo_password = session.get(SUDO_SESSION_KEY)
+        if not sudo_password:
+            socketio.emit('sudo_required', {'message': 'Sudo password required to control services.'}, room=request.sid)
+            return
+
+        run_bulk_action(socketio, request.sid, action, resolve_bulk_targets(data), sudo_password)
 
 
-__all__ = ['build_services_blueprint', 'init_services_socketio', 'register_services_socket_handlers']
+__all__ = ['build_services_blueprint', 'init_services_socketio', 'publish_services', 'register_services_socket_handlers']
@@ -113,6 +113,16 @@ function setupEventListeners() {
         });
     }
 
+    const indexSearch = document.getElementById('index-search');
+    if (indexSearch) {
+        let searchTimer = null;
+        indexSearch.addEventListener('input', function(e) {
+            clearTimeout(searchTimer);
+            const query = e.target.value.trim();
+            searchTimer = setTimeout(() => searchFilenameIndex(query), 250);
+        });
+    }
+
     const newFolderBtn = document.getElementById('new-folder-btn');
     if (newFolderBtn) {
         newFolderBtn.addEventListener('click', createNewFolder);
@@ -363,6 +373,8 @@ function showError(message) {
 
 // Directory and File Operations
 async function loadDirectory(path) {
+    // Operations reload the open directory; when it is watched the pushed deltas already cover it.
+    if (path === currentPath && path === liveDirectory) return;
     currentPath = path;
     
     // Save the current path to localStorage
@@ -372,13 +384,17 @@ async function loadDirectory(path) {
     updateBreadcrumb(path);
     
     try {
-        const response = await fetch(`/api/files?path=${encodeURIComponent(path)}`);
-        const data = await response.json();
+        allFiles = [];
+        const data = await fetchDirectoryListing(path, files => {
+            if (currentPath !== path) return false;
+            allFiles = allFiles.concat(files);
+            applyFilters();
+        });
+        if (currentPath !== path) return;
         
         if (data.success) {
-            allFiles = data.files;
-            applyFilters();
             highlightActiveDirectory(path);
+            watchDirectory(path);
         } else {
             console.error('Error loading directory:', data.error);
             showError('Failed to load directory: ' + data.error);
@@ -1106,6 +1122,54 @@ function filterDirectoryTree(searchTerm) {
     });
 }
 
+// Search over the server's filename index (/api/search); clicking a result opens its folder.
+let filenameSearchSeq = 0;
+
+async function searchFilenameIndex(query) {
+    const container = document.getElementById('index-search-results');
+    if (!container) return;
+    const seq = ++filenameSearchSeq;
+    if (!query) {
+        container.innerHTML = '';
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/search?q=${encodeURIComponent(query)}&limit=50`);
+        const data = await response.json();
+        if (seq !== filenameSearchSeq) return;
+        container.innerHTML = '';
+        if (!data.success) {
+            const status = document.createElement('div');
+            status.className = 'index-search-status';
+            status.textContent = data.error;
+            container.appendChild(status);
+            return;
+        }
+        data.results.forEach(result => {
+            const item = document.createElement('div');
+            item.className = 'index-search-result';
+            item.title = result.path;
+            item.innerHTML = `<i class="fas ${result.is_directory ? 'fa-folder' : 'fa-file'}"></i> `;
+            item.appendChild(document.createTextNode(result.path));
+            item.addEventListener('click', () => {
+                const folder = result.is_directory
+                    ? result.path
+                    : result.path.substring(0, result.path.lastIndexOf('/')) || '/';
+                loadDirectory(folder);
+            });
+            container.appendChild(item);
+        });
+        const status = document.createElement('div');
+        status.className = 'index-search-status';
+        status.textContent = `${data.results.length}${data.truncated ? '+' : ''} matches · ${data.took_ms} ms`
+            + (data.ready ? '' : ' · index still building');
+        container.appendChild(status);
+    } catch (error) {
+        console.error('Error searching files:', error);
+    }
+}
+
 async function pasteToDirectory(targetPath) {
     if (!copiedFile) return;
     
@@ -1,16 +1,98 @@
+const FILES_PAGE_SIZE = 1000;
+
+// Pages through /api/files; each page is revalidated by the browser with its ETag.
+// onPage returns false to stop (e.g. the user navigated elsewhere meanwhile).
+async function fetchDirectoryListing(path, onPage) {
+    let cursor = null;
+    do {
+        const params = new URLSearchParams({ path, limit: FILES_PAGE_SIZE });
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`/api/files?${params}`);
+        const data = await response.json();
+        if (!data.success || onPage(data.files) === false) {
+            return data;
+        }
+        cursor = data.next_cursor;
+    } while (cursor);
+    return { success: true };
+}
+
+// Live updates for the open directory: the server pushes inotify deltas,
+// so a directory that is being watched does not need to be fetched again.
+let dirWatchSocket = null;
+let watchedDirectory = null;   // path asked for
+let liveDirectory = null;      // path the server confirmed it is watching
+
+function ensureDirWatchSocket() {
+    if (dirWatchSocket) return dirWatchSocket;
+    dirWatchSocket = io({
+        reconnection: true,
+        reconnectionAttempts: 5,
+        reconnectionDelay: 1000,
+        timeout: 20000
+    });
+
+    dirWatchSocket.on('connect', () => {
+        if (watchedDirectory) dirWatchSocket.emit('dir_watch', { path: watchedDirectory });
+    });
+    dirWatchSocket.on('disconnect', () => {
+        liveDirectory = null;
+    });
+    dirWatchSocket.on('dir_watching', data => {
+        if (data.path === watchedDirectory) liveDirectory = data.path;
+    });
+    dirWatchSocket.on('dir_watch_error', data => {
+        if (data.path === liveDirectory) liveDirectory = null;
+    });
+    dirWatchSocket.on('dir_delta', delta => {
+        if (!liveDirectory || liveDirectory !== currentPath) return;
+        const byName = new Map(allFiles.map(f => [f.name, f]));
+        (delta.removed || []).forEach(name => byName.delete(name));
+        (delta.added || []).concat(delta.changed || []).forEach(f => byName.set(f.name, f));
+        allFiles = Array.from(byName.values());
+        applyFilters();
+    });
+    dirWatchSocket.on('dir_resync', () => {
+        // The server lost events; fetch the listing again.
+        const path = currentPath;
+        liveDirectory = null;
+        loadDirectory(path);
+    });
+    dirWatchSocket.on('dir_removed', data => {
+        liveDirectory = null;
+        showNotification(`${data.path} was removed or moved`, 'warning');
+    });
+    return dirWatchSocket;
+}
+
+function watchDirectory(path) {
+    const socket = ensureDirWatchSocket();
+    if (watchedDirectory === path && liveDirectory === path) return;
+    if (watchedDirectory && watchedDirectory !== path) socket.emit('dir_unwatch', { path: watchedDirectory });
+    watchedDirectory = path;
+    liveDirectory = null;
+    socket.emit('dir_watch', { path });
+}
+
 async function loadDirectory(path) {
+    // Operations reload the open directory; when it is watched the pushed deltas already cover it.
+    if (path === currentPath && path === liveDirectory) return;
     currentPath = path;
     document.getElementById('current-path').textContent = path;
     updateBreadcrumb(path);
     
     try {
-        const response = await fetch(`/api/files?path=${encodeURIComponent(path)}`);
-        const data = await response.json();
+        allFiles = [];
+        const data = await fetchDirectoryListing(path, files => {
+            if (currentPath !== path) return false;
+            allFiles = allFiles.concat(files);
+            applyFilters();
+        });
+        if (currentPath !== path) return;
         
         if (data.success) {
-            allFiles = data.files;
-            applyFilters();
             highlightActiveDirectory(path);
+            watchDirectory(path);
         } else {
             console.error('Error loading directory:', data.error);
             showError('Failed to load directory: ' + data.error);
@@ -282,49 +364,137 @@ async function displayFileDetails(file) {
     }
 }
 
-async function inspectFolder(path, buttonElement) {
+// Folder sizes run as server-side scan jobs; progress arrives over Socket.IO.
+let scanSocket = null;
+const scanJobs = new Map();       // job_id -> { onProgress, onDone }
+const scanRequests = new Map();   // requested path -> [handlers] until scan_started
+
+function finishScan(status) {
+    const handlers = scanJobs.get(status.job_id);
+    if (!handlers) return;
+    scanJobs.delete(status.job_id);
+    handlers.onDone(status);
+}
+
+function ensureScanSocket() {
+    if (scanSocket) return scanSocket;
+    scanSocket = io({
+        reconnection: true,
+        reconnectionAttempts: 5,
+        reconnectionDelay: 1000,
+        timeout: 20000
+    });
+
+    scanSocket.on('scan_started', status => {
+        const queue = scanRequests.get(status.request_path) || [];
+        const handlers = queue.shift();
+        if (!queue.length) scanRequests.delete(status.request_path);
+        if (!handlers) return;
+        handlers.jobId = status.job_id;
+        scanJobs.set(status.job_id, handlers);
+        if (status.state === 'running') {
+            handlers.onProgress(status);
+        } else {
+            finishScan(status);
+        }
+    });
+
+    scanSocket.on('scan_progress', status => {
+        const handlers = scanJobs.get(status.job_id);
+        if (handlers) handlers.onProgress(status);
+    });
+
+    scanSocket.on('scan_done', finishScan);
+
+    scanSocket.on('scan_error', data => {
+        const queue = scanRequests.get(data.path) || [];
+        const handlers = queue.shift();
+        if (!queue.length) scanRequests.delete(data.path);
+        if (handlers) handlers.onDone({ state: 'error', error: data.error });
+    });
+
+    scanSocket.on('disconnect', () => {
+        // Jobs are released server-side on disconnect.
+        scanJobs.forEach(handlers => handlers.onDone({ state: 'error', error: 'Connection lost' }));
+        scanJobs.clear();
+        scanRequests.clear();
+    });
+    return scanSocket;
+}
+
+// Returns a function that cancels the scan (for this page; others attached keep it running).
+function startFolderScan(path, onProgress, onDone) {
+    const socket = ensureScanSocket();
+    const handlers = { jobId: null, onProgress, onDone };
+    if (!scanRequests.has(path)) scanRequests.set(path, []);
+    scanRequests.get(path).push(handlers);
+    socket.emit('scan_start', { kind: 'size', path });
+    return () => {
+        if (!handlers.jobId) return;
+        socket.emit('scan_cancel', { job_id: handlers.jobId });
+        scanJobs.delete(handlers.jobId);
+        onDone({ state: 'cancelled' });
+    };
+}
+
+function scanProgressText(status) {
+    return `${formatFileSize(status.bytes || 0)} · ${(status.entries || 0).toLocaleString()} entries`;
+}
+
+function inspectFolder(path, buttonElement) {
     const originalHTML = buttonElement.innerHTML;
+    const originalOnclick = buttonElement.onclick;
+    const restore = () => {
+        buttonElement.innerHTML = originalHTML;
+        buttonElement.onclick = originalOnclick;
+    };
     buttonElement.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Calculating...';
-    buttonElement.disabled = true;
-    
-    try {
-        const response = await fetch(`/api/folder-size?path=${encodeURIComponent(path)}`);
-        const data = await response.json();
-        
-        if (data.success) {
-            buttonElement.parentElement.innerHTML = `<span class="folder-size">${data.size_display}</span>`;
-        } else {
-            buttonElement.innerHTML = `<span style="color: #dc3545;">Error</span>`;
-            setTimeout(() => {
-                buttonElement.innerHTML = originalHTML;
-                buttonElement.disabled = false;
-            }, 2000);
+    buttonElement.title = 'Click to cancel';
+
+    const cancel = startFolderScan(
+        path,
+        status => {
+            buttonElement.innerHTML = `<i class="fas fa-spinner fa-spin"></i> ${scanProgressText(status)}`;
+        },
+        status => {
+            if (status.state === 'done') {
+                buttonElement.parentElement.innerHTML = `<span class="folder-size">${formatFileSize(status.result.size)}</span>`;
+            } else if (status.state === 'cancelled') {
+                restore();
+            } else {
+                buttonElement.innerHTML = `<span style="color: #dc3545;">Error</span>`;
+                setTimeout(restore, 2000);
+            }
         }
-    } catch (error) {
-        console.error('Error inspecting folder:', error);
-        buttonElement.innerHTML = `<span style="color: #dc3545;">Error</span>`;
-        setTimeout(() => {
-            buttonElement.innerHTML = originalHTML;
-            buttonElement.disabled = false;
-        }, 2000);
-    }
+    );
+    buttonElement.onclick = event => {
+        event.stopPropagation();
+        cancel();
+    };
 }
 
-async function inspectFolderDetails(path) {
+function inspectFolderDetails(path) {
     const sizeElement = document.getElementById('detail-size');
     sizeElement.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Calculating...';
-    
-    try {
-        const response = await fetch(`/api/folder-size?path=${encodeURIComponent(path)}`);
-        const data = await response.json();
-        
-        if (data.success) {
-            sizeElement.innerHTML = `<span class="folder-size">${data.size_display}</span>`;
-        } else {
-            sizeElement.innerHTML = `<span style="color: #dc3545;">Error: ${data.error}</span>`;
+
+    const cancel = startFolderScan(
+        path,
+        status => {
+            sizeElement.innerHTML = `<i class="fas fa-spinner fa-spin"></i> ${scanProgressText(status)} `;
+            const button = document.createElement('button');
+            button.className = 'btn btn-sm btn-secondary';
+            button.textContent = 'Cancel';
+            button.onclick = () => cancel();
+            sizeElement.appendChild(button);
+        },
+        status => {
+            if (status.state === 'done') {
+                sizeElement.innerHTML = `<span class="folder-size">${formatFileSize(status.result.size)}</span>`;
+            } else if (status.state === 'cancelled') {
+                sizeElement.innerHTML = '<span>Cancelled</span>';
+            } else {
+                sizeElement.innerHTML = `<span style="color: #dc3545;">Error: ${status.error}</span>`;
+            }
         }
-    } catch (error) {
-        console.error('Error inspecting folder:', error);
-        sizeElement.innerHTML = `<span style="color: #dc3545;">Error calculating size</span>`;
-    }
+    );
 }
@@ -43,8 +43,6 @@ let networkTrafficMax = 0;
 let networkTrafficMin = Number.MAX_VALUE;
 
 const MAX_DATA_POINTS = 60;
-const MONITOR_INTERVAL = 1000;
-let monitoringInterval = null;
 let currentPid = null;
 
 function fmtMB(bytes) {
@@ -492,6 +490,19 @@ function renderProcesses(processes) {
     favContainer.innerHTML = filteredFav.map(p => createProcessCard(p, 'favorites')).join('') || '<div style="padding: 1rem; color: #dadada;">No favorites yet</div>';
 }
 
+function applyProcessList(processes) {
+    lastProcessesData = processes;
+    renderProcesses(lastProcessesData);
+
+    // If selected PID disappeared, stop monitoring.
+    if (selectedPid && !lastProcessesData.some(p => p.pid === selectedPid)) {
+        stopMonitoring();
+        selectedPid = null;
+        updateDetailsEmptyState();
+        renderProcesses(lastProcessesData);
+    }
+}
+
 async function fetchProcesses() {
     try {
         const response = await fetch('/api/processes');
@@ -500,21 +511,65 @@ async function fetchProcesses() {
             console.error('Failed to fetch processes', data);
             return;
         }
-        lastProcessesData = data.processes || [];
-        renderProcesses(lastProcessesData);
-
-        // If selected PID disappeared, stop monitoring.
-        if (selectedPid && !lastProcessesData.some(p => p.pid === selectedPid)) {
-            stopMonitoring();
-            selectedPid = null;
-            updateDetailsEmptyState();
-            renderProcesses(lastProcessesData);
-        }
+        applyProcessList(data.processes || []);
     } catch (error) {
         console.error('Error fetching processes:', error);
     }
 }
 
+// Live process feed: one snapshot on subscribe, then per-tick patches.
+const processMap = new Map();
+let processesSeq = null;
+
+function publishProcessMap() {
+    const processes = Array.from(processMap.values());
+    processes.sort((a, b) => (b.cpu_percent - a.cpu_percent) || (b.memory_rss - a.memory_rss));
+    applyProcessList(processes);
+}
+
+function applyProcessesDelta(delta) {
+    // Patches older than our snapshot were already included in it.
+    if (processesSeq === null || delta.seq <= processesSeq) return;
+    if (delta.seq !== processesSeq + 1) {
+        processesSeq = null;
+        processSocket.emit('processes_resync');
+        return;
+    }
+    (delta.removed || []).forEach(pid => processMap.delete(pid));
+    (delta.added || []).forEach(proc => processMap.set(proc.pid, proc));
+    (delta.changed || []).forEach(fields => {
+        const proc = processMap.get(fields.pid);
+        if (proc) Object.assign(proc, fields);
+    });
+    processesSeq = delta.seq;
+    publishProcessMap();
+}
+
+const processSocket = io({
+    reconnection: true,
+    reconnectionAttempts: 5,
+    reconnectionDelay: 1000,
+    timeout: 20000
+});
+
+processSocket.on('connect', () => {
+    processesSeq = null;
+    processSocket.emit('processes_subscribe');
+    // Watch lists live per connection; re-register after a reconnect.
+    if (currentPid) {
+        processSocket.emit('process_watch', { pids: [currentPid], replace: true });
+    }
+});
+
+processSocket.on('processes_snapshot', data => {
+    processMap.clear();
+    (data.processes || []).forEach(proc => processMap.set(proc.pid, proc));
+    processesSeq = data.seq;
+    publishProcessMap();
+});
+
+processSocket.on('processes_delta', applyProcessesDelta);
+
 function updateDetailsEmptyState() {
     const empty = document.getElementById('process-details-empty');
     const meta = document.getElementById('process-meta');
@@ -807,35 +862,33 @@ function updateCharts(data) {
 }
 
 function startMonitoring(pid) {
-    if (monitoringInterval) {
-        clearInterval(monitoringInterval);
-    }
-
     currentPid = pid;
     initCharts();
 
+    // One HTTP read for an immediate first point; the server pushes the rest.
     fetchProcessMetrics(pid).then(data => {
-        if (data) {
+        if (data && currentPid === pid) {
             updateCharts(data);
-            monitoringInterval = setInterval(() => {
-                fetchProcessMetrics(pid).then(newData => {
-                    if (newData) {
-                        updateCharts(newData);
-                    } else {
-                        stopMonitoring();
-                        selectedPid = null;
-                        updateDetailsEmptyState();
-                    }
-                });
-            }, MONITOR_INTERVAL);
         }
     });
+    processSocket.emit('process_watch', { pids: [pid], replace: true });
 }
 
+processSocket.on('process_metrics_batch', batch => {
+    if (!currentPid) return;
+    const data = (batch.processes || {})[currentPid];
+    if (data) {
+        updateCharts(data);
+    } else if ((batch.exited || []).includes(currentPid)) {
+        stopMonitoring();
+        selectedPid = null;
+        updateDetailsEmptyState();
+    }
+});
+
 function stopMonitoring() {
-    if (monitoringInterval) {
-        clearInterval(monitoringInterval);
-        monitoringInterval = null;
+    if (currentPid) {
+        processSocket.emit('process_unwatch', { pids: [currentPid] });
     }
 
     if (cpuChart) { cpuChart.destroy(); cpuChart = null; }
@@ -869,8 +922,7 @@ document.addEventListener('DOMContentLoaded', async () => {
     allSearch?.addEventListener('input', () => renderProcesses(lastProcessesData));
     favSearch?.addEventListener('input', () => renderProcesses(lastProcessesData));
 
-    await fetchProcesses();
+    // The socket feed keeps the list current; this just paints the first frame.
+    if (processesSeq === null) await fetchProcesses();
     updateDetailsEmptyState();
-
-    setInterval(fetchProcesses, 3000);
 });
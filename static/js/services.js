@@ -124,7 +124,58 @@ async function selectService(serviceName) {
     });
     
     document.getElementById('journal-title').textContent = `Logs: ${serviceName}`;
-    await updateJournal(serviceName);
+    followJournal(serviceName);
+}
+
+// Live journal: the server streams entries for the followed unit; the last
+// cursor lets a reconnecting socket pick up exactly where it left off.
+const MAX_JOURNAL_LINES = 2000;
+let journalFollowing = null;
+let journalLastCursor = null;
+let journalLastTimestamp = 0;
+
+function followJournal(serviceName) {
+    if (journalFollowing && journalFollowing !== serviceName) {
+        serviceSocket.emit('journal_unfollow', {service: journalFollowing});
+    }
+    journalFollowing = serviceName;
+    journalLastCursor = null;
+    journalLastTimestamp = 0;
+    document.getElementById('journal-container').innerHTML = `
+        <div class="loading-spinner">
+            <i class="fas fa-spinner"></i>
+            <p>Loading logs...</p>
+        </div>
+    `;
+    serviceSocket.emit('journal_follow', {service: serviceName});
+}
+
+function formatJournalEntry(entry) {
+    const time = entry.timestamp ? new Date(entry.timestamp / 1000).toLocaleString() : '';
+    const source = entry.pid ? `${entry.identifier}[${entry.pid}]` : entry.identifier;
+    return `${time} ${source}: ${entry.message}`;
+}
+
+function appendJournalEntries(entries) {
+    const journalContainer = document.getElementById('journal-container');
+    const stickToBottom = journalContainer.scrollTop + journalContainer.clientHeight >= journalContainer.scrollHeight - 20;
+
+    const fragment = document.createDocumentFragment();
+    entries.forEach(entry => {
+        // History and live batches can overlap right after (re)subscribing.
+        if (entry.cursor === journalLastCursor || entry.timestamp < journalLastTimestamp) return;
+        journalLastCursor = entry.cursor;
+        journalLastTimestamp = entry.timestamp;
+        fragment.appendChild(document.createTextNode(formatJournalEntry(entry) + '\n'));
+    });
+    journalContainer.appendChild(fragment);
+
+    while (journalContainer.childNodes.length > MAX_JOURNAL_LINES) {
+        journalContainer.removeChild(journalContainer.firstChild);
+    }
+    if (stickToBottom) {
+        journalContainer.scrollTop = journalContainer.scrollHeight;
+    }
 }
 
 async function updateJournal(serviceName) {
@@ -150,6 +201,7 @@ async function updateJournal(serviceName) {
 }
 
 let lastServicesData = [];
+let servicesSeq = null;
 
 function updateServices(services) {
     console.log('Updating Services:', services);
@@ -175,11 +227,94 @@ function updateServices(services) {
         filteredFavorites.map(service => createServiceCard(service, 'favorites')).join('') :
         '<div class="text-center text-muted">No favorite services found</div>';
 
-    if (selectedService) {
-        updateJournal(selectedService);
+}
+
+function findServiceCard(containerEl, serviceName) {
+    return Array.from(containerEl.querySelectorAll('.service-card'))
+        .find(card => card.dataset.serviceName === serviceName) || null;
+}
+
+function syncEmptyMessage(containerEl, message) {
+    const hasCards = containerEl.querySelector('.service-card') !== null;
+    const placeholder = containerEl.querySelector(':scope > .text-muted');
+    if (hasCards && placeholder) {
+        placeholder.remove();
+    } else if (!hasCards && !placeholder) {
+        containerEl.innerHTML = `<div class="text-center text-muted">${message}</div>`;
     }
 }
 
+// Replace, insert (in name order) or drop a single card without touching the rest of the list.
+function patchServiceCard(containerEl, service, container, visible) {
+    const existing = findServiceCard(containerEl, service.name);
+    if (!visible) {
+        if (existing) existing.remove();
+        return;
+    }
+
+    const template = document.createElement('template');
+    template.innerHTML = createServiceCard(service, container).trim();
+    const card = template.content.firstElementChild;
+
+    if (existing) {
+        existing.replaceWith(card);
+        return;
+    }
+    const next = Array.from(containerEl.querySelectorAll('.service-card'))
+        .find(el => el.dataset.serviceName > service.name);
+    containerEl.insertBefore(card, next || null);
+}
+
+function requestServicesResync() {
+    // Ignore further patches until the fresh snapshot arrives.
+    servicesSeq = null;
+    serviceSocket.emit('services_resync');
+}
+
+function applyServicesDelta(delta) {
+    if (servicesSeq === null || delta.seq <= servicesSeq) return;
+    if (delta.seq !== servicesSeq + 1) {
+        console.warn(`Service update gap (have ${servicesSeq}, got ${delta.seq}); resyncing`);
+        requestServicesResync();
+        return;
+    }
+    servicesSeq = delta.seq;
+
+    const favoritesContainer = document.getElementById('favorites-container');
+    const servicesSearchTerm = servicesSearchInput.value.toLowerCase();
+    const favoritesSearchTerm = favoritesSearchInput.value.toLowerCase();
+
+    delta.removed.forEach(name => {
+        lastServicesData = lastServicesData.filter(service => service.name !== name);
+        [servicesContainer, favoritesContainer].forEach(containerEl => {
+            const card = findServiceCard(containerEl, name);
+            if (card) card.remove();
+        });
+    });
+
+    delta.added.concat(delta.changed).forEach(service => {
+        const index = lastServicesData.findIndex(s => s.name === service.name);
+        if (index >= 0) {
+            lastServicesData[index] = service;
+        } else {
+            const insertAt = lastServicesData.findIndex(s => s.name > service.name);
+            lastServicesData.splice(insertAt < 0 ? lastServicesData.length : insertAt, 0, service);
+        }
+
+        const name = service.name.toLowerCase();
+        patchServiceCard(servicesContainer, service, 'all', name.includes(servicesSearchTerm));
+        patchServiceCard(
+            favoritesContainer,
+            service,
+            'favorites',
+            favorites.has(service.name) && name.includes(favoritesSearchTerm)
+        );
+    });
+
+    syncEmptyMessage(servicesContainer, 'No services found');
+    syncEmptyMessage(favoritesContainer, 'No favorite services found');
+}
+
 const serviceSocket = io({
     reconnection: true,
     reconnectionAttempts: 5,
@@ -192,6 +327,55 @@ function controlService(service, action) {
     console.log('Control Service:', service, action);
 }
 
+// target: {services: [...]}, {pattern: 'worker@*'} and/or {favorites: true}
+function bulkServiceAction(action, target) {
+    serviceSocket.emit('bulk_service_action', {action, ...target});
+    console.log('Bulk Service Action:', action, target);
+}
+
+const restartFavoritesBtn = document.getElementById('restart-favorites-btn');
+let bulkJobId = null;
+
+if (restartFavoritesBtn) {
+    restartFavoritesBtn.addEventListener('click', () => {
+        if (bulkJobId || favorites.size === 0) return;
+        if (confirm(`Restart all ${favorites.size} favorite services?`)) {
+            bulkServiceAction('restart', {favorites: true});
+        }
+    });
+}
+
+serviceSocket.on('bulk_action_started', data => {
+    bulkJobId = data.job_id;
+    if (restartFavoritesBtn) {
+        restartFavoritesBtn.disabled = true;
+        restartFavoritesBtn.querySelector('i').classList.add('fa-spin');
+        restartFavoritesBtn.title = `${data.action}: 0/${data.total}`;
+    }
+});
+
+serviceSocket.on('bulk_action_progress', data => {
+    if (data.job_id !== bulkJobId || !restartFavoritesBtn) return;
+    restartFavoritesBtn.title = `${data.service} ${data.success ? 'ok' : 'failed'} (${data.done}/${data.total})`;
+});
+
+serviceSocket.on('bulk_action_done', data => {
+    if (data.error) {
+        console.error('Bulk action error:', data.error);
+        return;
+    }
+    if (data.job_id !== bulkJobId) return;
+    bulkJobId = null;
+    if (restartFavoritesBtn) {
+        restartFavoritesBtn.disabled = false;
+        restartFavoritesBtn.querySelector('i').classList.remove('fa-spin');
+        restartFavoritesBtn.title = 'Restart all favorites';
+    }
+    if (data.failed.length) {
+        alert(`${data.action} failed for: ${data.failed.join(', ')}`);
+    }
+});
+
 // Add error handling for socket connection
 serviceSocket.on('connect_error', (error) => {
     console.error('Socket connection error:', error);
@@ -202,10 +386,38 @@ serviceSocket.on('error', (error) => {
     console.error('Socket error:', error);
 });
 
+// Full snapshot: sent on connect and in reply to services_resync.
 serviceSocket.on('update_services', data => {
+    servicesSeq = typeof data.seq === 'number' ? data.seq : null;
     updateServices(data.services);
 });
 
+serviceSocket.on('services_delta', delta => {
+    applyServicesDelta(delta);
+});
+
+serviceSocket.on('journal_history', data => {
+    if (data.service !== journalFollowing) return;
+    if (!data.resumed) {
+        document.getElementById('journal-container').textContent = '';
+        journalLastCursor = null;
+        journalLastTimestamp = 0;
+    }
+    appendJournalEntries(data.entries);
+});
+
+serviceSocket.on('journal_lines', data => {
+    if (data.service !== journalFollowing) return;
+    appendJournalEntries(data.entries);
+});
+
+serviceSocket.on('journal_error', data => {
+    console.error('Journal stream error:', data.error);
+    if (data.service === journalFollowing) {
+        updateJournal(data.service);
+    }
+});
+
 serviceSocket.on('sudo_required', (payload = {}) => {
     if (typeof window.showSudoModal === 'function') {
         window.showSudoModal(payload.message || 'Sudo password required.');
@@ -226,6 +438,9 @@ serviceSocket.on('connect', () => {
     showLoading('services-container');
     showLoading('favorites-container');
     loadFavorites();
+    if (journalFollowing) {
+        serviceSocket.emit('journal_follow', {service: journalFollowing, cursor: journalLastCursor});
+    }
 });
 
 function showLoading(containerId) {
@@ -325,5 +540,54 @@ async function showServiceInfo(serviceName) {
     document.getElementById('info-pid').textContent = service.main_pid || 'N/A';
     document.getElementById('info-tasks').textContent = service.tasks || 'N/A';
     document.getElementById('info-path').textContent = service.fragment_path || 'N/A';
+
+    startServiceResourcePolling(serviceName);
+}
+
+// CGroup resources for the service shown in the info card, refreshed while it stays open.
+let serviceResourceTimer = null;
+
+function formatBytes(bytes) {
+    if (bytes === null || bytes === undefined) return 'N/A';
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    let value = bytes;
+    let unit = 0;
+    while (value >= 1024 && unit < units.length - 1) {
+        value /= 1024;
+        unit++;
+    }
+    return `${value.toFixed(unit === 0 ? 0 : 1)} ${units[unit]}`;
+}
+
+async function updateServiceResources(serviceName) {
+    const set = (id, text) => { document.getElementById(id).textContent = text; };
+    try {
+        const response = await fetch(`/api/services/resources/${encodeURIComponent(serviceName)}`);
+        const data = await response.json();
+        const r = data.success ? data.resources : {};
+        set('info-cg-cpu', r.cpu_percent === null || r.cpu_percent === undefined ? 'N/A' : r.cpu_percent.toFixed(1));
+        set('info-cg-mem', formatBytes(r.memory_current));
+        set('info-cg-mem-peak', formatBytes(r.memory_peak));
+        set('info-cg-io-read', r.io_read_rate === null || r.io_read_rate === undefined ? 'N/A' : `${formatBytes(r.io_read_rate)}/s (${formatBytes(r.io_read_bytes)} total)`);
+        set('info-cg-io-write', r.io_write_rate === null || r.io_write_rate === undefined ? 'N/A' : `${formatBytes(r.io_write_rate)}/s (${formatBytes(r.io_write_bytes)} total)`);
+        set('info-cg-pids', r.pids ?? 'N/A');
+    } catch (error) {
+        console.error('Error fetching service resources:', error);
+    }
+}
+
+function startServiceResourcePolling(serviceName) {
+    if (serviceResourceTimer) clearInterval(serviceResourceTimer);
+    updateServiceResources(serviceName);
+    serviceResourceTimer = setInterval(() => {
+        const infocard = document.getElementById('infocard');
+        const shown = document.getElementById('info-name').textContent === serviceName;
+        if (!infocard || infocard.classList.contains('hidden') || !shown) {
+            clearInterval(serviceResourceTimer);
+            serviceResourceTimer = null;
+            return;
+        }
+        updateServiceResources(serviceName);
+    }, 2000);
 }
 
@@ -1,4 +1,61 @@
+import json
 import subprocess
+import threading
+import time
+from collections import deque
+
+SERVICE_PROPERTIES = ['ActiveState', 'UnitFileState', 'ExecMainPID', 'FragmentPath', 'TasksCurrent', 'Restart']
+
+VALID_ACTIONS = ['start', 'stop', 'restart', 'enable', 'disable']
+
+# Units per `systemctl show` call; keeps the argv well below ARG_MAX.
+SHOW_BATCH_SIZE = 200
+
+
+def _parse_show_block(text: str) -> dict:
+    status = {}
+    for line in text.strip().split('\n'):
+        key, sep, value = line.partition('=')
+        if sep:
+            status[key] = value
+    return status
+
+
+def _journal_text(value) -> str:
+    # journalctl emits non-UTF-8 fields as byte arrays and repeated fields as lists.
+    if isinstance(value, list):
+        if value and all(isinstance(v, int) for v in value):
+            return bytes(value).decode('utf-8', errors='replace')
+        return '\n'.join(_journal_text(v) for v in value)
+    return '' if value is None else str(value)
+
+
+def parse_journal_entry(line: str) -> dict | None:
+    """Convert one `journalctl -o json` line into the entry sent to clients."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or '__CURSOR' not in record:
+        return None
+    try:
+        timestamp = int(record.get('__REALTIME_TIMESTAMP') or 0)
+    except ValueError:
+        timestamp = 0
+    try:
+        priority = int(record.get('PRIORITY'))
+    except (TypeError, ValueError):
+        priority = None
+    return {
+        'cursor': record['__CURSOR'],
+        'timestamp': timestamp,
+        'priority': priority,
+        'unit': _journal_text(record.get('_SYSTEMD_UNIT') or record.get('UNIT')),
+        'identifier': _journal_text(record.get('SYSLOG_IDENTIFIER') or record.get('_COMM')),
+        'pid': _journal_text(record.get('_PID')),
+        'message': _journal_text(record.get('MESSAGE')),
+    }
+
 
 class SystemdManager:
     @staticmethod
@@ -15,15 +72,8 @@ class SystemdManager:
         )
 
     @staticmethod
-    def get_service_status(service_name):
+    def _status_from_properties(service_name, status):
         try:
-            cmd = f"systemctl show {service_name} --property=ActiveState,UnitFileState,ExecMainPID,FragmentPath,TasksCurrent,Restart"
-            result = subprocess.run(cmd.split(), capture_output=True, text=True)
-            status = {}
-            for line in result.stdout.strip().split('\n'):
-                key, value = line.split('=')
-                status[key] = value
-
             return {
                 'name': service_name,
                 'active': status['ActiveState'] == 'active',
@@ -32,33 +82,83 @@ class SystemdManager:
                 'fragment_path': status['FragmentPath'],
                 'tasks': status['TasksCurrent'],
             }
-        except:
+        except KeyError:
             return None
 
     @staticmethod
-    def get_all_services():
+    def get_service_status(service_name):
+        try:
+            cmd = ['systemctl', 'show', service_name, '--property=' + ','.join(SERVICE_PROPERTIES)]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            return SystemdManager._status_from_properties(service_name, _parse_show_block(result.stdout))
+        except Exception:
+            return None
+
+    @staticmethod
+    def get_services_status(service_names):
+        """Status for many units using one `systemctl show` per SHOW_BATCH_SIZE units.
+
+        Units are returned in the order given; units systemd cannot show are
+        left out, exactly like `get_service_status` returning None.
+        """
+        statuses = {}
+        batchable = []
+        for name in service_names:
+            # Template units (foo@.service) cannot be loaded, and an error
+            # aborts a multi-unit `systemctl show`; query them on their own.
+            if '@.' in name:
+                statuses[name] = SystemdManager.get_service_status(name)
+            else:
+                batchable.append(name)
+
+        for start in range(0, len(batchable), SHOW_BATCH_SIZE):
+            batch = batchable[start:start + SHOW_BATCH_SIZE]
+            try:
+                cmd = ['systemctl', 'show', '--property=' + ','.join(SERVICE_PROPERTIES)] + batch
+                result = subprocess.run(cmd, capture_output=True, text=True)
+                output = result.stdout.strip() if result.returncode == 0 else ''
+                blocks = output.split('\n\n') if output else []
+            except Exception:
+                blocks = []
+
+            if len(blocks) != len(batch):
+                # Output blocks can no longer be matched to units positionally.
+                for name in batch:
+                    statuses[name] = SystemdManager.get_service_status(name)
+                continue
+            for name, block in zip(batch, blocks):
+                statuses[name] = SystemdManager._status_from_properties(name, _parse_show_block(block))
+
+        return [statuses[name] for name in service_names if statuses.get(name)]
+
+    @staticmethod
+    def list_service_units():
         # List all service units, including disabled ones
         cmd = "systemctl list-unit-files --type=service --all --plain --no-legend"
         result = subprocess.run(cmd.split(), capture_output=True, text=True)
-        services = []
+        names = []
         for line in result.stdout.strip().split('\n'):
             if line:
                 service_name = line.split()[0]
                 if service_name.endswith('.service'):
-                    status = SystemdManager.get_service_status(service_name)
-                    if status:
-                        services.append(status)
-        return services
+                    names.append(service_name)
+        return names
 
     @staticmethod
-    def control_service(service_name, action, sudo_password: str | None = None):
-        valid_actions = ['start', 'stop', 'restart', 'enable', 'disable']
-        if action not in valid_actions:
+    def get_all_services():
+        return SystemdManager.get_services_status(SystemdManager.list_service_units())
+
+    @staticmethod
+    def control_service(service_name, action, sudo_password: str | None = None, refresh: bool = True):
+        """Run `systemctl <action>` on one unit; `refresh=False` leaves the cache to the caller."""
+        if action not in VALID_ACTIONS:
             return False
         try:
             if not sudo_password:
                 return False
             SystemdManager._run_sudo(['systemctl', action, service_name], sudo_password, check=True)
+            if refresh:
+                service_cache.refresh_units([service_name])
             return True
         except Exception:
             return False
@@ -75,6 +175,28 @@ class SystemdManager:
         except Exception:
             return "Error fetching logs"
 
+    @staticmethod
+    def get_journal_entries(service_name, cursor: str | None = None, lines: int = 100, sudo_password: str | None = None):
+        """Last `lines` entries as dicts, or only those after `cursor` (capped at `lines`)."""
+        args = ['journalctl', '-u', service_name, '-o', 'json', '--no-pager']
+        if cursor:
+            args += ['--after-cursor', cursor]
+        else:
+            args += ['-n', str(lines)]
+        try:
+            if sudo_password:
+                result = SystemdManager._run_sudo(args, sudo_password, check=False)
+            else:
+                result = subprocess.run(args, capture_output=True, text=True)
+        except Exception:
+            return []
+        entries = deque(maxlen=lines)
+        for line in result.stdout.splitlines():
+            entry = parse_journal_entry(line)
+            if entry:
+                entries.append(entry)
+        return list(entries)
+
     @staticmethod
     def delete_service(service_name, sudo_password: str | None = None):
         try:
@@ -84,6 +206,111 @@ class SystemdManager:
             SystemdManager._run_sudo(['systemctl', 'disable', service_name], sudo_password, check=True)
             SystemdManager._run_sudo(['rm', f'/etc/systemd/system/{service_name}'], sudo_password, check=True)
             SystemdManager._run_sudo(['systemctl', 'daemon-reload'], sudo_password, check=True)
+            service_cache.discard(service_name)
             return True
         except Exception:
             return False
+
+
+class ServiceStatusCache:
+    """Process-wide service inventory shared by every handler.
+
+    Readers within `ttl` seconds of the last scan get the cached list;
+    concurrent readers of a stale cache wait for a single in-flight scan
+    instead of starting their own. Single units can be refreshed or dropped
+    without rescanning the whole table.
+    """
+
+    def __init__(self, ttl: float = 2.0, loader=None):
+        self.ttl = ttl
+        self._loader = loader or SystemdManager.get_all_services
+        self._services: dict[str, dict] | None = None
+        self._loaded_at = 0.0
+        # Units refreshed individually, so an older full scan cannot overwrite them.
+        self._unit_refreshed_at: dict[str, float] = {}
+        self._inflight: threading.Event | None = None
+        self._lock = threading.Lock()
+
+    def get_all(self, max_age: float | None = None) -> list[dict]:
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            if self._services is not None and time.monotonic() - self._loaded_at <= max_age:
+                return list(self._services.values())
+            event = self._inflight
+            leader = event is None
+            if leader:
+                event = self._inflight = threading.Event()
+
+        if not leader:
+            event.wait()
+            return self.peek()
+
+        try:
+            started = time.monotonic()
+            services = self._loader()
+            self._store(services, started)
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+        return self.peek()
+
+    def refresh(self) -> list[dict]:
+        """Full rescan (joining one already in flight)."""
+        return self.get_all(max_age=0)
+
+    def peek(self) -> list[dict]:
+        """Cached list without triggering a scan, unless nothing was loaded yet."""
+        with self._lock:
+            if self._services is not None:
+                return list(self._services.values())
+        return self.get_all()
+
+    def store(self, services: list[dict]) -> None:
+        """Replace the inventory with one obtained elsewhere (e.g. D-Bus signals)."""
+        self._store(services, time.monotonic())
+
+    def refresh_units(self, service_names: list[str]) -> None:
+        """Re-read only these units; units systemd can no longer show are dropped."""
+        statuses = {name: None for name in service_names}
+        statuses.update({s['name']: s for s in SystemdManager.get_services_status(service_names)})
+        now = time.monotonic()
+        with self._lock:
+            for name, status in statuses.items():
+                self._unit_refreshed_at[name] = now
+                if self._services is None:
+                    continue
+                if status is None:
+                    self._services.pop(name, None)
+                elif name in self._services:
+                    self._services[name] = status
+                else:
+                    self._services = dict(sorted({**self._services, name: status}.items()))
+
+    def discard(self, service_name: str) -> None:
+        with self._lock:
+            if self._services is not None:
+                self._services.pop(service_name, None)
+            self._unit_refreshed_at[service_name] = time.monotonic()
+
+    def _store(self, services: list[dict], started: float) -> None:
+        with self._lock:
+            current = {s['name']: s for s in services}
+            previous = self._services or {}
+            resort = False
+            for name, refreshed_at in self._unit_refreshed_at.items():
+                if refreshed_at <= started:
+                    continue
+                if name in previous:
+                    resort = resort or name not in current
+                    current[name] = previous[name]
+                else:
+                    current.pop(name, None)
+            if resort:
+                current = dict(sorted(current.items()))
+            self._unit_refreshed_at = {n: t for n, t in self._unit_refreshed_at.items() if t > started}
+            self._services = current
+            self._loaded_at = time.monotonic()
+
+
+service_cache = ServiceStatusCache()
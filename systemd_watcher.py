@@ -0,0 +1,250 @@
+"""Event-driven service updates from systemd's D-Bus signals.
+
+The watcher is optional: it needs the `jeepney` package and a reachable bus.
+`SystemdWatcher.start()` returns False when either is missing (and `running`
+drops back to False if the bus goes away), so callers keep polling
+the shared service cache instead.
+
+`bus` also takes a bus address, and `loader` is injectable:
+benchmarks/bench_systemd_watcher.py runs the watcher against a private
+dbus-daemon serving a fake org.freedesktop.systemd1.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+try:
+    from jeepney import DBusAddress, HeaderFields, MatchRule, Properties, message_bus, new_method_call
+    from jeepney.io.blocking import open_dbus_connection
+    from jeepney.wrappers import unwrap_msg
+except ImportError:  # pragma: no cover - optional dependency
+    open_dbus_connection = None
+
+from systemd_manager import service_cache
+
+SYSTEMD_BUS_NAME = 'org.freedesktop.systemd1'
+SYSTEMD_PATH = '/org/freedesktop/systemd1'
+SYSTEMD_UNIT_PATH = '/org/freedesktop/systemd1/unit'
+MANAGER_INTERFACE = 'org.freedesktop.systemd1.Manager'
+UNIT_INTERFACE = 'org.freedesktop.systemd1.Unit'
+SERVICE_INTERFACE = 'org.freedesktop.systemd1.Service'
+PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+
+UINT64_MAX = 2 ** 64 - 1
+CALL_TIMEOUT = 5.0
+
+
+def _unit_name_from_path(path: str) -> str | None:
+    """Reverse systemd's bus label escaping (`ssh_2eservice` -> `ssh.service`)."""
+    prefix = SYSTEMD_UNIT_PATH + '/'
+    if not path.startswith(prefix):
+        return None
+    label = path[len(prefix):]
+    return re.sub(r'_([0-9a-f]{2})', lambda m: chr(int(m.group(1), 16)), label)
+
+
+def _value(props: dict, key: str, default=None):
+    # GetAll returns {name: (signature, value)}.
+    entry = props.get(key)
+    return entry[1] if entry is not None else default
+
+
+class SystemdWatcher:
+    """Keep the service list current from systemd signals.
+
+    `on_change` is called with the full service list (same shape as
+    `SystemdManager.get_all_services()`) only when a unit actually changed.
+    Unit list membership comes from `loader`, re-run whenever systemd reports
+    unit file changes or a daemon reload.
+    """
+
+    def __init__(
+        self,
+        on_change: Callable[[list[dict]], None],
+        bus: str = 'SYSTEM',
+        loader: Callable[[], list[dict]] = service_cache.refresh,
+        debounce: float = 0.1,
+    ):
+        self.on_change = on_change
+        self.bus = bus
+        self.loader = loader
+        self.debounce = debounce
+        self.running = False
+        self._conn = None
+        self._queue: deque = deque()
+        self._services: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> bool:
+        if open_dbus_connection is None:
+            return False
+        try:
+            conn = open_dbus_connection(bus=self.bus)
+        except Exception:
+            return False
+        try:
+            self._subscribe(conn)
+            services = {s['name']: s for s in self.loader()}
+        except Exception:
+            conn.close()
+            return False
+
+        with self._lock:
+            self._services = services
+        self._conn = conn
+        self._stop.clear()
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def services(self) -> list[dict]:
+        with self._lock:
+            return list(self._services.values())
+
+    def _subscribe(self, conn) -> None:
+        signals = [
+            dict(interface=PROPERTIES_INTERFACE, member='PropertiesChanged', path_namespace=SYSTEMD_UNIT_PATH),
+            dict(interface=MANAGER_INTERFACE, path=SYSTEMD_PATH),
+        ]
+        for match in signals:
+            # Messages carry the sender's unique name, so only the bus-side
+            # rule can match on the well-known name.
+            conn.filter(MatchRule(type='signal', **match), queue=self._queue)
+            rule = MatchRule(type='signal', sender=SYSTEMD_BUS_NAME, **match)
+            unwrap_msg(conn.send_and_get_reply(message_bus.AddMatch(rule), timeout=CALL_TIMEOUT))
+
+        # systemd only broadcasts unit signals while at least one client is subscribed.
+        manager = DBusAddress(SYSTEMD_PATH, bus_name=SYSTEMD_BUS_NAME, interface=MANAGER_INTERFACE)
+        unwrap_msg(conn.send_and_get_reply(new_method_call(manager, 'Subscribe'), timeout=CALL_TIMEOUT))
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                try:
+                    msg = self._conn.recv_until_filtered(self._queue, timeout=1.0)
+                except TimeoutError:
+                    continue
+
+                # Coalesce bursts (a restart emits several signals per unit).
+                events: dict[str, tuple] = {}
+                reload = self._collect(msg, events)
+                deadline = time.monotonic() + self.debounce
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        msg = self._conn.recv_until_filtered(self._queue, timeout=remaining)
+                    except TimeoutError:
+                        break
+                    reload = self._collect(msg, events) or reload
+
+                if self._apply(events, reload):
+                    self.on_change(self.services())
+        except Exception:
+            pass
+        finally:
+            self.running = False
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+    def _collect(self, msg, events: dict[str, tuple]) -> bool:
+        """Record what a signal asks for; returns True if a full reload is needed."""
+        member = msg.header.fields.get(HeaderFields.member)
+        path = msg.header.fields.get(HeaderFields.path)
+
+        if member == 'PropertiesChanged':
+            interface = msg.body[0]
+            name = _unit_name_from_path(path or '')
+            if name and name.endswith('.service') and interface in (UNIT_INTERFACE, SERVICE_INTERFACE):
+                events[name] = ('refresh', path)
+        elif member == 'UnitNew':
+            name, unit_path = msg.body
+            if name.endswith('.service'):
+                events[name] = ('refresh', unit_path)
+        elif member == 'UnitRemoved':
+            name, _ = msg.body
+            if name.endswith('.service'):
+                events[name] = ('removed', None)
+        elif member == 'UnitFilesChanged':
+            return True
+        elif member == 'Reloading':
+            # Reloading(false) marks the end of a daemon-reload.
+            return not msg.body[0]
+        return False
+
+    def _apply(self, events: dict[str, tuple], reload: bool) -> bool:
+        if reload:
+            services = {s['name']: s for s in self.loader()}
+            with self._lock:
+                changed = services != self._services
+                self._services = services
+            return changed
+
+        changed = False
+        for name, (kind, path) in events.items():
+            with self._lock:
+                old = self._services.get(name)
+            # Membership follows the unit-file list; other units are ignored.
+            if old is None:
+                continue
+
+            if kind == 'removed':
+                # systemd only garbage-collects inactive units. Re-reading the
+                # unit would load it again, so derive the state instead.
+                if old['fragment_path'] and not os.path.exists(old['fragment_path']):
+                    new = None
+                else:
+                    new = dict(old, active=False, main_pid='0', tasks='[not set]')
+            else:
+                try:
+                    new = self._fetch(name, path)
+                except Exception:
+                    continue
+
+            with self._lock:
+                if new is None:
+                    self._services.pop(name, None)
+                elif new != old:
+                    self._services[name] = new
+                else:
+                    continue
+            changed = True
+        return changed
+
+    def _fetch(self, name: str, path: str) -> dict:
+        unit = self._get_all(path, UNIT_INTERFACE)
+        service = self._get_all(path, SERVICE_INTERFACE)
+        tasks = _value(service, 'TasksCurrent', UINT64_MAX)
+        return {
+            'name': name,
+            'active': _value(unit, 'ActiveState') == 'active',
+            'enabled': _value(unit, 'UnitFileState') == 'enabled',
+            'main_pid': str(_value(service, 'ExecMainPID', 0)),
+            'fragment_path': _value(unit, 'FragmentPath', ''),
+            'tasks': '[not set]' if tasks == UINT64_MAX else str(tasks),
+        }
+
+    def _get_all(self, path: str, interface: str) -> dict:
+        address = DBusAddress(path, bus_name=SYSTEMD_BUS_NAME, interface=interface)
+        reply = self._conn.send_and_get_reply(Properties(address).get_all(), timeout=CALL_TIMEOUT)
+        return unwrap_msg(reply)[0]
+
+
+__all__ = ['SystemdWatcher']